@@ -0,0 +1,82 @@
+"""진단 파이프라인 지연 벤치마크 (로컬 스텁 사용, 키·네트워크 불필요)
+
+    python -m benchmarks.bench_diagnosis --sizes 2 4 8 16 --quota-rate 0.1 --malformed-rate 0.05
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core import metrics
+from core.diagnosis import build_groups, diagnose_batched, diagnose_concurrently, is_failed
+from core.fake_llm import FakeBackend
+from core.llm import reset_scheduler, set_backend
+
+MODES = ("concurrent", "stream", "batched")
+
+def make_hierarchy(n_criteria, n_sub):
+    main = [f"기준{i + 1}" for i in range(n_criteria)]
+    struct = {c: [f"{c}-항목{j + 1}" for j in range(n_sub)] for c in main}
+    return "벤치마크 목표", main, struct
+
+def run_once(mode, goal, groups, keys, concurrency):
+    if mode == "batched":
+        events = diagnose_batched(goal, groups, keys, concurrency, use_cache=False)
+    else:
+        events = diagnose_concurrently(goal, groups, keys, concurrency, use_cache=False, stream=(mode == "stream"))
+    return {gid: res for gid, res, finished in events if finished}
+
+def parsed_ok(res):
+    return not is_failed(res) and res["grade"] != "-" and res["summary"] != "-"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 8, 16], help="1차 기준 수")
+    parser.add_argument("--sub", type=int, default=4, help="기준별 하위 항목 수")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--keys", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=0, help="키별 분당 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--latency", type=float, default=0.5, help="지연 중앙값 (초)")
+    parser.add_argument("--sigma", type=float, default=0.4, help="지연 로그정규 표준편차")
+    parser.add_argument("--quota-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--partial-rate", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    keys = [f"fake-key-{i}" for i in range(args.keys)]
+    header = f"{'mode':<11}{'groups':>7}{'p50(s)':>9}{'max(s)':>9}{'attempts/ok':>13}{'parse_ok':>10}{'ttfs(s)':>9}"
+    print(header)
+    print("-" * len(header))
+
+    for mode in args.modes:
+        for size in args.sizes:
+            goal, main_items, struct = make_hierarchy(size, args.sub)
+            groups = build_groups(goal, main_items, struct)
+            backend = FakeBackend(
+                latency=(args.latency, args.sigma), quota_rate=args.quota_rate,
+                malformed_rate=args.malformed_rate, partial_rate=args.partial_rate, seed=args.seed
+            )
+            set_backend(backend)
+            metrics.reset("diagnosis.ttfs")
+
+            elapsed, ok, total = [], 0, 0
+            for _ in range(args.repeat):
+                reset_scheduler(args.rpm)
+                started = time.perf_counter()
+                results = run_once(mode, goal, groups, keys, args.concurrency)
+                elapsed.append(time.perf_counter() - started)
+                ok += sum(parsed_ok(r) for r in results.values())
+                total += len(groups)
+
+            ttfs = metrics.summary("diagnosis.ttfs")
+            print(
+                f"{mode:<11}{len(groups):>7}{np.median(elapsed):>9.2f}{max(elapsed):>9.2f}"
+                f"{backend.calls / max(ok, 1):>13.2f}{ok / total:>10.1%}"
+                f"{(ttfs['p50'] if ttfs else float('nan')):>9.2f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""결과 분석 엔진 벤치마크 (합성 응답, 파일·네트워크 불필요)
+
+    python -m benchmarks.bench_results --respondents 1000 10000 --criteria 5 --sub 4 --partial-rate 0.1
+    python -m benchmarks.bench_results --respondents 10000 --resamples 10000 --workers 4
+    python -m benchmarks.bench_results --respondents 10000 50000 --stream     # 분할 분석의 최대 메모리 비교
+    python -m benchmarks.bench_results --respondents 10000 --export           # 리포트 내보내기 형식별 비교
+"""
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from core.aggregation import prepare, summarize
+from core.analysis_cache import AnalysisCache
+from core.export import available_formats, export_report, fingerprint, frame_sheet
+from core.report import build_report, group_ranking
+from core.response_state import code_weight
+from core.batch_ahp import analyze, compile_schema, long_table
+from core.streaming import analyze_stream
+from core.survey_plan import compile_plan, pair_key
+
+CODES = np.arange(-4, 5)
+
+def make_plan(n_criteria, n_sub):
+    main = [f"기준{i + 1}" for i in range(n_criteria)]
+    return compile_plan({"goal": "벤치마크 목표", "main_criteria": main,
+                         "sub_criteria": {c: [f"{c}-항목{j + 1}" for j in range(n_sub)] for c in main}})
+
+def make_responses(plan, count, partial_rate, seed):
+    """제출 형식과 같은 Raw_Data 문자열 목록 (partial_rate 비율은 일부 쌍만 응답)"""
+    rng = np.random.default_rng(seed)
+    raws = []
+    for _ in range(count):
+        partial = rng.random() < partial_rate
+        data = {}
+        for task in plan.tasks:
+            for p in task.pairs:
+                if partial and p.no >= len(task.items) - 1 and rng.random() < 0.5:
+                    continue
+                code = int(rng.choice(CODES))
+                data[pair_key(task, p)] = round(code_weight(code), 3)
+        raws.append(json.dumps(data))
+    return raws
+
+def _peak(fn):
+    """fn 실행 시간(초)과 실행 중 최대 메모리 할당량(MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak
+
+def bench_stream(plan, args):
+    """같은 응답 파일을 전체 적재(분석 캐시)와 분할 분석으로 계산해 시간·최대 메모리 비교"""
+    print(f"{'응답자':>8} {'파일(MB)':>9} {'전체(s)':>8} {'전체(MB)':>9} {'분할(s)':>8} {'분할(MB)':>9}")
+    for count in args.respondents:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.csv")
+            raws = make_responses(plan, count, args.partial_rate, args.seed)
+            pd.DataFrame({"Time": "t", "Respondent": [f"r{i}" for i in range(count)], "Raw_Data": raws}).to_csv(path, index=False)
+            del raws
+            full = _peak(lambda: AnalysisCache().result(path))
+            stream = _peak(lambda: analyze_stream(path, resamples=args.resamples))
+            print(f"{count:>8} {os.path.getsize(path) / 2 ** 20:>9.1f} {full[0]:>8.2f} {full[1]:>9.1f} {stream[0]:>8.2f} {stream[1]:>9.1f}")
+
+def bench_export(plan, args):
+    """전체 적재 분석 결과의 리포트를 이전 방식(pandas + openpyxl 일반 모드, 메모리 버퍼)과 형식별 기록기로 비교"""
+    print(f"{'응답자':>8} {'형식':>12} {'시간(s)':>8} {'최대(MB)':>9} {'크기(MB)':>9}")
+    for count in args.respondents:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.csv")
+            raws = make_responses(plan, count, args.partial_rate, args.seed)
+            pd.DataFrame({"Time": "t", "Respondent": [f"r{i}" for i in range(count)], "Raw_Data": raws}).to_csv(path, index=False)
+            df, result = AnalysisCache().result(path)
+            result, valid, status_df, _, personal_df = build_report(df, result)
+            ranking = group_ranking(result, valid, args.aggregation, "geometric", False, 0)
+            frames = {'종합_순위_분석': ranking, '개인별_상세_결과': personal_df, '응답자_현황_및_CR': status_df, '원본_RAW_데이터': df}
+
+            def eager():
+                buf = io.BytesIO()
+                with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+                    for name, frame in frames.items():
+                        frame.to_excel(writer, index=False, sheet_name=name)
+                return len(buf.getvalue())
+            size = [0]
+            elapsed, peak = _peak(lambda: size.__setitem__(0, eager()))
+            print(f"{count:>8} {'이전 xlsx':>12} {elapsed:>8.2f} {peak:>9.1f} {size[0] / 2 ** 20:>9.1f}")
+
+            sheets = [frame_sheet(name, frame) for name, frame in frames.items()]
+            for fmt in available_formats():
+                out = []
+                elapsed, peak = _peak(lambda: out.append(export_report(path, fingerprint(fmt, count), fmt, sheets)))
+                print(f"{count:>8} {fmt:>12} {elapsed:>8.2f} {peak:>9.1f} {out[0].size_mb:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--respondents", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--criteria", type=int, default=5, help="1차 기준 수")
+    parser.add_argument("--sub", type=int, default=4, help="기준별 하위 항목 수")
+    parser.add_argument("--partial-rate", type=float, default=0.1, help="적응형(일부 쌍만 응답) 비율")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--aggregation", default="aij")
+    parser.add_argument("--resamples", type=int, default=0, help="부트스트랩 재표본 수 (0이면 집계 점추정만)")
+    parser.add_argument("--workers", type=int, default=None, help="부트스트랩 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--stream", action="store_true", help="전체 적재와 분할 분석의 시간·최대 메모리 비교")
+    parser.add_argument("--export", action="store_true", help="리포트 내보내기 형식별 시간·최대 메모리 비교")
+    args = parser.parse_args()
+
+    plan = make_plan(args.criteria, args.sub)
+    if args.stream:
+        bench_stream(plan, args)
+        return
+    if args.export:
+        bench_export(plan, args)
+        return
+    schema = compile_schema(plan)
+    print(f"{'응답자':>8} {'분석(s)':>10} {'유효':>8} {'집계(s)':>10}")
+    for count in args.respondents:
+        raws = make_responses(plan, count, args.partial_rate, args.seed)
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = analyze(raws, schema=schema)
+            long_table(result)
+            best = min(best, time.perf_counter() - started)
+        valid = result.ok & (result.cr <= 0.1)
+        started = time.perf_counter()
+        summarize(prepare(result, valid, args.aggregation), args.resamples, args.seed, args.workers)
+        print(f"{count:>8} {best:>10.3f} {int(valid.sum()):>8} {time.perf_counter() - started:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import numpy as np
+
+from core.consistency import CR_LIMIT, _triads, consistency_ratio, principal_eigen, worst_triads
+from core.live_ranking import competition_ranks
+
+# --------------------------------------------------------------------------
+# 1. 불완전 비교행렬 추정 (로그 최소제곱법, LLSM)
+# --------------------------------------------------------------------------
+STABLE_ROUNDS = 2   # 추가 질문 후 순위가 이 횟수만큼 연속으로 그대로면 종료
+
+def llsm(n, answers):
+    """답변된 쌍만으로 로그 가중치 x를 추정: Σ (log a_ij - (x_i - x_j))² 최소, Σx = 0
+
+    answers: {(i, j): a_ij}. 비교 그래프의 라플라시안 L에 대해 L x = b 를 푼다.
+    반환: (x, L의 유사역행렬)
+    """
+    lap = np.zeros((n, n))
+    b = np.zeros(n)
+    for (i, j), a in answers.items():
+        r = np.log(a)
+        lap[i, i] += 1
+        lap[j, j] += 1
+        lap[i, j] -= 1
+        lap[j, i] -= 1
+        b[i] += r
+        b[j] -= r
+    lap_pinv = np.linalg.pinv(lap)
+    x = lap_pinv @ b
+    return x - x.mean(), lap_pinv
+
+def complete_matrix(n, answers, x):
+    """답변된 칸은 그대로, 나머지는 추정 가중치의 비율 exp(x_i - x_j)로 채운 행렬"""
+    m = np.exp(x[:, None] - x[None, :])
+    for (i, j), a in answers.items():
+        m[i, j] = a
+        m[j, i] = 1.0 / a
+    return m
+
+def incomplete_ahp(n, answers):
+    """불완전 비교의 (가중치, CR). 모든 쌍이 답변되어 있어도 그대로 사용 가능"""
+    x, _ = llsm(n, answers)
+    w = np.exp(x)
+    w = w / w.sum()
+    if n <= 2:
+        return w, 0.0
+    _, lam = principal_eigen(complete_matrix(n, answers, x), w)
+    return w, consistency_ratio(lam, n)
+
+# --------------------------------------------------------------------------
+# 2. 적응형 질문 선택
+# --------------------------------------------------------------------------
+class AdaptiveElicitation:
+    """순위 순서의 인접 쌍(신장 트리)에서 시작해, 가장 정보가 많은 쌍만 골라 묻는 모드
+
+    다음 질문은 추정 오차가 큰 쌍(비교 그래프의 유효 저항이 큼)과 가중치가 비슷해
+    순위가 바뀔 수 있는 쌍을 우선한다. 순위와 CR이 안정되면 종료한다.
+    """
+
+    def __init__(self, task, order):
+        self.task = task
+        self.n = len(task.items)
+        self.answers = {}
+        self.history = []
+        self.x = np.zeros(self.n)
+        self._lap_pinv = None
+        self.cr = 0.0
+        # 시작 질문: 응답자가 정한 순위에서 이웃한 항목끼리 (n - 1개로 모든 항목 연결)
+        self.initial = [task.pair_no[(order[k], order[k + 1])] for k in range(self.n - 1)]
+
+    def set(self, u, v, w):
+        self.answers[(u, v)] = w
+        self.answers.pop((v, u), None)
+        self.x, self._lap_pinv = llsm(self.n, self.answers)
+        if self.n > 2:
+            _, lam = principal_eigen(complete_matrix(self.n, self.answers, self.x), self.weights())
+            self.cr = consistency_ratio(lam, self.n)
+        self.history.append(tuple(self.ranks()))
+
+    def weights(self):
+        w = np.exp(self.x)
+        return w / w.sum()
+
+    def worst_triads(self, k=3):
+        """CR을 계산한 행렬(빈 칸은 추정값)에서 가장 모순된 삼각 관계 (consistency.worst_triads 참고)"""
+        answered = np.eye(self.n, dtype=bool)
+        for i, j in self.answers:
+            answered[i, j] = answered[j, i] = True
+        return worst_triads(complete_matrix(self.n, self.answers, self.x), answered, _triads(self.n), k, require_all=False)
+
+    def ranks(self):
+        return competition_ranks(self.weights())
+
+    def _asked(self):
+        return {self.task.pair_no[k] for k in self.answers}
+
+    def next_pair(self):
+        """아직 묻지 않은 쌍 중 가장 정보가 많은 쌍 번호 (없으면 None)"""
+        remaining = np.ones(len(self.task.pairs), dtype=bool)
+        remaining[list(self._asked())] = False
+        remaining = np.flatnonzero(remaining)
+        if not len(remaining):
+            return None
+        if self._lap_pinv is None:
+            return int(remaining[0])
+        lp = self._lap_pinv
+        u = self.task.pair_u[remaining]
+        v = self.task.pair_v[remaining]
+        resistance = lp[u, u] + lp[v, v] - 2 * lp[u, v]
+        closeness = 1.0 / (1.0 + np.abs(self.x[u] - self.x[v]))
+        return int(remaining[np.argmax(resistance * closeness)])
+
+    def is_done(self):
+        """시작 질문을 모두 마쳤고, 이후 순위가 연속으로 같으며 CR이 기준 이하면 종료"""
+        if len(self._asked()) >= len(self.task.pairs):
+            return True
+        if len(self.answers) < len(self.initial) + STABLE_ROUNDS:
+            return False
+        recent = self.history[-(STABLE_ROUNDS + 1):]
+        return self.cr <= CR_LIMIT and all(r == recent[0] for r in recent)
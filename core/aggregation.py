@@ -0,0 +1,192 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import NamedTuple
+
+import numpy as np
+
+from core.batch_ahp import DEFAULT_METHOD, matrix_weights
+from core.consistency import CR_LIMIT
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+AGGREGATIONS = ("aij", "aip_geometric", "aip_arithmetic")
+AGGREGATION_LABELS = {
+    "aij": "AIJ (판단 기하평균)",
+    "aip_geometric": "AIP (우선순위 기하평균)",
+    "aip_arithmetic": "AIP (우선순위 산술평균)",
+}
+DEFAULT_AGGREGATION = "aij"
+
+BOOTSTRAP_CHUNK = 250           # 한 번에 계산할 재표본 수 (재표본 × 응답자 배열 크기 제한)
+PARALLEL_MIN_WORK = 2_000_000   # 재표본 수 × 응답자 수가 이보다 작으면 프로세스 풀 없이 계산
+CI_LEVEL = 0.95
+
+# --------------------------------------------------------------------------
+# 2. 집계 입력 (유효 응답자만, 그룹별 배열)
+# --------------------------------------------------------------------------
+class GroupInput(NamedTuple):
+    group: object            # batch_ahp.Group
+    parent_idx: int          # 1차 기준 그룹이면 -1
+    log_judgments: np.ndarray   # (Rv, 쌍) 미응답 NaN
+    weights: np.ndarray         # (Rv, n) 미응답 NaN
+
+class AggregationInput(NamedTuple):
+    groups: list             # [1차 기준, 2차 그룹들...]
+    respondent_weights: np.ndarray   # (Rv,) 응답자 가중치 (CR 가중 또는 1)
+    aggregation: str
+    method: str
+
+def cr_weights(cr, limit=CR_LIMIT):
+    """일관성이 좋을수록 큰 응답자 가중치: 1 / (1 + CR / 기준) (0.5 ~ 1)"""
+    return 1.0 / (1.0 + np.clip(cr, 0, None) / limit)
+
+def prepare(result, valid, aggregation=DEFAULT_AGGREGATION, method=DEFAULT_METHOD, cr_weighted=False):
+    """batch_ahp.analyze 결과에서 유효 응답자(valid: (R,) bool)의 집계 입력을 만듦"""
+    rows = np.flatnonzero(valid)
+    groups = [GroupInput(result.main_group, -1, result.main_log_judgments[rows], result.main_weights[rows])]
+    for s in result.subs:
+        groups.append(GroupInput(s.group, s.parent_idx, s.log_judgments[rows], s.weights[rows]))
+    alpha = cr_weights(result.cr[rows]) if cr_weighted else np.ones(len(rows))
+    return AggregationInput(groups, alpha, aggregation, method)
+
+# --------------------------------------------------------------------------
+# 3. 집계 (재표본 가중치 행렬 하나로 점추정과 부트스트랩을 같이 처리)
+# --------------------------------------------------------------------------
+def group_sums(g, weights, aggregation):
+    """그룹 하나의 집계용 가중 합 (분자, 분모): 응답자 가중치 (B, Rv) -> 각 (B, 열). 값이 없는 칸은 제외
+
+    합은 응답자 방향으로 더할 수 있으므로 응답자를 나눠 계산한 값을 이어서 더해도 같다 (core.streaming).
+    """
+    if aggregation == "aij":
+        values = g.log_judgments
+    elif aggregation == "aip_geometric":
+        with np.errstate(divide="ignore"):
+            values = np.log(g.weights)
+    else:
+        values = g.weights
+    present = ~np.isnan(values)
+    return weights @ np.where(present, values, 0.0), weights @ present
+
+def local_weights(num, den, group, aggregation, method=DEFAULT_METHOD):
+    """가중 합 (B, 열)로부터 그룹의 집계 가중치 (B, n)"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(den > 0, num / den, np.nan)
+    if aggregation == "aij":
+        # 판단의 가중 기하평균으로 만든 집단 비교행렬에서 가중치 도출
+        present = ~np.isnan(mean)
+        a = np.exp(np.where(present, mean, 0.0))
+        n = len(group.items)
+        m = np.ones((len(mean), n, n))
+        m[:, group.u, group.v] = a
+        m[:, group.v, group.u] = 1.0 / a
+        w, _ = matrix_weights(m, present, group, method)
+    elif aggregation == "aip_geometric":
+        w = np.exp(mean)
+    else:
+        w = mean
+    return w / np.nansum(w, axis=1, keepdims=True)
+
+def combine(main, subs, parent_idx):
+    """1차 가중치 (B, n)와 2차 가중치 [(B, k)...] -> 종합 가중치 (B, 전체 2차 항목)"""
+    total = [main[:, [p]] * sw for p, sw in zip(parent_idx, subs)]
+    return np.concatenate(total, axis=1) if total else np.zeros((len(main), 0))
+
+def aggregate(inp, weights):
+    """응답자 가중치 행렬 (B, Rv) -> (1차 가중치 (B, n), [2차 가중치 (B, k)...], 종합 가중치 (B, 전체 2차 항목))"""
+    local = [local_weights(*group_sums(g, weights, inp.aggregation), g.group, inp.aggregation, inp.method)
+             for g in inp.groups]
+    return local[0], local[1:], combine(local[0], local[1:], [g.parent_idx for g in inp.groups[1:]])
+
+# --------------------------------------------------------------------------
+# 4. 부트스트랩 (응답자 재표본, 프로세스 풀로 묶음 단위 병렬 처리)
+# --------------------------------------------------------------------------
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_pool(workers):
+    """프로세스 전체에서 재사용하는 부트스트랩 작업자 풀 (처음 쓸 때 만들고 종료 시 정리)
+
+    작업자 수가 달라지면 새로 만든다. 스레드가 많은 서버 프로세스에서 fork하지 않도록 spawn 사용.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is None:
+                atexit.register(shutdown_pool)
+            else:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _bootstrap_chunk(seed, size, inp):
+    """재표본 size개의 종합 가중치 (size, 항목). 재표본은 응답자별 뽑힌 횟수로 표현"""
+    rng = np.random.default_rng(seed)
+    rv = len(inp.respondent_weights)
+    picks = rng.integers(0, rv, size=(size, rv)) + np.arange(size)[:, None] * rv
+    counts = np.bincount(picks.ravel(), minlength=size * rv).reshape(size, rv)
+    return aggregate(inp, counts * inp.respondent_weights)[2]
+
+def bootstrap(inp, resamples, seed=0, workers=None):
+    """재표본별 종합 가중치 (resamples, 항목)"""
+    sizes = [min(BOOTSTRAP_CHUNK, resamples - s) for s in range(0, resamples, BOOTSTRAP_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    rv = len(inp.respondent_weights)
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(sizes) <= 1 or resamples * rv < PARALLEL_MIN_WORK:
+        parts = [_bootstrap_chunk(sd, size, inp) for sd, size in zip(seeds, sizes)]
+    else:
+        # 풀은 분석마다 만들지 않고 재사용하므로 입력은 묶음마다 함께 보냄 (묶음 수는 재표본 수 / BOOTSTRAP_CHUNK)
+        try:
+            pool = _get_pool(workers)
+            parts = list(pool.map(_bootstrap_chunk, seeds, sizes, [inp] * len(sizes)))
+        except BrokenProcessPool:
+            # 작업자가 비정상 종료되면 풀을 버리고 이번 계산은 이 프로세스에서 마침
+            shutdown_pool()
+            parts = [_bootstrap_chunk(sd, size, inp) for sd, size in zip(seeds, sizes)]
+    return np.concatenate(parts, axis=0)
+
+def _ranks(weights):
+    """가중치 내림차순 순위 (행별, 1부터)"""
+    order = np.argsort(-np.nan_to_num(weights, nan=-np.inf), axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, weights.shape[-1] + 1)[None, :].repeat(len(weights), 0), axis=-1)
+    return ranks
+
+class Summary(NamedTuple):
+    main: np.ndarray         # (n,) 집계 1차 가중치
+    subs: list               # [(k,) 집계 2차 가중치...]
+    total: np.ndarray        # (항목,) 집계 종합 가중치
+    ci_low: np.ndarray       # 부트스트랩 없으면 None
+    ci_high: np.ndarray
+    rank_stability: np.ndarray   # 재표본에서 점추정 순위가 그대로인 비율
+
+def summarize(inp, resamples=0, seed=0, workers=None, level=CI_LEVEL):
+    """점추정 + (resamples > 0이면) 백분위 신뢰구간과 순위 안정성"""
+    main, subs, total = aggregate(inp, inp.respondent_weights[None, :])
+    main, subs, total = main[0], [s[0] for s in subs], total[0]
+    if resamples <= 0 or not len(inp.respondent_weights):
+        return Summary(main, subs, total, None, None, None)
+
+    return with_intervals(main, subs, total, bootstrap(inp, resamples, seed, workers), level)
+
+def with_intervals(main, subs, total, boot, level=CI_LEVEL):
+    """재표본별 종합 가중치 (B, 항목)로 백분위 신뢰구간과 순위 안정성을 붙인 Summary"""
+    tail = (1 - level) / 2 * 100
+    low, high = np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+    stability = (_ranks(boot) == _ranks(total[None, :])).mean(axis=0)
+    return Summary(main, subs, total, low, high, stability)
@@ -0,0 +1,206 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.batch_ahp import (
+    DEFAULT_METHOD, analyze_values, compile_schema, concat_results, decode, empty_report, infer_schema,
+    merge_reports, schema_report, select_rows
+)
+from core.submission_store import file_identity, read_responses_since
+from core.survey_plan import plan_for_data_file
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+MAX_FILES = 8       # 메모리에 분석 상태를 유지할 최대 파일 수
+
+def row_hash(time_value, respondent, raw):
+    """응답 행 내용의 해시 (파일이 재구성되어도 같은 행을 알아보기 위함)"""
+    payload = "\x1f".join(str(v) for v in (time_value, respondent, raw))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+def _row_hashes(frame):
+    cols = [frame[c] if c in frame else [""] * len(frame) for c in ("Time", "Respondent", "Raw_Data")]
+    return [row_hash(*r) for r in zip(*cols)]
+
+# --------------------------------------------------------------------------
+# 2. 파일별 분석 상태
+# --------------------------------------------------------------------------
+class FileAnalysis:
+    """한 프로젝트 파일의 읽은 위치, 행 해시, 해독된 값, 방법별 계산 결과"""
+
+    __slots__ = ("plan", "schema", "bad_keys", "identity", "offset", "frame", "hashes", "columns",
+                 "values", "ok", "report", "results", "memo")
+
+    def __init__(self, plan=None):
+        self.plan = plan        # 응답 파일을 기록한 설문 정의 (없으면 응답 키에서 스키마 추론)
+        self.schema = compile_schema(plan) if plan is not None else None
+        self.bad_keys = []
+        self.identity = None
+        self.offset = 0
+        self.frame = pd.DataFrame()
+        self.hashes = []
+        self.columns = self.schema.columns if self.schema else {}   # 응답 키 -> 열 번호
+        self.values = np.zeros((0, len(self.columns)))
+        self.ok = np.zeros(0, dtype=bool)
+        self.report = empty_report()    # 해독 문제 (None이면 다음 조회 때 다시 셈)
+        self.results = {}       # 계산 방법 -> BatchResult (앞에서부터 len(result.ok)행)
+        self.memo = {}          # 집계 등 파생 결과 (행이 바뀌면 비움)
+
+    def _decode(self, frame):
+        """새 행들의 해독 결과를 기존 열 배치에 맞춰 반환 (추론 스키마에서 새 키가 나오면 기존 값 배열도 넓힘)"""
+        fixed = self.plan is not None
+        values, keys, ok, report = decode(frame["Raw_Data"].tolist(), self.columns, extend=not fixed)
+        if self.report is not None:
+            self.report = merge_reports(self.report, report)
+        if not fixed and (self.schema is None or len(self.schema.keys) < len(keys)):
+            if self.values.shape[1] < len(keys):
+                pad = np.full((len(self.values), len(keys) - self.values.shape[1]), np.nan)
+                self.values = np.hstack([self.values, pad])
+            self.schema, self.bad_keys = infer_schema(keys)
+            self.results.clear()    # 그룹 구조가 바뀔 수 있으므로 전체 재계산 (해독은 재사용)
+        return values, ok
+
+    def append(self, frame):
+        """파일 끝에 추가된 행만 해독"""
+        if frame.empty:
+            return
+        values, ok = self._decode(frame)
+        self.frame = pd.concat([self.frame, frame], ignore_index=True) if len(self.frame) else frame.reset_index(drop=True)
+        self.hashes.extend(_row_hashes(frame))
+        self.values = np.vstack([self.values, values]) if len(self.values) else values
+        self.ok = np.concatenate([self.ok, ok])
+        self.memo = {}          # 진행 중인 계산이 이전 dict에 써도 새 상태에는 섞이지 않음
+
+    def replace(self, frame):
+        """파일이 재구성된 경우: 해시가 같은 행은 이전 해독·계산 결과를 재사용하고 나머지만 해독"""
+        hashes = _row_hashes(frame)
+        known = {h: i for i, h in enumerate(self.hashes)}
+        old_pos = np.array([known.get(h, -1) for h in hashes], dtype=int)
+        fresh = np.flatnonzero(old_pos < 0)
+
+        values, ok = self._decode(frame.iloc[fresh]) if len(fresh) else (np.zeros((0, len(self.columns))), np.zeros(0, dtype=bool))
+        # 이전 행 + 새 행을 하나로 이어 두고, 파일 순서대로 골라 씀
+        pool_values = np.vstack([self.values, values]) if len(values) else self.values
+        pool_ok = np.concatenate([self.ok, ok])
+        idx = old_pos.copy()
+        idx[fresh] = len(self.values) + np.arange(len(fresh))
+
+        if len(set(self.hashes) - set(hashes)):
+            self.report = None      # 빠진 행의 문제 수를 알 수 없으므로 다시 셈
+        if len(fresh):
+            self.results.clear()
+        else:
+            self.results = {m: select_rows(r, idx) for m, r in self.results.items() if len(r.ok) == len(self.values)}
+        self.frame = frame.reset_index(drop=True)
+        self.hashes = hashes
+        self.values = pool_values[idx] if len(idx) else np.zeros((0, len(self.columns)))
+        self.ok = pool_ok[idx] if len(idx) else np.zeros(0, dtype=bool)
+        self.memo = {}
+
+    def result(self, method):
+        """method로 계산한 전체 행의 결과. 이전 계산 이후 추가된 행만 계산해 이어 붙임"""
+        prev = self.results.get(method)
+        done = 0 if prev is None else len(prev.ok)
+        if prev is not None and done == len(self.values):
+            return prev
+        schema = self.schema or infer_schema([])[0]
+        new = analyze_values(self.values[done:], schema, self.ok[done:], method=method)
+        if prev is not None and prev.main_group is not None and new.main_group is not None:
+            res = concat_results(prev, new)
+        else:
+            res = analyze_values(self.values, schema, self.ok, method=method) if done else new
+        self.results[method] = res
+        return res
+
+    def decode_report(self):
+        """지금까지 읽은 행 전체의 해독 문제 (batch_ahp.DecodeReport)"""
+        if self.report is None:
+            _, _, _, self.report = decode(self.frame["Raw_Data"].tolist(), dict(self.columns), extend=self.plan is None)
+        if self.plan is None and self.schema is not None:
+            return merge_reports(self.report, schema_report(self.values, self.schema, self.bad_keys))
+        return self.report
+
+# --------------------------------------------------------------------------
+# 3. 프로세스 공용 캐시
+# --------------------------------------------------------------------------
+class AnalysisCache:
+    def __init__(self, max_files=MAX_FILES):
+        self.max_files = max_files
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, csv_path):
+        """파일의 최신 상태로 갱신된 분석 상태 (호출자가 잠금 보유)"""
+        entry = self._files.get(csv_path)
+        identity = file_identity(csv_path)
+        if identity is None:
+            self._files.pop(csv_path, None)
+            raise FileNotFoundError(csv_path)
+
+        plan = plan_for_data_file(csv_path)
+        if entry is None or entry.plan is not plan:
+            # 처음 보거나 설문 정의가 바뀜 (load_plan은 정의가 같으면 같은 객체를 돌려줌)
+            entry = FileAnalysis(plan)
+            self._files[csv_path] = entry
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        self._files.move_to_end(csv_path)
+
+        if entry.identity == identity:
+            frame, entry.offset, _ = read_responses_since(csv_path, entry.offset, list(entry.frame.columns))
+            entry.append(frame)
+        else:
+            # 처음 읽거나 파일이 통째로 교체됨
+            frame, entry.offset, entry.identity = read_responses_since(csv_path, 0)
+            if entry.hashes:
+                entry.replace(frame)
+            else:
+                entry.append(frame)
+        return entry
+
+    def frame(self, csv_path):
+        """응답 원본 DataFrame (새로 추가된 행만 읽어 이어 붙임)"""
+        with self._lock:
+            return self._entry(csv_path).frame
+
+    def result(self, csv_path, method=DEFAULT_METHOD):
+        """(응답 DataFrame, batch_ahp.BatchResult). 새 행만 해독·계산"""
+        with self._lock:
+            entry = self._entry(csv_path)
+            return entry.frame, entry.result(method)
+
+    def report(self, csv_path):
+        """해독 문제 (정의에 없는 키, 숫자가 아닌 값, JSON이 아닌 응답)"""
+        with self._lock:
+            return self._entry(csv_path).decode_report()
+
+    def memo(self, csv_path, key, compute):
+        """행이 바뀌지 않았으면 key로 저장해 둔 파생 결과를 재사용 (계산은 잠금 밖에서)"""
+        with self._lock:
+            entry = self._entry(csv_path)
+            if key in entry.memo:
+                return entry.memo[key]
+            memo = entry.memo
+        value = compute()
+        with self._lock:
+            memo[key] = value   # 그사이 행이 추가되었으면 버려진 이전 memo에만 남음
+        return value
+
+    def invalidate(self, csv_path):
+        with self._lock:
+            self._files.pop(csv_path, None)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_analysis_cache():
+    """프로세스 전체에서 공유하는 분석 캐시"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnalysisCache()
+        return _cache
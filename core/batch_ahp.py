@@ -0,0 +1,452 @@
+import json
+from collections import Counter
+from typing import NamedTuple
+
+import numpy as np
+
+from core.consistency import consistency_ratio, principal_eigen_batch
+from core.survey_plan import MAIN_TASK_NAME, pair_key
+
+# --------------------------------------------------------------------------
+# 1. 응답 스키마 (응답 키 -> 열 번호, 그룹별 항목·쌍 배치)
+# --------------------------------------------------------------------------
+INVALID_CR = 9.9    # 해독할 수 없는 응답의 CR 표시값
+
+def ratio_scale(values):
+    """저장된 값 -> 비교값. 설문은 a[u][v] 비율(response_state.code_weight)을 그대로 저장하므로
+    양의 유한값만 쓰고, 나머지(0·음수·무한대)는 NaN(미응답)으로 둔다. 역수는 stack_matrices가 값에서 구함"""
+    with np.errstate(invalid="ignore"):
+        return np.where((values > 0) & np.isfinite(values), values, np.nan)
+
+class Group(NamedTuple):
+    name: str
+    items: list
+    cols: np.ndarray     # 이 그룹 키들의 열 번호
+    u: np.ndarray        # 키별 항목 인덱스 (a vs b -> u, v)
+    v: np.ndarray
+
+class Schema(NamedTuple):
+    keys: list           # 열 순서의 응답 키
+    columns: dict        # 응답 키 -> 열 번호
+    groups: list         # [Group]
+    parents: list        # 그룹별 상위 1차 기준 인덱스 (1차 기준 그룹 -1, 상위를 찾지 못한 그룹 None)
+    fixed: bool          # 설문 정의에서 만든 스키마 (정의에 없는 키는 열을 만들지 않음)
+
+def compile_schema(plan):
+    """설문 정의(survey_plan.SurveyPlan)의 과제·쌍 테이블로 만든 스키마. 과제별 열은 쌍 번호 순으로 연속"""
+    keys, groups, parents = [], [], []
+    main_index = {c: i for i, c in enumerate(plan.main_criteria)}
+    for task in plan.tasks:
+        start = len(keys)
+        keys.extend(pair_key(task, p) for p in task.pairs)
+        groups.append(Group(task.name, list(task.items), np.arange(start, len(keys)),
+                            task.pair_u.astype(int), task.pair_v.astype(int)))
+        parents.append(-1 if task.parent is None else main_index.get(task.parent))
+    return Schema(keys, {k: i for i, k in enumerate(keys)}, groups, parents, True)
+
+def _bracket_end(text):
+    """'[...]'로 시작하는 문자열에서 짝이 맞는 닫는 대괄호 위치 (없으면 -1)"""
+    if not text.startswith("["):
+        return -1
+    depth = 0
+    for i, ch in enumerate(text):
+        depth += (ch == "[") - (ch == "]")
+        if depth == 0:
+            return i
+    return -1
+
+def _split_key(key):
+    """'[과제] A vs B' -> (과제, A, B). 과제 이름 안의 대괄호는 짝을 맞춰 읽음. 형식이 다르면 None"""
+    end = _bracket_end(key)
+    if end < 0:
+        return None
+    parts = key[end + 1:].strip().split(" vs ")
+    if len(parts) != 2:
+        return None
+    return key[1:end], parts[0].strip(), parts[1].strip()
+
+def _reverse_key(key):
+    """'[과제] A vs B' -> '[과제] B vs A' (형식이 다르면 None)"""
+    split = _split_key(key)
+    return None if split is None else f"[{split[0]}] {split[2]} vs {split[1]}"
+
+def canonical_keys(keys):
+    """같은 쌍의 두 방향 키 중 먼저 나온 것만 남긴 키 목록
+
+    이전 설문은 응답자가 정한 순위 순서로 키를 만들었으므로 한 파일에 'A vs B'와 'B vs A'가 섞여 있다.
+    decode는 뒤에 나온 방향을 앞의 열에 역수로 합치므로, 키만 모아 스키마를 만들 때도 같은 열 배치가 되게 한다.
+    """
+    seen = {}
+    for key in keys:
+        if key not in seen and _reverse_key(key) not in seen:
+            seen[key] = None
+    return list(seen)
+
+def infer_schema(keys):
+    """설문 정의를 찾을 수 없는 응답 파일용: 키 이름에서 그룹·항목을 읽어 만든 스키마 (처음 나온 순서 유지)
+
+    반환: (스키마, 형식이 맞지 않는 키 목록)
+    """
+    acc, malformed = {}, []
+    for col, key in enumerate(keys):
+        split = _split_key(key)
+        if split is None:
+            malformed.append(key)
+            continue
+        group, a, b = split
+        items, cols, us, vs = acc.setdefault(group, ({}, [], [], []))
+        cols.append(col)
+        us.append(items.setdefault(a, len(items)))
+        vs.append(items.setdefault(b, len(items)))
+    groups = [
+        Group(name, list(items), np.array(cols, dtype=int), np.array(us, dtype=int), np.array(vs, dtype=int))
+        for name, (items, cols, us, vs) in acc.items()
+    ]
+
+    # 1차 기준 과제: 현재 이름, 없으면 이전 버전 설문의 이름 규칙
+    main = next((g for g in groups if g.name == MAIN_TASK_NAME), None)
+    if main is None:
+        main = next((g for g in groups if "1." in g.name or "기준" in g.name), None)
+    parents = []
+    for g in groups:
+        if g is main:
+            parents.append(-1)
+        elif main is None:
+            parents.append(None)
+        else:
+            end = _bracket_end(g.name)    # '[A] 세부 항목' -> 'A'
+            inner = g.name[1:end] if end > 0 else None
+            idx = main.items.index(inner) if inner in main.items else None
+            if idx is None:
+                idx = next((i for i, it in enumerate(main.items) if it in g.name), None)
+            parents.append(idx)
+    return Schema(list(keys), {k: i for i, k in enumerate(keys)}, groups, parents, False), malformed
+
+# --------------------------------------------------------------------------
+# 2. 응답 해독 (전체 응답자를 한 번에 열 단위 배열로)
+# --------------------------------------------------------------------------
+class DecodeReport(NamedTuple):
+    bad_rows: int        # JSON 객체가 아닌 응답 수
+    unknown: Counter     # 설문 정의에 없는 키 -> 응답 수 (반대 방향 키는 해당 쌍의 열에 역수로 합쳐지므로 제외)
+    malformed: Counter   # 값이 숫자가 아니거나 형식이 맞지 않는 키 -> 응답 수
+
+    def __bool__(self):
+        return bool(self.bad_rows or self.unknown or self.malformed)
+
+def empty_report():
+    return DecodeReport(0, Counter(), Counter())
+
+def merge_reports(*reports):
+    return DecodeReport(sum(r.bad_rows for r in reports),
+                        sum((r.unknown for r in reports), Counter()),
+                        sum((r.malformed for r in reports), Counter()))
+
+def _floats(vals, keys, malformed):
+    """값 목록 -> float 목록. 숫자가 아닌 값은 NaN(미응답)으로 두고 보고"""
+    try:
+        return [float(v) for v in vals]
+    except (TypeError, ValueError):
+        out = []
+        for k, v in zip(keys, vals):
+            try:
+                out.append(float(v))
+            except (TypeError, ValueError):
+                malformed[k] += 1
+                out.append(np.nan)
+        return out
+
+def decode(raw_values, columns=None, extend=True):
+    """Raw_Data 문자열 목록 -> (키별 값 배열 (R, K), 키 목록, 해독 성공 여부 (R,), DecodeReport)
+
+    응답자들은 대개 같은 키 순서를 가지므로, 키 순서(레이아웃)별 열 번호를 한 번만 구하고
+    같은 레이아웃의 값들을 묶어서 한 번에 채운다. columns(키 -> 열 번호)를 주면 그 배치를 쓰고,
+    extend이면 처음 보는 키에 새 열을 붙이며 아니면(설문 정의 스키마) 버리고 보고한다.
+    반대 방향 키('B vs A')는 새 열을 만들지 않고 'A vs B' 열에 역수(1/값)로 넣는다.
+    """
+    columns = {} if columns is None else columns
+    layouts = {}        # 키 순서 -> (열 번호 배열, 남길 값 위치, 역수로 넣을 값, 버린 키, 응답자 위치 목록, 값 목록)
+    ok = np.ones(len(raw_values), dtype=bool)
+    bad_rows, unknown, malformed = 0, Counter(), Counter()
+    for r, raw in enumerate(raw_values):
+        try:
+            data = json.loads(raw)
+            keys = tuple(data)
+        except (TypeError, ValueError):
+            data = None
+        if not isinstance(data, dict):
+            ok[r] = False
+            bad_rows += 1
+            continue
+        layout = layouts.get(keys)
+        if layout is None:
+            idx, keep, flip, dropped = [], [], [], []
+            for i, k in enumerate(keys):
+                col, rev = columns.get(k), False
+                if col is None:
+                    col = columns.get(_reverse_key(k))
+                    rev = col is not None
+                if col is None and extend:
+                    col = columns[k] = len(columns)
+                if col is None:
+                    dropped.append(k)
+                    continue
+                idx.append(col)
+                keep.append(i)
+                flip.append(rev)
+            layout = layouts[keys] = (np.array(idx, dtype=int), keep, np.array(flip, dtype=bool), dropped, [], [])
+        idx, keep, _, dropped, rows, vals = layout
+        unknown.update(dropped)
+        row = list(data.values())
+        rows.append(r)
+        vals.append(_floats([row[i] for i in keep], [keys[i] for i in keep], malformed))
+
+    values = np.full((len(raw_values), len(columns)), np.nan)
+    for idx, _, flip, _, rows, vals in layouts.values():
+        if len(idx):
+            vals = np.array(vals, dtype=float)
+            if flip.any():
+                with np.errstate(divide="ignore"):
+                    vals[:, flip] = 1.0 / vals[:, flip]     # 0은 무한대가 되어 ratio_scale에서 미응답 처리
+            values[np.ix_(rows, idx)] = vals
+    return values, list(columns), ok, DecodeReport(bad_rows, unknown, malformed)
+
+def decode_schema(raw_values, schema=None):
+    """설문 정의 스키마로 해독. 스키마가 없으면 응답 키에서 추론 -> (값 (R, K), 스키마, 해독 성공 여부, 보고)"""
+    if schema is not None:
+        values, _, ok, report = decode(raw_values, schema.columns, extend=False)
+        return values, schema, ok, report
+    values, keys, ok, report = decode(raw_values)
+    schema, bad_keys = infer_schema(keys)
+    return values, schema, ok, merge_reports(report, schema_report(values, schema, bad_keys))
+
+def schema_report(values, schema, bad_keys):
+    """추론한 스키마에서 형식이 맞지 않는 키와 상위 기준을 찾지 못한 그룹의 키별 응답 수"""
+    answered = (~np.isnan(values)).sum(axis=0)
+    malformed = Counter({k: int(answered[schema.columns[k]]) for k in bad_keys})
+    unknown = Counter({schema.keys[c]: int(answered[c])
+                       for g, parent in zip(schema.groups, schema.parents) if parent is None for c in g.cols})
+    return DecodeReport(0, +unknown, +malformed)
+
+# --------------------------------------------------------------------------
+# 3. 그룹별 (R, n, n) 비교행렬 묶음과 일괄 가중치·CR
+# --------------------------------------------------------------------------
+def stack_matrices(values, group, scale=ratio_scale):
+    """응답자 전체의 비교행렬 (R, n, n)과 응답된 쌍 수 (R,)"""
+    n = len(group.items)
+    cols = group.cols
+    if len(cols) and (np.diff(cols) == 1).all():
+        vals = values[:, cols[0]:cols[-1] + 1]     # 이어진 열(그룹 전용 블록 포함)은 복사 없는 뷰로 읽음
+    else:
+        vals = values[:, cols]
+    s = scale(vals)        # 척도 변환 결과와 아래 (R, n, n) 행렬은 그룹마다 새로 만듦
+    present = ~np.isnan(s)
+    m = np.ones((len(values), n, n))
+    if present.all():
+        m[:, group.u, group.v] = s
+        m[:, group.v, group.u] = 1.0 / s
+    else:
+        # 응답한 칸만 씀 (미응답 칸의 1이 같은 쌍의 다른 열에서 온 값을 덮지 않도록)
+        rows, cols = np.nonzero(present)
+        m[rows, group.u[cols], group.v[cols]] = s[rows, cols]
+        m[rows, group.v[cols], group.u[cols]] = 1.0 / s[rows, cols]
+    return m, present
+
+# 우선순위 도출 방법: (R, n, n) -> 가중치 (R, n)
+def geometric_mean(m):
+    """행 기하평균"""
+    g = np.exp(np.log(m).mean(axis=2))
+    return g / g.sum(axis=1, keepdims=True)
+
+def normalized_column(m):
+    """열 합으로 나눈 행렬의 행 평균"""
+    return (m / m.sum(axis=1, keepdims=True)).mean(axis=2)
+
+def eigenvector(m):
+    """주고유벡터 (기하평균에서 출발한 일괄 거듭제곱법)"""
+    return principal_eigen_batch(m, geometric_mean(m))[0]
+
+METHODS = {"geometric": geometric_mean, "eigenvector": eigenvector, "column": normalized_column}
+METHOD_LABELS = {"geometric": "기하평균", "eigenvector": "고유벡터 (Saaty)", "column": "정규화 열 평균"}
+DEFAULT_METHOD = "geometric"
+
+def derive(m, method=DEFAULT_METHOD):
+    """선택한 방법의 가중치 (R, n)와 실제 λmax로 계산한 CR (R,)"""
+    n = m.shape[1]
+    if method == "eigenvector":
+        w, lam = principal_eigen_batch(m, geometric_mean(m))
+    else:
+        w = METHODS[method](m)
+        if n <= 2:
+            return w, np.zeros(len(m))
+        _, lam = principal_eigen_batch(m, w)
+    if n <= 2:
+        return w, np.zeros(len(m))
+    return w, consistency_ratio(lam, n)
+
+def _partial_weights(m, present, group, method):
+    """일부 쌍만 응답한 사람들: 응답 패턴이 같은 사람끼리 묶어 로그 최소제곱(LLSM)으로 추정
+
+    같은 패턴이면 비교 그래프의 라플라시안이 같으므로 유사역행렬은 패턴마다 한 번만 구한다.
+    기하평균 외의 방법은 빈 칸을 LLSM 추정 비율로 채운 행렬에 적용한다.
+    """
+    R, n, _ = m.shape
+    w = np.full((R, n), np.nan)
+    cr = np.zeros(R)
+    patterns, inverse = np.unique(present, axis=0, return_inverse=True)
+    for p, pattern in enumerate(patterns):
+        rows = np.flatnonzero(inverse.ravel() == p)
+        cols = np.flatnonzero(pattern)
+        touched = np.unique(np.r_[group.u[cols], group.v[cols]])
+        k = len(touched)
+        local = np.searchsorted(touched, np.arange(n))
+        lu, lv = local[group.u[cols]], local[group.v[cols]]
+        sub = m[rows][:, touched][:, :, touched]
+
+        if len(cols) == k * (k - 1) // 2:
+            # 응답한 항목끼리는 모두 비교한 경우 (항목 수가 다른 설문)
+            lw, lcr = derive(sub, method)
+        else:
+            # 결합 행렬 B (k, 쌍): L = B Bᵀ, b = B log a
+            inc = np.zeros((k, len(cols)))
+            inc[lu, np.arange(len(cols))] = 1.0
+            inc[lv, np.arange(len(cols))] = -1.0
+            lap_pinv = np.linalg.pinv(inc @ inc.T)
+            x = np.log(sub[:, lu, lv]) @ inc.T @ lap_pinv
+            x -= x.mean(axis=1, keepdims=True)
+            lw = np.exp(x)
+            lw /= lw.sum(axis=1, keepdims=True)
+            if k <= 2:
+                lcr = np.zeros(len(rows))
+            else:
+                # 빈 칸은 추정 가중치의 비율로 채운 행렬의 λmax
+                full = np.exp(x[:, :, None] - x[:, None, :])
+                full[:, lu, lv] = sub[:, lu, lv]
+                full[:, lv, lu] = 1.0 / sub[:, lu, lv]
+                method_w, lcr = derive(full, method)
+                if method != "geometric":
+                    lw = method_w
+        w[np.ix_(rows, touched)] = lw
+        cr[rows] = lcr
+    return w, cr
+
+def matrix_weights(m, present, group, method=DEFAULT_METHOD):
+    """비교행렬 묶음 (R, n, n)과 응답 여부 (R, 쌍) -> (가중치 (R, n), CR (R,)). 응답하지 않은 항목은 NaN
+
+    모든 쌍을 응답한 행은 한 번에 계산하고, 일부만 응답한 행(적응형 모드)은 패턴별로 추정한다.
+    """
+    w, cr = derive(m, method)
+
+    n = len(group.items)
+    answered = present.any(axis=1)
+    partial = answered & (present.sum(axis=1) < n * (n - 1) // 2)
+    if partial.any():
+        rows = np.flatnonzero(partial)
+        w[rows], cr[rows] = _partial_weights(m[rows], present[rows], group, method)
+    w[~answered] = np.nan
+    cr[~answered] = np.nan
+    return w, cr
+
+def group_weights(values, group, scale=ratio_scale, method=DEFAULT_METHOD):
+    """그룹의 응답자별 (가중치 (R, n), CR (R,), 로그 비교값 (R, 쌍; 미응답 NaN))"""
+    m, present = stack_matrices(values, group, scale)
+    w, cr = matrix_weights(m, present, group, method)
+    log_judgments = np.where(present, np.log(m[:, group.u, group.v]), np.nan)
+    return w, cr, log_judgments
+
+# --------------------------------------------------------------------------
+# 4. 계층 결합 (1차 가중치를 브로드캐스팅으로 2차 항목에 전파)
+# --------------------------------------------------------------------------
+class SubResult(NamedTuple):
+    parent: str
+    parent_idx: int
+    items: list
+    weights: np.ndarray      # (R, k) 2차 가중치
+    global_weights: np.ndarray
+    group: Group
+    log_judgments: np.ndarray
+
+class BatchResult(NamedTuple):
+    ok: np.ndarray           # (R,) 분석 가능한 응답
+    cr: np.ndarray           # (R,) 그룹 중 최대 CR
+    main_items: list
+    main_weights: np.ndarray # (R, n)
+    subs: list
+    main_group: Group = None
+    main_log_judgments: np.ndarray = None
+
+def analyze(raw_values, scale=ratio_scale, method=DEFAULT_METHOD, schema=None):
+    """전체 응답의 가중치·CR을 그룹 단위 배열 연산으로 계산 (method: METHODS의 키, schema: 없으면 키에서 추론)"""
+    values, schema, ok, _ = decode_schema(raw_values, schema)
+    return analyze_values(values, schema, ok, scale, method)
+
+def analyze_values(values, schema, ok, scale=ratio_scale, method=DEFAULT_METHOD):
+    """해독된 값 배열 (R, K)로부터 계산 (캐시된 해독 결과를 다시 쓸 때)"""
+    return analyze_groups([(g, values) for g in schema.groups], schema.parents, ok, scale, method)
+
+def analyze_groups(blocks, parents, ok, scale=ratio_scale, method=DEFAULT_METHOD):
+    """그룹별 값 배열 [(Group, (R, 열)), ...]과 그룹별 상위 1차 기준 인덱스로부터 계산. 배열은 메모리 매핑된 블록이어도 됨"""
+    ok = np.array(ok, dtype=bool)
+    main = next(((g, v) for (g, v), p in zip(blocks, parents) if p == -1), None)
+    R = len(ok)
+    if main is None:
+        return BatchResult(np.zeros(R, dtype=bool), np.full(R, INVALID_CR), [], np.zeros((R, 0)), [])
+    main, main_values = main
+
+    main_w, cr, main_lj = group_weights(main_values, main, scale, method)
+    ok &= ~np.isnan(cr)
+    cr = np.where(ok, cr, INVALID_CR)
+
+    subs = []
+    for (g, values), parent_idx in zip(blocks, parents):
+        if parent_idx is None or parent_idx < 0:
+            continue
+        sub_w, sub_cr, sub_lj = group_weights(values, g, scale, method)
+        # 1차 기준에서 상위 항목을 평가하지 않은 응답자는 이 그룹을 쓰지 않음
+        cr = np.fmax(cr, np.where(np.isnan(main_w[:, parent_idx]), np.nan, sub_cr))
+        subs.append(SubResult(main.items[parent_idx], parent_idx, g.items, sub_w, main_w[:, [parent_idx]] * sub_w, g, sub_lj))
+    return BatchResult(ok, cr, main.items, main_w, subs, main, main_lj)
+
+def _map_rows(fn, *results):
+    """응답자별 배열(행) 필드에 fn을 적용한 결과 (그룹 구조는 첫 결과의 것)"""
+    first = results[0]
+    subs = [
+        s._replace(weights=fn(*(r.subs[i].weights for r in results)),
+                   global_weights=fn(*(r.subs[i].global_weights for r in results)),
+                   log_judgments=fn(*(r.subs[i].log_judgments for r in results)))
+        for i, s in enumerate(first.subs)
+    ]
+    return first._replace(
+        ok=fn(*(r.ok for r in results)),
+        cr=fn(*(r.cr for r in results)),
+        main_weights=fn(*(r.main_weights for r in results)),
+        main_log_judgments=None if first.main_group is None else fn(*(r.main_log_judgments for r in results)),
+        subs=subs
+    )
+
+def select_rows(result, idx):
+    """일부 응답자(idx 순서)의 결과"""
+    return _map_rows(lambda a: a[idx], result)
+
+def concat_results(a, b):
+    """같은 그룹 구조로 계산한 두 결과를 응답자 방향으로 이어 붙임"""
+    return _map_rows(lambda x, y: np.concatenate([x, y]), a, b)
+
+def long_table(result):
+    """유효 응답자별 2차 항목 행: (응답자 위치, 1차 기준, 1차 가중치, 2차 항목, 2차 가중치, 종합 가중치) 열 배열"""
+    parts = []
+    for s in result.subs:
+        R, k = s.weights.shape
+        rows = np.repeat(np.arange(R), k)
+        parts.append((
+            rows,
+            np.full(R * k, s.parent, dtype=object),
+            np.repeat(result.main_weights[:, s.parent_idx], k),
+            np.tile(np.array(s.items, dtype=object), R),
+            s.weights.ravel(),
+            s.global_weights.ravel(),
+        ))
+    if not parts:
+        return None
+    cols = [np.concatenate(c) for c in zip(*parts)]
+    keep = ~np.isnan(cols[5]) & result.ok[cols[0]]
+    return [c[keep] for c in cols]
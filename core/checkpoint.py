@@ -0,0 +1,131 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+# --------------------------------------------------------------------------
+# 응답 진행 체크포인트 (응답자 토큰별 변경분 로그, 서버에만 보관)
+# --------------------------------------------------------------------------
+CHECKPOINT_DIR = "survey_checkpoints"
+TTL = 3 * 24 * 3600                 # 이 기간 동안 갱신이 없으면 버려진 설문으로 보고 삭제 (초)
+MAX_FILES = 5000                    # 보관할 최대 체크포인트 수
+MAX_FILE_BYTES = 256 * 1024         # 체크포인트 1개의 최대 크기
+CLEANUP_INTERVAL = 600              # 정리 작업 최소 간격 (초)
+
+TOKEN_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# append 결과
+WRITTEN = "written"
+FULL = "full"               # 크기 한도 초과: compact로 상태 요약을 써서 줄여야 함
+FAILED = "failed"
+
+_lock = threading.Lock()
+_last_cleanup = 0.0
+
+def new_token():
+    return uuid.uuid4().hex
+
+def valid_token(token):
+    return isinstance(token, str) and bool(TOKEN_PATTERN.match(token))
+
+def _path(token, base_dir):
+    return os.path.join(base_dir, f"{token}.log")
+
+def append(token, event, base_dir=CHECKPOINT_DIR):
+    """변경분 한 건을 이어 쓰고 결과(WRITTEN, FULL, FAILED)를 반환
+
+    크기 한도를 넘으면 쓰지 않고 FULL을 돌려주므로, 호출한 쪽이 compact로 상태 요약을 써야 한다.
+    """
+    if not valid_token(token):
+        return FAILED
+    path = _path(token, base_dir)
+    line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+    with _lock:
+        try:
+            os.makedirs(base_dir, exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > MAX_FILE_BYTES:
+                return FULL
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            return FAILED
+    cleanup(base_dir)
+    return WRITTEN
+
+def compact(token, events, base_dir=CHECKPOINT_DIR):
+    """변경분 로그를 events(머리말 + 상태 요약 등)로 교체. 실패하면 False"""
+    if not valid_token(token):
+        return False
+    path = _path(token, base_dir)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with _lock:
+        try:
+            os.makedirs(base_dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("".join(json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n" for ev in events))
+            os.replace(tmp, path)
+        except OSError:
+            return False
+    return True
+
+def load(token, base_dir=CHECKPOINT_DIR):
+    """저장된 변경분 목록. 없거나 만료되었으면 None"""
+    if not valid_token(token):
+        return None
+    path = _path(token, base_dir)
+    try:
+        if time.time() - os.path.getmtime(path) > TTL:
+            discard(token, base_dir)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    events = []
+    for line in lines:
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            break  # 기록 중 끊긴 마지막 줄
+    return events
+
+def discard(token, base_dir=CHECKPOINT_DIR):
+    if not valid_token(token):
+        return
+    try:
+        os.remove(_path(token, base_dir))
+    except OSError:
+        pass
+
+def cleanup(base_dir=CHECKPOINT_DIR, force=False):
+    """만료된 체크포인트를 지우고, 개수 한도를 넘으면 오래된 것부터 삭제"""
+    global _last_cleanup
+    now = time.time()
+    with _lock:
+        if not force and now - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = now
+
+    entries = []
+    try:
+        names = os.listdir(base_dir)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(base_dir, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if now - mtime > TTL:
+            try: os.remove(path)
+            except OSError: pass
+        else:
+            entries.append((mtime, path))
+
+    for _, path in sorted(entries)[:max(0, len(entries) - MAX_FILES)]:
+        try: os.remove(path)
+        except OSError: pass
@@ -0,0 +1,157 @@
+"""분석용 열 형식 저장소: 그룹별 판단값 블록(.npy, 쌍 번호 순)과 항목 정보(meta.json)
+
+    python -m core.columnar survey_data/*.csv      # 기존 CSV를 변환
+
+<프로젝트>.ahpcol/
+    meta.json     키 목록, 그룹별 항목·쌍 배치·상위 기준, 행 수, 변환한 CSV의 마지막 완성된 줄 끝 위치, 해독 문제
+    g<i>.npy      그룹 i의 (응답자, 쌍) 판단값 (미응답 NaN)
+    ok.npy        (응답자,) 해독 성공 여부
+    rows.csv      응답자별 Time, Respondent
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from core.batch_ahp import DEFAULT_METHOD, DecodeReport, Group, analyze_groups, compile_schema, decode_schema
+from core.submission_store import columnar_path, complete_size, file_lock, read_responses_since
+from core.survey_plan import plan_for_data_file
+
+FORMAT_VERSION = 3
+
+# --------------------------------------------------------------------------
+# 1. 변환 (CSV -> 열 형식)
+# --------------------------------------------------------------------------
+def convert(csv_path):
+    """CSV 전체를 해독해 그룹별 블록으로 저장. 저장한 응답 수를 반환"""
+    df, source_bytes, _ = read_responses_since(csv_path, 0)
+    plan = plan_for_data_file(csv_path)
+    values, schema, ok, report = decode_schema(df["Raw_Data"].tolist(), compile_schema(plan) if plan else None)
+
+    target = columnar_path(csv_path)
+    # 변환마다 다른 임시 디렉터리 (동시에 변환해도 서로의 반쯤 쓰인 디렉터리를 지우지 않도록)
+    tmp = tempfile.mkdtemp(prefix=f"{os.path.basename(target)}.", suffix=".tmp", dir=os.path.dirname(target) or ".")
+    try:
+        meta_groups = []
+        for i, (g, parent) in enumerate(zip(schema.groups, schema.parents)):
+            block = f"g{i}.npy"
+            np.save(os.path.join(tmp, block), np.ascontiguousarray(values[:, g.cols]))
+            meta_groups.append({"name": g.name, "items": g.items, "keys": [schema.keys[c] for c in g.cols],
+                                "u": g.u.tolist(), "v": g.v.tolist(), "parent": parent, "block": block})
+        np.save(os.path.join(tmp, "ok.npy"), ok)
+        rows = pd.DataFrame({c: df[c] if c in df else "" for c in ("Time", "Respondent")})
+        rows.to_csv(os.path.join(tmp, "rows.csv"), index=False)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "rows": len(df), "source_bytes": source_bytes,
+                       "keys": schema.keys, "groups": meta_groups, "report": report._asdict()}, f, ensure_ascii=False)
+
+        # 기존 저장소와 교체 (읽는 쪽이 반쯤 쓰인 디렉터리를 보지 않도록 이름 바꾸기로, 교체는 한 번에 하나씩)
+        with file_lock(csv_path):
+            # 그사이 다른 변환이 더 최신 응답까지 담아 교체했거나 프로젝트가 지워졌으면 교체하지 않음
+            current = load_meta(csv_path)
+            newer = is_current(csv_path, current, lock=False) and current["source_bytes"] != source_bytes
+            if os.path.exists(csv_path) and not newer:
+                old = f"{target}.old"
+                shutil.rmtree(old, ignore_errors=True)
+                if os.path.exists(target):
+                    os.rename(target, old)
+                os.rename(tmp, target)
+                shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)     # 교체했으면 이미 없음, 더 최신 저장소가 있으면 버림
+    return len(df)
+
+# --------------------------------------------------------------------------
+# 2. 읽기 (메모리 매핑)
+# --------------------------------------------------------------------------
+def load_meta(csv_path):
+    try:
+        with open(os.path.join(columnar_path(csv_path), "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == FORMAT_VERSION else None
+
+def is_current(csv_path, meta=None, lock=True):
+    """저장소가 있고, 변환 이후 CSV에 추가된 응답이 없는지
+
+    기록 중인 잘린 마지막 줄은 변환에서도 빠지므로, 파일 크기 대신 마지막 완성된 줄의 끝과 비교한다.
+    """
+    meta = meta or load_meta(csv_path)
+    try:
+        return meta is not None and complete_size(csv_path, lock) == meta["source_bytes"]
+    except OSError:
+        return False
+
+class ColumnarStore:
+    """그룹 블록을 메모리 매핑으로 여는 읽기 전용 저장소 (여는 시점에는 블록을 읽어 들이지 않음)"""
+
+    def __init__(self, csv_path):
+        self.path = columnar_path(csv_path)
+        self.meta = load_meta(csv_path)
+        if self.meta is None:
+            raise FileNotFoundError(self.path)
+        self.groups = [
+            Group(g["name"], g["items"], np.arange(len(g["keys"])), np.array(g["u"], dtype=int), np.array(g["v"], dtype=int))
+            for g in self.meta["groups"]
+        ]
+        self.blocks = [np.load(os.path.join(self.path, g["block"]), mmap_mode="r") for g in self.meta["groups"]]
+        self.parents = [g["parent"] for g in self.meta["groups"]]
+        self.ok = np.load(os.path.join(self.path, "ok.npy"), mmap_mode="r")
+        r = self.meta["report"]
+        self.report = DecodeReport(r["bad_rows"], Counter(r["unknown"]), Counter(r["malformed"]))
+        self.results = {}       # 계산 방법 -> BatchResult
+        self.memo_values = {}   # 집계 등 파생 결과
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def rows(self):
+        """응답자별 Time, Respondent"""
+        return pd.read_csv(os.path.join(self.path, "rows.csv"))
+
+    def analyze(self, method=DEFAULT_METHOD):
+        if method not in self.results:
+            self.results[method] = analyze_groups(list(zip(self.groups, self.blocks)), self.parents, self.ok, method=method)
+        return self.results[method]
+
+    def memo(self, key, compute):
+        """저장소는 변하지 않으므로 key별 파생 결과를 그대로 재사용"""
+        if key not in self.memo_values:
+            self.memo_values[key] = compute()
+        return self.memo_values[key]
+
+    def wide_frame(self):
+        """응답자별 한 행, 쌍별 한 열의 표 (원본 데이터 내보내기용)"""
+        frame = self.rows()
+        cols = {key: block[:, j] for g, block in zip(self.meta["groups"], self.blocks) for j, key in enumerate(g["keys"])}
+        return pd.concat([frame, pd.DataFrame(cols)], axis=1)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_store(csv_path):
+    """CSV와 일치하는 저장소를 프로세스 안에서 공유해 엶. 없거나 CSV에 새 응답이 있으면 None"""
+    meta = load_meta(csv_path)
+    if not is_current(csv_path, meta):
+        with _stores_lock:
+            _stores.pop(csv_path, None)
+        return None
+    with _stores_lock:
+        store = _stores.get(csv_path)
+        if store is None or store.meta["source_bytes"] != meta["source_bytes"] or store.meta["rows"] != meta["rows"]:
+            store = _stores[csv_path] = ColumnarStore(csv_path)
+        return store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", nargs="+")
+    args = parser.parse_args()
+    for path in args.csv:
+        print(f"{path}: {convert(path)}명 -> {columnar_path(path)}")
@@ -0,0 +1,109 @@
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from core.random_index import random_index
+
+# --------------------------------------------------------------------------
+# 응답 중 실시간 일관성(CR) 계산
+# --------------------------------------------------------------------------
+CR_LIMIT = 0.1
+
+POWER_TOL = 1e-10
+POWER_MAX_ITER = 100
+
+def principal_eigen(matrix, start=None, tol=POWER_TOL, max_iter=POWER_MAX_ITER):
+    """거듭제곱법으로 주고유벡터(합 1)와 λmax. start를 주면 그 벡터에서 출발(웜 스타트)"""
+    n = len(matrix)
+    w = np.full(n, 1.0 / n) if start is None else start
+    lam = float(n)
+    for _ in range(max_iter):
+        aw = matrix @ w
+        lam = aw.sum()          # w의 합이 1이므로 λ 추정치
+        nxt = aw / lam
+        if np.abs(nxt - w).max() < tol:
+            w = nxt
+            break
+        w = nxt
+    return w, lam
+
+def principal_eigen_batch(matrices, start=None, tol=POWER_TOL, max_iter=POWER_MAX_ITER):
+    """(R, n, n) 행렬 묶음의 주고유벡터 (R, n)와 λmax (R,)를 한 번에 (거듭제곱법)"""
+    R, n, _ = matrices.shape
+    w = np.full((R, n), 1.0 / n) if start is None else start
+    lam = np.full(R, float(n))
+    for _ in range(max_iter):
+        aw = np.einsum("rij,rj->ri", matrices, w)
+        lam = aw.sum(axis=1)
+        nxt = aw / lam[:, None]
+        done = np.abs(nxt - w).max() < tol
+        w = nxt
+        if done:
+            break
+    return w, lam
+
+def consistency_ratio(lam, n):
+    if n <= 2:
+        return 0.0
+    ri = random_index(n)
+    return ((lam - n) / (n - 1)) / ri if ri else 0.0
+
+@lru_cache(maxsize=None)
+def _triads(n):
+    """항목 수별 삼각 관계 목록 (모든 응답자가 공유)"""
+    triads = np.array(list(combinations(range(n), 3)), dtype=np.int16).reshape(-1, 3)
+    triads.flags.writeable = False
+    return triads
+
+class ConsistencyTracker:
+    """답변이 하나 들어올 때마다 λmax와 CR을 갱신 (직전 고유벡터에서 출발하여 수 회 반복으로 수렴)"""
+
+    def __init__(self, n):
+        self.n = n
+        self.matrix = np.ones((n, n))
+        self.answered = np.eye(n, dtype=bool)
+        self.weights = np.full(n, 1.0 / n)
+        self.lambda_max = float(n)
+        self.cr = 0.0
+        self._triads = _triads(n)
+
+    def set(self, u, v, w):
+        self.matrix[u, v] = w
+        self.matrix[v, u] = 1.0 / w
+        self.answered[u, v] = self.answered[v, u] = True
+        self.weights, self.lambda_max = principal_eigen(self.matrix, self.weights)
+        self.cr = consistency_ratio(self.lambda_max, self.n)
+        return self.cr
+
+    def worst_triads(self, k=3):
+        """세 쌍이 모두 답변된 삼각 관계 중 가장 모순된 것 (worst_triads 참고)"""
+        return worst_triads(self.matrix, self.answered, self._triads, k)
+
+def worst_triads(matrix, answered, triads, k=3, require_all=True):
+    """가장 모순된 삼각 관계: [(i, j, l, 응답 a_il, j를 거친 a_ij*a_jl), ...]
+
+    모순 정도는 log a_ij + log a_jl - log a_il 의 절댓값으로 본다 (어느 변을 기준으로 해도 같음).
+    require_all이면 세 쌍이 모두 답변된 삼각 관계만 보고, 아니면 빈 칸을 추정값으로 채운 행렬(적응형)에서
+    한 쌍 이상 답변된 삼각 관계를 보되 답변된 쌍을 i-l(응답)로 놓는다.
+    """
+    if not len(triads):
+        return []
+    a, b, c = triads.T.astype(int)
+    ab, bc, ac = answered[a, b], answered[b, c], answered[a, c]
+    keep = (ab & bc & ac) if require_all else (ab | bc | ac)
+    if not keep.any():
+        return []
+    # 답변된 변이 i-l이 되도록 돌림: a-c, 없으면 a-b (c를 거침), 없으면 b-c (a를 거침)
+    i = np.where(ac, a, np.where(ab, a, b))
+    j = np.where(ac, b, np.where(ab, c, a))
+    l = np.where(ac, c, np.where(ab, b, c))
+    i, j, l = i[keep], j[keep], l[keep]
+    implied = matrix[i, j] * matrix[j, l]
+    given = matrix[i, l]
+    dev = np.abs(np.log(implied) - np.log(given))
+    order = np.argsort(-dev)[:k]
+    return [
+        (int(i[t]), int(j[t]), int(l[t]), float(given[t]), float(implied[t]))
+        for t in order if dev[t] > np.log(2)
+    ]
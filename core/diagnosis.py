@@ -0,0 +1,376 @@
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import metrics
+from core.diagnosis_cache import get_cache, make_key
+from core.llm import generate_text, get_scheduler, stream_text
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+MODELS = [
+    'gemini-2.5-flash-lite',
+    'gemini-2.0-flash-lite-preview-02-05',
+    'gemini-2.5-flash',
+    'gemini-2.0-flash',
+    'gemini-2.0-pro-exp-02-05'
+]
+
+PROMPT_VERSION = 1  # 프롬프트 문구를 바꾸면 올려서 이전 캐시를 무효화
+
+DEFAULT_CONCURRENCY = 4
+FORMAT_RETRIES = 2  # 형식이 맞지 않는 답변을 다른 (키, 모델)로 다시 요청하는 최대 횟수
+
+EMPTY_RESULT = {"grade": "오류", "summary": "분석 실패", "suggestion": "잠시 후 시도", "example": "", "detail": "API 호출량 초과"}
+PENDING_RESULT = {"grade": "분석 중", "summary": "…", "suggestion": "…", "example": "", "detail": "…"}
+
+TAGS = {"GRADE": "grade", "SUMMARY": "summary", "SUGGESTION": "suggestion", "EXAMPLE": "example", "DETAIL": "detail"}
+TAG_PATTERN = re.compile(r"\[(GRADE|SUMMARY|SUGGESTION|EXAMPLE|DETAIL)\]", re.IGNORECASE)
+SECTION_PATTERNS = {tag: re.compile(fr"\[{tag}\](.*?)(?=\[|$)", re.DOTALL | re.IGNORECASE) for tag in TAGS}
+TRIM_PATTERN = re.compile(r"^[\s\:\-]]+|[\s\]\:\-]+$")
+GROUP_PATTERN = re.compile(r"\[GROUP\s*(\d+)\](.*?)(?=\[GROUP\s*\d+\]|\Z)", re.DOTALL | re.IGNORECASE)
+
+# --------------------------------------------------------------------------
+# 2. 프롬프트 및 응답 파싱
+# --------------------------------------------------------------------------
+def build_prompt(goal, parent, children):
+    is_main = (goal == parent)
+    scope_guide = "1차 평가 기준의 균형성(MECE)을 중심으로 진단." if is_main else f"상위 기준 '{parent}'의 하위 세부 항목 적절성만 진단(다른 기준 언급 금지)."
+
+    return f"""
+    [분석 대상]
+    - 목표: {goal}
+    - 기준: {parent}
+    - 하위: {children}
+    
+    [지침 1: 태도]
+    - 주제가 전문적이면 '냉철한 컨설턴트', 일상적이면 '친절한 멘토' 톤.
+    - {scope_guide}
+    
+    [지침 2: 형식]
+    - **한국어** 작성.
+    - **특수문자(**, *) 사용 금지.**
+    - [EXAMPLE]은 설명 없이 **추천 항목 명사**만 나열.
+    
+    [출력 포맷]
+    [GRADE] 적합/보완필요/부적합
+    [SUMMARY] (1줄 요약)
+    [SUGGESTION] (1줄 제안)
+    [EXAMPLE]
+    - 항목1
+    - 항목2
+    - 항목3
+    [DETAIL]
+    1. 구성: (내용)
+    2. 위계: (내용)
+    3. 용어: (내용)
+    """
+
+def build_batch_prompt(goal, batch):
+    """여러 그룹을 한 번에 진단하는 프롬프트. batch: [(번호, 상위 항목, 하위 항목), ...]"""
+    lines = []
+    for no, parent, children in batch:
+        if parent == goal:
+            lines.append(f"    [GROUP {no}] 1차 평가 기준: {children} (균형성(MECE) 중심 진단)")
+        else:
+            lines.append(f"    [GROUP {no}] 상위 기준 '{parent}'의 하위: {children} (하위 세부 항목 적절성만 진단, 다른 기준 언급 금지)")
+    group_lines = "\n".join(lines)
+
+    return f"""
+    [분석 대상]
+    - 목표: {goal}
+    - 진단 그룹:
+{group_lines}
+    
+    [지침 1: 태도]
+    - 주제가 전문적이면 '냉철한 컨설턴트', 일상적이면 '친절한 멘토' 톤.
+    - 각 그룹은 괄호 안의 범위만 독립적으로 진단.
+    
+    [지침 2: 형식]
+    - **한국어** 작성.
+    - **특수문자(**, *) 사용 금지.**
+    - [EXAMPLE]은 설명 없이 **추천 항목 명사**만 나열.
+    - 모든 그룹에 대해 아래 포맷을 그룹 번호 순서대로 반복하고, 번호 표시([GROUP 번호])를 반드시 유지.
+    
+    [출력 포맷]
+    [GROUP 번호]
+    [GRADE] 적합/보완필요/부적합
+    [SUMMARY] (1줄 요약)
+    [SUGGESTION] (1줄 제안)
+    [EXAMPLE]
+    - 항목1
+    - 항목2
+    - 항목3
+    [DETAIL]
+    1. 구성: (내용)
+    2. 위계: (내용)
+    3. 용어: (내용)
+    """
+
+def extract(tag, t):
+    match = SECTION_PATTERNS[tag.upper()].search(t)
+    if match:
+        c = match.group(1).strip()
+        c = c.replace("**", "").replace("*", "")
+        return TRIM_PATTERN.sub("", c).strip()
+    return "-"
+
+def parse_response(text):
+    return {
+        "grade": extract("GRADE", text),
+        "summary": extract("SUMMARY", text),
+        "suggestion": extract("SUGGESTION", text),
+        "example": extract("EXAMPLE", text),
+        "detail": extract("DETAIL", text)
+    }
+
+def is_parsed(res):
+    """등급과 요약을 모두 읽어 낸 결과인지 (빠졌으면 '-')"""
+    return res.get("grade") != "-" and res.get("summary") != "-"
+
+class IncompleteResponse(Exception):
+    """답변은 받았지만 형식이 맞지 않아 전부 또는 일부를 읽지 못함 (partial: 읽어 낸 부분)"""
+
+    def __init__(self, partial):
+        super().__init__("응답 형식 오류 (등급·요약을 읽지 못함)")
+        self.partial = partial
+
+def checked(res):
+    """등급·요약을 읽지 못한 결과는 IncompleteResponse로 올려 다른 조합으로 다시 요청하게 함"""
+    if not is_parsed(res):
+        raise IncompleteResponse(res)
+    return res
+
+def parse_batch_response(text):
+    """그룹 번호별 결과. 등급이나 요약이 빠진 그룹은 실패로 보고 제외"""
+    results = {}
+    for m in GROUP_PATTERN.finditer(text):
+        res = parse_response(m.group(2))
+        if is_parsed(res):
+            results[int(m.group(1))] = res
+    return results
+
+class SectionStream:
+    """스트리밍 응답을 이어 붙이면서, 다음 태그가 나타난 섹션부터 즉시 파싱"""
+
+    def __init__(self):
+        self.text = ""
+        self.sections = {}
+
+    def feed(self, chunk):
+        self.text += chunk
+        tags = list(TAG_PATTERN.finditer(self.text))
+        completed = {}
+        for m in tags[:-1]:
+            field = TAGS[m.group(1).upper()]
+            if field not in self.sections:
+                self.sections[field] = completed[field] = extract(m.group(1).upper(), self.text)
+        return completed
+
+    def finish(self):
+        return parse_response(self.text)
+
+# --------------------------------------------------------------------------
+# 3. AI 분석 함수
+# --------------------------------------------------------------------------
+def _call_streaming(key, model_name, prompt, on_section):
+    started = time.monotonic()
+    parser = SectionStream()
+    first = True
+    for chunk in stream_text(key, model_name, prompt):
+        completed = parser.feed(chunk)
+        if completed:
+            if first:
+                metrics.record("diagnosis.ttfs", time.monotonic() - started)
+                first = False
+            on_section(dict(parser.sections))
+    return parser.finish()
+
+def _run_with_failover(api_keys, call):
+    """스케줄러가 배정한 (키, 모델)로 call을 시도하고, 실패하면 다음 조합으로 넘어감
+
+    call이 IncompleteResponse를 올리면(형식 오류) FORMAT_RETRIES번까지 다른 조합으로 다시 요청하고,
+    끝내 완전한 답을 얻지 못하면 마지막으로 읽어 낸 부분을 반환한다.
+    """
+    scheduler = get_scheduler()
+    last_error = ""
+    partial, retries = None, 0
+    tried = set()
+
+    # 고정 대기 대신 스케줄러가 정상 상태의 가장 빠른 (키, 모델)을 배정
+    while True:
+        pick = scheduler.acquire(api_keys, MODELS, exclude=tried)
+        if pick is None:
+            return partial, last_error
+        tried.add(pick)
+        key, model_name = pick
+        started = time.monotonic()
+        try:
+            result = call(key, model_name)
+        except IncompleteResponse as e:
+            scheduler.report_malformed(key, model_name, time.monotonic() - started)
+            partial, last_error = e.partial, str(e)
+            retries += 1
+            if retries > FORMAT_RETRIES:
+                return partial, last_error
+            continue
+        except Exception as e:
+            scheduler.report_failure(key, model_name, e)
+            last_error = str(e)
+            continue
+        scheduler.report_success(key, model_name, time.monotonic() - started)
+        return result, last_error
+
+def analyze_ahp_logic(goal, parent, children, api_keys, use_cache=True, on_section=None):
+    """on_section을 주면 스트리밍 모드로 호출하여 완성된 섹션마다 부분 결과를 전달"""
+    if not children:
+        return {**EMPTY_RESULT, "grade": "정보없음", "summary": "하위 항목 없음"}
+
+    cache = get_cache()
+    cache_key = make_key(goal, parent, children, PROMPT_VERSION, "|".join(MODELS), "single")
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if not api_keys:
+        return {**EMPTY_RESULT, "grade": "키 없음", "summary": "API 키 없음"}
+
+    prompt = build_prompt(goal, parent, children)
+    if on_section is None:
+        call = lambda key, model_name: checked(parse_response(generate_text(key, model_name, prompt)))
+    else:
+        call = lambda key, model_name: checked(_call_streaming(key, model_name, prompt, on_section))
+
+    result, last_error = _run_with_failover(api_keys, call)
+    if result is not None:
+        # 재요청해도 형식이 맞지 않은 답변은 캐시하지 않음 (만료될 때까지 같은 실패를 돌려주지 않도록)
+        if is_parsed(result):
+            cache.put(cache_key, result)
+        return result
+
+    return {**EMPTY_RESULT, "detail": f"사용 가능한 키와 모델이 없습니다. (Last: {last_error or '모든 키가 일시 차단됨'})"}
+
+def is_failed(res):
+    """다시 진단해야 하는 결과 (호출 실패, 키 없음, 형식이 맞지 않아 등급·요약을 읽지 못함)"""
+    return res.get("grade") in (EMPTY_RESULT["grade"], "키 없음") or not is_parsed(res)
+
+# --------------------------------------------------------------------------
+# 4. 동시 진단
+# --------------------------------------------------------------------------
+def build_groups(goal, main, struct):
+    """진단 대상 그룹 목록: (그룹 ID, 상위 항목, 하위 항목)"""
+    groups = [("__main__", goal, main)]
+    for p, ch in struct.items():
+        groups.append((p, p, ch))
+    return groups
+
+def diff_groups(snapshot, goal, groups, skip_obvious=True):
+    """직전 진단 스냅샷과 비교하여 (다시 진단할 그룹, 재사용할 결과)를 반환
+
+    목표·상위 항목·하위 항목이 모두 같고 직전 결과가 성공이었던 그룹만 재사용한다.
+    로컬 사전 점검으로만 판정한 결과는 AI 호출 생략(skip_obvious)이 꺼지면 다시 진단한다.
+    """
+    if not snapshot or snapshot.get("goal") != goal:
+        return list(groups), {}
+
+    changed, reused = [], {}
+    for gid, parent, children in groups:
+        prev = snapshot["groups"].get(gid)
+        res = snapshot["results"].get(gid)
+        local_only = gid in snapshot.get("local", ()) and not skip_obvious
+        if prev == (parent, list(children)) and res is not None and not is_failed(res) and not local_only:
+            reused[gid] = res
+        else:
+            changed.append((gid, parent, children))
+    return changed, reused
+
+def make_snapshot(goal, groups, results, local=()):
+    """local: AI 호출 없이 로컬 사전 점검으로 판정한 그룹 ID"""
+    return {
+        "goal": goal,
+        "groups": {gid: (parent, list(children)) for gid, parent, children in groups},
+        "results": dict(results),
+        "local": sorted(local)
+    }
+
+def diagnose_concurrently(goal, groups, api_keys, max_workers=DEFAULT_CONCURRENCY, use_cache=True, stream=False):
+    """모든 그룹을 동시에 요청하고 (그룹 ID, 결과, 완료 여부)를 도착 순서대로 반환
+
+    stream=True이면 완성된 섹션이 생길 때마다 부분 결과(완료 여부 False)도 함께 전달한다.
+    Streamlit 화면 갱신은 호출한 스레드에서만 가능하므로 작업 스레드는 큐에 결과만 넣는다.
+    """
+    events = queue.Queue()
+
+    def run(gid, parent, children):
+        on_section = (lambda partial: events.put((gid, partial, False))) if stream else None
+        try:
+            res = analyze_ahp_logic(goal, parent, children, api_keys, use_cache, on_section)
+        except Exception as e:
+            res = {**EMPTY_RESULT, "detail": str(e)}
+        events.put((gid, res, True))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for gid, parent, children in groups:
+            pool.submit(run, gid, parent, children)
+        remaining = len(groups)
+        while remaining:
+            gid, res, done = events.get()
+            if done:
+                remaining -= 1
+            yield gid, res, done
+
+# --------------------------------------------------------------------------
+# 5. 일괄 진단 (전체 계층을 1회 호출로)
+# --------------------------------------------------------------------------
+def diagnose_batched(goal, groups, api_keys, max_workers=DEFAULT_CONCURRENCY, use_cache=True):
+    """전체 계층을 한 번의 요청으로 진단하고, 파싱에 실패한 그룹만 그룹별 호출로 재시도
+
+    일괄 답변은 그룹별 답변과 다른 프롬프트에서 나오므로 캐시 키를 따로 쓴다 (make_key의 mode).
+    """
+    cache = get_cache()
+    batch, keys = [], {}
+
+    for gid, parent, children in groups:
+        if not children:
+            yield gid, analyze_ahp_logic(goal, parent, children, api_keys, use_cache), True
+            continue
+        cache_key = make_key(goal, parent, children, PROMPT_VERSION, "|".join(MODELS), "batch")
+        cached = cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            yield gid, cached, True
+            continue
+        no = len(batch) + 1
+        batch.append((no, parent, children))
+        keys[no] = (gid, cache_key)
+
+    if not batch:
+        return
+
+    parsed = {}
+    if api_keys:
+        prompt = build_batch_prompt(goal, batch)
+
+        def call(key, model_name):
+            # 다시 요청한 답변에서 읽은 그룹도 합쳐 두고, 빠진 그룹이 있으면 다른 조합으로 재요청
+            parsed.update((no, res) for no, res in parse_batch_response(generate_text(key, model_name, prompt)).items()
+                          if no in keys and no not in parsed)
+            if len(parsed) < len(batch):
+                raise IncompleteResponse(parsed)
+            return parsed
+
+        _run_with_failover(api_keys, call)
+
+    failed = []
+    for no, parent, children in batch:
+        gid, cache_key = keys[no]
+        if no in parsed:
+            cache.put(cache_key, parsed[no])
+            yield gid, parsed[no], True
+        else:
+            failed.append((gid, parent, children))
+
+    if failed:
+        yield from diagnose_concurrently(goal, failed, api_keys, max_workers, use_cache)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+CACHE_DIR = "diagnosis_cache"
+MEMORY_ENTRIES = 256                 # 메모리(LRU) 계층 최대 항목 수
+DISK_TTL = 7 * 24 * 3600             # 디스크 계층 유효 기간 (초)
+DISK_MAX_BYTES = 50 * 1024 * 1024    # 디스크 계층 최대 용량
+
+def _norm(text):
+    return " ".join(str(text).split())
+
+def make_key(goal, parent, children, prompt_version, model, mode="single"):
+    """정규화한 (목표, 상위, 하위, 프롬프트 버전, 모델, 프롬프트 방식) 조합의 해시
+
+    mode: 그룹별 프롬프트("single")와 전체 계층 일괄 프롬프트("batch")의 답변은 따로 저장한다.
+    """
+    payload = json.dumps(
+        [_norm(goal), _norm(parent), [_norm(c) for c in children], prompt_version, model, mode],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# --------------------------------------------------------------------------
+# 2. 2단계(메모리 LRU + 디스크) 캐시
+# --------------------------------------------------------------------------
+class DiagnosisCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES, ttl=DISK_TTL, max_bytes=DISK_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return dict(self._memory[key])
+
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._remember(key, value)
+            self.stats["disk_hits"] += 1
+        return dict(value)
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, dict(value))
+
+        # 임시 파일에 쓴 뒤 교체하여 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """TTL이 지난 파일을 지우고, 용량 초과 시 오래된 파일부터 삭제"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            if now - info.st_mtime > self.ttl:
+                try: os.remove(path)
+                except OSError: pass
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
+
+    def hit_miss(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return hits, self.stats["misses"]
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """프로세스 전체에서 공유하는 진단 캐시"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiagnosisCache()
+        return _cache
@@ -0,0 +1,246 @@
+"""결과 리포트 내보내기: 다운로드를 누를 때만 만들고, 분석 지문별로 디스크에 보관해 다시 내려받을 때는 그대로 전달
+
+표는 묶음(DataFrame) 단위로 흘려 쓰므로 응답 수와 관계없이 메모리 사용량이 일정하다.
+"""
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import zipfile
+from typing import NamedTuple
+
+import pandas as pd
+
+from core import metrics
+from core.submission_store import export_path
+
+try:
+    import xlsxwriter
+except ImportError:  # 없으면 openpyxl 쓰기 전용 모드 사용
+    xlsxwriter = None
+
+try:
+    import resource
+except ImportError:  # Windows: 메모리 사용량은 기록하지 않음
+    resource = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet 묶음은 pyarrow가 있을 때만 제공
+    pyarrow = None
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+EXPORT_CHUNK = 20000            # 한 번에 쓰는 행 수
+MAX_SHEET_ROWS = 1_048_575      # Excel 시트당 최대 데이터 행 (넘으면 '_2' 시트로 이어 씀)
+MAX_EXPORTS = 12                # 프로젝트별로 보관할 내보내기 파일 수
+FORMAT_VERSION = 1              # 리포트 구성이 바뀌면 올려서 이전 파일을 재사용하지 않음
+
+FORMATS = {
+    # 형식 -> (확장자, MIME)
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv_zip": ("zip", "application/zip"),
+    "parquet_zip": ("parquet.zip", "application/zip"),
+}
+FORMAT_LABELS = {"xlsx": "엑셀 (.xlsx)", "csv_zip": "CSV 묶음 (.zip)", "parquet_zip": "Parquet 묶음 (.zip)"}
+
+def available_formats():
+    return [f for f in FORMATS if f != "parquet_zip" or pyarrow is not None]
+
+# --------------------------------------------------------------------------
+# 2. 시트 원본 (호출할 때마다 DataFrame 묶음을 차례로 내놓는 함수)
+# --------------------------------------------------------------------------
+class Sheet(NamedTuple):
+    name: str
+    chunks: object           # () -> DataFrame 반복자
+
+def frame_sheet(name, frame):
+    """메모리에 있는 DataFrame (또는 DataFrame을 돌려주는 함수)을 묶음으로 나눠 내놓는 시트"""
+    def chunks():
+        df = frame() if callable(frame) else frame
+        for start in range(0, max(len(df), 1), EXPORT_CHUNK):
+            yield df.iloc[start:start + EXPORT_CHUNK]
+    return Sheet(name, chunks)
+
+def csv_sheet(name, path, read=None, limit=None):
+    """디스크의 CSV를 나눠 읽는 시트 (read: 경로, 행 수 -> 반복자. 기본은 pandas 분할 읽기. limit: 최대 행 수)"""
+    def chunks():
+        if not os.path.exists(path):
+            return
+        left = limit
+        for chunk in (read(path, EXPORT_CHUNK) if read else pd.read_csv(path, chunksize=EXPORT_CHUNK)):
+            if left is not None:
+                chunk = chunk.iloc[:left]
+                left -= len(chunk)
+            yield chunk
+            if left == 0:
+                return
+    return Sheet(name, chunks)
+
+def fingerprint(*parts):
+    """분석 지문: 응답 파일 상태·설정·결과 요약이 같으면 같은 값"""
+    h = hashlib.blake2b(digest_size=12)
+    for part in (FORMAT_VERSION, *parts):
+        if isinstance(part, pd.DataFrame):
+            part = pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes()
+        h.update(part if isinstance(part, bytes) else repr(part).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+# --------------------------------------------------------------------------
+# 3. 형식별 기록기
+# --------------------------------------------------------------------------
+def _rows(chunk):
+    """NaN은 빈 칸으로, numpy 값은 파이썬 값으로 바꾼 행 반복자"""
+    return chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+def _write_xlsx(sheets, path):
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+        new_sheet = wb.add_worksheet
+        def write(ws, r, row):
+            ws.write_row(r, 0, row)
+    else:
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        new_sheet = wb.create_sheet
+        def write(ws, r, row):
+            ws.append(row)
+
+    for sheet in sheets:
+        ws, part, r, header = None, 1, 0, None
+        for chunk in sheet.chunks():
+            if header is None:
+                header = list(chunk.columns)
+            for row in _rows(chunk):
+                if ws is None or r > MAX_SHEET_ROWS:
+                    ws = new_sheet(sheet.name if part == 1 else f"{sheet.name}_{part}")
+                    part += 1
+                    write(ws, 0, header)
+                    r = 1
+                write(ws, r, row)
+                r += 1
+        if ws is None:
+            write(new_sheet(sheet.name), 0, header or [])
+    if xlsxwriter is not None:
+        wb.close()
+    else:
+        wb.save(path)
+
+def _write_csv_zip(sheets, path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for sheet in sheets:
+            with zf.open(f"{sheet.name}.csv", "w") as raw:
+                out = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                first = True
+                for chunk in sheet.chunks():
+                    chunk.to_csv(out, header=first, index=False)
+                    first = False
+                out.flush()
+                out.detach()
+
+def _write_parquet_zip(sheets, path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for sheet in sheets:
+            part = f"{path}.{sheet.name}.parquet"
+            writer = schema = None
+            try:
+                for chunk in sheet.chunks():
+                    table = pyarrow.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                    if writer is None:
+                        schema = table.schema
+                        writer = pq.ParquetWriter(part, schema)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is not None:
+                zf.write(part, f"{sheet.name}.parquet")
+                os.remove(part)
+
+WRITERS = {"xlsx": _write_xlsx, "csv_zip": _write_csv_zip, "parquet_zip": _write_parquet_zip}
+
+# --------------------------------------------------------------------------
+# 4. 내보내기 (지문별 디스크 보관)
+# --------------------------------------------------------------------------
+class ExportInfo(NamedTuple):
+    path: str
+    seconds: float           # 생성 시간 (보관본이면 처음 만들 때의 값)
+    rss_mb: float            # 생성 직후 프로세스의 최대 RSS (알 수 없으면 None). 기록기별 최대 할당량은 bench_results --export
+    size_mb: float
+
+_path_locks = {}                    # 내보내기 파일 경로 -> 잠금 (같은 파일만 한 번에 하나씩 생성)
+_path_locks_guard = threading.Lock()
+
+def _info_path(path):
+    return f"{path}.json"
+
+def _max_rss_mb():
+    """프로세스 최대 RSS (getrusage 단위: Linux KB, macOS 바이트)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+def cached_export(csv_path, key, fmt):
+    """이미 만들어 둔 내보내기 파일의 정보 (없으면 None)"""
+    path = os.path.join(export_path(csv_path), f"{key}.{FORMATS[fmt][0]}")
+    try:
+        with open(_info_path(path), "r", encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return ExportInfo(path, info["seconds"], info.get("rss_mb"), info["size_mb"]) if os.path.exists(path) else None
+
+def _prune(directory):
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if not f.endswith((".json", ".tmp"))]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[MAX_EXPORTS:]:
+        for p in (path, _info_path(path)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+def export_report(csv_path, key, fmt, sheets):
+    """sheets를 fmt 형식 파일로 만들어 ExportInfo 반환. 같은 지문의 파일이 있으면 다시 만들지 않음"""
+    directory = export_path(csv_path)
+    path = os.path.join(directory, f"{key}.{FORMATS[fmt][0]}")
+    with _path_locks_guard:
+        lock = _path_locks.setdefault(path, threading.Lock())
+    with lock:
+        info = cached_export(csv_path, key, fmt)
+        if info is not None:
+            return info
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+
+        started = time.perf_counter()
+        try:
+            WRITERS[fmt](sheets, tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        seconds = time.perf_counter() - started
+
+        info = ExportInfo(path, seconds, _max_rss_mb(), os.path.getsize(path) / 2 ** 20)
+        with open(_info_path(path), "w", encoding="utf-8") as f:
+            json.dump(info._asdict(), f)
+        metrics.record(f"export.{fmt}.seconds", seconds)
+        _prune(directory)
+    with _path_locks_guard:
+        _path_locks.pop(path, None)
+    return info
+
+def export_data(csv_path, key, fmt, sheets):
+    """다운로드 버튼의 지연 생성 함수용: 파일을 만들거나 보관본을 찾아 그 내용을 반환"""
+    info = export_report(csv_path, key, fmt, sheets)
+    with open(info.path, "rb") as f:
+        return f.read()
@@ -0,0 +1,89 @@
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions as gexc
+
+from core.llm import LLMBackend
+
+# --------------------------------------------------------------------------
+# 로컬 Gemini 대역 (네트워크·키 없이 진단 파이프라인 측정용)
+# --------------------------------------------------------------------------
+GROUP_NO_PATTERN = re.compile(r"\[GROUP (\d+)\]")
+
+SAMPLE_ANSWER = """[GRADE] 보완필요
+[SUMMARY] 하위 항목 간 범위가 일부 겹칩니다.
+[SUGGESTION] 유사 항목을 통합하고 빠진 관점을 추가하세요.
+[EXAMPLE]
+- 비용 효율성
+- 운용 안정성
+- 확장성
+[DETAIL]
+1. 구성: 항목 수는 적절하나 일부 중복이 있습니다.
+2. 위계: 상위 기준과의 관계가 명확합니다.
+3. 용어: 표현 수준을 통일할 필요가 있습니다.
+"""
+
+MALFORMED_ANSWER = "죄송합니다. 요청하신 형식으로 답변을 드리기 어렵습니다."
+
+class FakeBackend(LLMBackend):
+    """지연 분포, 429 할당량 오류, 형식이 깨진 응답, 중간에 끊기는 스트림을 흉내 내는 스텁
+
+    latency: (중앙값 초, 로그정규 표준편차). 호출마다 이 분포에서 지연을 뽑는다.
+    """
+
+    def __init__(self, latency=(0.5, 0.4), quota_rate=0.0, malformed_rate=0.0,
+                 partial_rate=0.0, chunk_size=24, chunk_delay=0.02, dead_keys=(), seed=None):
+        self.median, self.sigma = latency
+        self.quota_rate = quota_rate
+        self.malformed_rate = malformed_rate
+        self.partial_rate = partial_rate
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.dead_keys = set(dead_keys)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            return (
+                self.median * self._rng.lognormvariate(0, self.sigma),
+                self._rng.random(), self._rng.random(), self._rng.random()
+            )
+
+    def _answer(self, prompt, malformed):
+        if malformed:
+            return MALFORMED_ANSWER
+        groups = GROUP_NO_PATTERN.findall(prompt)
+        if groups:
+            return "".join(f"[GROUP {no}]\n{SAMPLE_ANSWER}" for no in groups)
+        return SAMPLE_ANSWER
+
+    def _check(self, key, quota_roll):
+        if key in self.dead_keys:
+            raise gexc.PermissionDenied("API key not valid (fake)")
+        if quota_roll < self.quota_rate:
+            raise gexc.ResourceExhausted("Quota exceeded (fake)")
+
+    def generate(self, key, model_name, prompt):
+        latency, quota_roll, malformed_roll, _ = self._draw()
+        time.sleep(latency)
+        self._check(key, quota_roll)
+        return self._answer(prompt, malformed_roll < self.malformed_rate)
+
+    def stream(self, key, model_name, prompt):
+        latency, quota_roll, malformed_roll, partial_roll = self._draw()
+        text = self._answer(prompt, malformed_roll < self.malformed_rate)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        # 첫 조각까지의 지연은 전체 지연에서 조각 전송 시간을 뺀 만큼
+        time.sleep(max(0.0, latency - self.chunk_delay * len(chunks)))
+        self._check(key, quota_roll)
+        cut = len(chunks) // 2 if partial_roll < self.partial_rate else None
+        for i, chunk in enumerate(chunks):
+            if i == cut:
+                raise gexc.ServiceUnavailable("Stream interrupted (fake)")
+            time.sleep(self.chunk_delay)
+            yield chunk
@@ -0,0 +1,64 @@
+import numpy as np
+
+# --------------------------------------------------------------------------
+# 쌍대비교 화면의 실시간 순위 엔진
+# --------------------------------------------------------------------------
+TIE_TOLERANCE = 0.00001
+
+def competition_ranks(weights, tol=TIE_TOLERANCE):
+    """가중치 내림차순 순위 (차이가 tol 미만이면 같은 순위: 1, 1, 3 ...)"""
+    weights = np.asarray(weights)
+    order = np.argsort(-weights, kind="stable")
+    ws = weights[order]
+    starts = np.r_[True, np.abs(np.diff(ws)) >= tol]
+    positions = np.arange(1, len(ws) + 1)
+    ranks = np.empty(len(ws), dtype=int)
+    ranks[order] = np.maximum.accumulate(np.where(starts, positions, 0))
+    return ranks
+
+def flipped_items(initial_ranks, current_ranks):
+    """처음 정한 순위와 비교해 역전된 항목 (쌍방 모두 표시)"""
+    r0 = np.asarray(initial_ranks)
+    r = np.asarray(current_ranks)
+    flips = (r0[:, None] < r0[None, :]) & (r[:, None] > r[None, :])
+    return np.flatnonzero(flips.any(axis=1) | flips.any(axis=0))
+
+class LiveRanking:
+    """로그 공간의 행 합을 유지하여, 한 칸 (u, v) 변경을 O(1)로 반영하는 기하평균 순위
+
+    행 곱(np.prod)은 항목 수가 많으면 넘치거나 0이 될 수 있으므로 로그 합으로 다룬다.
+    """
+
+    def __init__(self, task):
+        self.n = len(task.items)
+        self.pair_no = task.pair_no
+        self.pair_u = task.pair_u                    # 설문 정의의 공유 배열
+        self.log_cells = np.zeros(len(task.pairs))   # 쌍 번호별 log a[u][v] (u < v 방향)
+        self.log_rows = np.zeros(self.n)             # 행별 log a[i][j]의 합
+
+    def set(self, u, v, w):
+        """a[u][v] = w, a[v][u] = 1 / w"""
+        no = self.pair_no[(u, v)]
+        lw = np.log(w) if self.pair_u[no] == u else -np.log(w)
+        delta = lw - self.log_cells[no]
+        self.log_cells[no] = lw
+        pu = self.pair_u[no]
+        pv = v if pu == u else u
+        self.log_rows[pu] += delta
+        self.log_rows[pv] -= delta
+
+    def weights(self):
+        x = self.log_rows / self.n
+        e = np.exp(x - x.max())
+        return e / e.sum()
+
+    def ranks(self):
+        return competition_ranks(self.weights())
+
+    def matrix(self, pairs):
+        """필요할 때만 만드는 전체 비교 행렬 (pairs: 과제의 Pair 목록)"""
+        m = np.ones((self.n, self.n))
+        for p in pairs:
+            m[p.u, p.v] = np.exp(self.log_cells[p.no])
+            m[p.v, p.u] = np.exp(-self.log_cells[p.no])
+        return m
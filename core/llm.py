@@ -0,0 +1,245 @@
+import threading
+import time
+
+import google.ai.generativelanguage as glm
+from google.api_core import exceptions as gexc
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+DEFAULT_RPM = 30            # 키 1개당 분당 요청 수 (기존 2초 간격과 동일)
+QUOTA_COOLDOWN = 60.0       # 429 응답 후 (키, 모델) 조합 휴식 시간 (초)
+FAILURE_THRESHOLD = 3       # 연속 실패가 이 횟수에 도달하면 키 회로 차단
+OPEN_SECONDS = 120.0        # 차단된 키를 다시 시험하기까지 대기 시간 (초)
+DEAD_KEY_SECONDS = 3600.0   # 인증 실패 키 차단 시간 (초)
+EWMA_ALPHA = 0.3            # 지연 시간 이동 평균 가중치
+PRIOR_LATENCY = 3.0         # 아직 써보지 않은 조합의 기본 예상 지연 (초)
+MODEL_RANK_PENALTY = 0.5    # 모델 선호 순서를 반영하는 가산 지연 (초)
+
+def mask_key(key):
+    return f"…{key[-4:]}" if len(key) > 4 else "…"
+
+# --------------------------------------------------------------------------
+# 2. 키/모델 상태 추적
+# --------------------------------------------------------------------------
+class PairHealth:
+    __slots__ = ("latency", "successes", "failures", "cooldown_until")
+
+    def __init__(self):
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    def success_rate(self):
+        total = self.successes + self.failures
+        # 라플라스 보정: 기록이 없으면 낙관적으로 시도
+        return (self.successes + 1) / (total + 2)
+
+class KeyHealth:
+    __slots__ = ("next_free", "consecutive_failures", "open_until")
+
+    def __init__(self):
+        self.next_free = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+class KeyScheduler:
+    """키·모델별 상태(쿨다운, 회로 차단, 지연, 성공률)를 보고 가장 빠른 정상 조합을 배정"""
+
+    def __init__(self, rpm=DEFAULT_RPM):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._pairs = {}
+
+    def _key(self, key):
+        if key not in self._keys:
+            self._keys[key] = KeyHealth()
+        return self._keys[key]
+
+    def _pair(self, key, model):
+        if (key, model) not in self._pairs:
+            self._pairs[(key, model)] = PairHealth()
+        return self._pairs[(key, model)]
+
+    def _score(self, pair, rank):
+        latency = pair.latency if pair.latency is not None else PRIOR_LATENCY
+        return (latency + rank * MODEL_RANK_PENALTY) / pair.success_rate()
+
+    def acquire(self, keys, models, exclude=()):
+        """사용할 (키, 모델)을 예약하고 키별 호출 간격만큼만 대기. 쓸 수 있는 조합이 없으면 None"""
+        with self._lock:
+            now = time.monotonic()
+            best = None
+            for key in keys:
+                kh = self._key(key)
+                if kh.open_until > now:
+                    continue
+                start = max(now, kh.next_free)
+                for rank, model in enumerate(models):
+                    if (key, model) in exclude:
+                        continue
+                    ph = self._pair(key, model)
+                    if ph.cooldown_until > now:
+                        continue
+                    # 기다려야 하는 시간도 예상 소요 시간에 포함
+                    cost = (start - now) + self._score(ph, rank)
+                    if best is None or cost < best[0]:
+                        best = (cost, start, key, model)
+
+            if best is None:
+                return None
+            _, start, key, model = best
+            self._keys[key].next_free = start + self.interval
+
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return key, model
+
+    def report_success(self, key, model, latency):
+        with self._lock:
+            kh, ph = self._key(key), self._pair(key, model)
+            kh.consecutive_failures = 0
+            kh.open_until = 0.0
+            ph.successes += 1
+            ph.latency = latency if ph.latency is None else (1 - EWMA_ALPHA) * ph.latency + EWMA_ALPHA * latency
+
+    def report_malformed(self, key, model, latency):
+        """답변은 왔지만 형식이 맞지 않음: 키는 정상으로 두고 (키, 모델) 조합의 성공률만 낮춤"""
+        with self._lock:
+            kh, ph = self._key(key), self._pair(key, model)
+            kh.consecutive_failures = 0
+            ph.failures += 1
+            ph.latency = latency if ph.latency is None else (1 - EWMA_ALPHA) * ph.latency + EWMA_ALPHA * latency
+
+    def report_failure(self, key, model, error):
+        with self._lock:
+            now = time.monotonic()
+            kh, ph = self._key(key), self._pair(key, model)
+            ph.failures += 1
+
+            if isinstance(error, gexc.ResourceExhausted):
+                # 할당량은 (키, 모델) 단위로 소진되므로 해당 조합만 쉬게 함
+                ph.cooldown_until = now + QUOTA_COOLDOWN
+            elif isinstance(error, gexc.NotFound):
+                # 이 키로는 사용할 수 없는 모델
+                ph.cooldown_until = now + DEAD_KEY_SECONDS
+            elif isinstance(error, (gexc.PermissionDenied, gexc.Unauthenticated, gexc.InvalidArgument)):
+                kh.open_until = now + DEAD_KEY_SECONDS
+            else:
+                kh.consecutive_failures += 1
+                if kh.consecutive_failures >= FAILURE_THRESHOLD:
+                    kh.open_until = now + OPEN_SECONDS
+
+    def snapshot(self):
+        """화면 표시용 키별 상태 요약"""
+        with self._lock:
+            now = time.monotonic()
+            rows = []
+            for key, kh in self._keys.items():
+                pairs = [(m, p) for (k, m), p in self._pairs.items() if k == key]
+                ok = sum(p.successes for _, p in pairs)
+                fail = sum(p.failures for _, p in pairs)
+                # 모델별 지연 EWMA를 성공 횟수로 가중 평균
+                timed = [(p.latency, p.successes) for _, p in pairs if p.latency is not None]
+                n_timed = sum(n for _, n in timed)
+                cooling = [m for m, p in pairs if p.cooldown_until > now]
+                rows.append({
+                    "키": mask_key(key),
+                    "상태": "차단" if kh.open_until > now else "정상",
+                    "성공": ok,
+                    "실패": fail,
+                    "평균 지연(초)": round(sum(lat * n for lat, n in timed) / n_timed, 2) if n_timed else None,
+                    "쿨다운 모델": ", ".join(cooling)
+                })
+            return rows
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """프로세스 전체에서 공유하는 스케줄러 (세션 간 한도·상태 공유)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = KeyScheduler()
+        return _scheduler
+
+def reset_scheduler(rpm=DEFAULT_RPM):
+    """상태를 비운 새 스케줄러로 교체"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = KeyScheduler(rpm)
+        return _scheduler
+
+# --------------------------------------------------------------------------
+# 3. LLM 백엔드
+# --------------------------------------------------------------------------
+class LLMBackend:
+    """진단 파이프라인이 사용하는 LLM 호출 인터페이스"""
+
+    def generate(self, key, model_name, prompt):
+        """전체 응답 텍스트를 반환"""
+        raise NotImplementedError
+
+    def stream(self, key, model_name, prompt):
+        """응답 조각(chunk)의 텍스트를 도착하는 대로 반환"""
+        raise NotImplementedError
+
+class GeminiBackend(LLMBackend):
+    """google.generativeai 계열 API 백엔드 (키마다 별도의 클라이언트)"""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def client(self, key):
+        # 전역 genai.configure를 쓰지 않으므로 동시 세션끼리 키를 덮어쓰지 않음
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = glm.GenerativeServiceClient(client_options={"api_key": key})
+                self._clients[key] = client
+            return client
+
+    @staticmethod
+    def _request(model_name, prompt):
+        return glm.GenerateContentRequest(
+            model=f"models/{model_name}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])]
+        )
+
+    def generate(self, key, model_name, prompt):
+        response = self.client(key).generate_content(request=self._request(model_name, prompt))
+        if not response.candidates:
+            raise ValueError(f"빈 응답 (block: {response.prompt_feedback.block_reason})")
+        return "".join(part.text for part in response.candidates[0].content.parts)
+
+    def stream(self, key, model_name, prompt):
+        for response in self.client(key).stream_generate_content(request=self._request(model_name, prompt)):
+            if response.candidates:
+                yield "".join(part.text for part in response.candidates[0].content.parts)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = GeminiBackend()
+        return _backend
+
+def set_backend(backend):
+    """백엔드 교체 (로컬 스텁, 벤치마크용)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+def generate_text(key, model_name, prompt):
+    return get_backend().generate(key, model_name, prompt)
+
+def stream_text(key, model_name, prompt):
+    return get_backend().stream(key, model_name, prompt)
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# --------------------------------------------------------------------------
+# 프로세스 공용 지표 수집기 (최근 값만 보관)
+# --------------------------------------------------------------------------
+WINDOW = 500
+
+_values = defaultdict(lambda: deque(maxlen=WINDOW))
+_lock = threading.Lock()
+
+def record(name, value):
+    with _lock:
+        _values[name].append(float(value))
+
+def summary(name):
+    """최근 기록의 건수, 평균, 중앙값, 95% 분위수"""
+    with _lock:
+        vals = list(_values.get(name, ()))
+    if not vals:
+        return None
+    arr = np.asarray(vals)
+    return {
+        "count": len(arr),
+        "mean": float(arr.mean()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95))
+    }
+
+def reset(name=None):
+    with _lock:
+        if name is None:
+            _values.clear()
+        else:
+            _values.pop(name, None)
+
+@contextmanager
+def cpu_timer(name):
+    """블록 실행 동안 현재 스레드가 쓴 CPU 시간을 기록 (st.rerun 등 예외로 빠져나가도 기록)"""
+    started = time.thread_time()
+    try:
+        yield
+    finally:
+        record(name, time.thread_time() - started)
@@ -0,0 +1,89 @@
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+
+# --------------------------------------------------------------------------
+# 로컬 사전 점검 (LLM 호출 전, 명백한 구조 오류를 즉시 판정)
+# --------------------------------------------------------------------------
+MAX_ITEMS = 8             # 이 개수 이상이면 쌍대비교 부담이 큼 (기존 '항목 과다' 기준)
+NEAR_DUP_THRESHOLD = 0.7  # 정규화 문자열의 일치 비율(SequenceMatcher) 기준
+
+STRIP_PATTERN = re.compile(r"[\s\W_]+")
+
+def normalize(name):
+    return STRIP_PATTERN.sub("", str(name)).lower()
+
+def similarity(a, b):
+    """공백·기호를 뺀 두 이름의 일치 비율 (0~1, 같으면 1)
+
+    앞말만 같은 항목('서비스 품질'과 '서비스 가격')은 기준에 못 미치고,
+    띄어쓰기·어미만 다른 항목('고객 만족도'와 '고객만족')은 기준을 넘는다.
+    """
+    na, nb = normalize(a), normalize(b)
+    if not na or not nb:
+        return 0.0
+    return SequenceMatcher(None, na, nb, autojunk=False).ratio()
+
+def _check_group(parent, children):
+    blocking, warnings = [], []
+
+    if len(children) == 1:
+        blocking.append(f"하위 항목이 1개뿐이라 쌍대비교를 할 수 없습니다. ('{children[0]}')")
+    if len(children) >= MAX_ITEMS:
+        warnings.append(f"항목 과다: {len(children)}개 (비교 질문 {len(children) * (len(children) - 1) // 2}개)")
+
+    for c in children:
+        if normalize(c) == normalize(parent):
+            blocking.append(f"'{c}'이(가) 상위 항목과 같습니다.")
+
+    for a, b in combinations(children, 2):
+        sim = similarity(a, b)
+        if sim >= 1.0:
+            blocking.append(f"'{a}'와(과) '{b}'이(가) 중복됩니다.")
+        elif sim >= NEAR_DUP_THRESHOLD:
+            warnings.append(f"'{a}'와(과) '{b}'의 의미가 겹칠 수 있습니다. (유사도 {sim:.2f})")
+
+    return blocking, warnings
+
+def _cross_group_overlaps(groups):
+    """서로 다른 그룹의 하위 항목 간 중복 (1차 기준 그룹 제외)"""
+    overlaps = {}
+    subs = [(gid, c) for gid, parent, children in groups if gid != "__main__" for c in children]
+    for (ga, a), (gb, b) in combinations(subs, 2):
+        if ga == gb:
+            continue
+        sim = similarity(a, b)
+        if sim >= NEAR_DUP_THRESHOLD:
+            overlaps.setdefault(ga, []).append(f"'{a}'이(가) '{gb}'의 '{b}'와(과) 겹칩니다. (유사도 {sim:.2f})")
+            overlaps.setdefault(gb, []).append(f"'{b}'이(가) '{ga}'의 '{a}'와(과) 겹칩니다. (유사도 {sim:.2f})")
+    return overlaps
+
+def prescreen(groups):
+    """그룹별 사전 점검 결과: {그룹 ID: {"blocking", "warnings", "card"}}
+
+    blocking이 있으면 AI 호출 없이도 '부적합'으로 판정할 수 있으며,
+    card는 render_result_ui에 그대로 넘길 수 있는 결과 형식이다.
+    """
+    overlaps = _cross_group_overlaps(groups)
+    findings = {}
+    for gid, parent, children in groups:
+        if not children:
+            continue
+        blocking, warnings = _check_group(parent, children)
+        warnings += overlaps.get(gid, [])
+        if not blocking and not warnings:
+            continue
+
+        issues = blocking + warnings
+        findings[gid] = {
+            "blocking": blocking,
+            "warnings": warnings,
+            "card": {
+                "grade": "부적합" if blocking else "보완필요",
+                "summary": issues[0],
+                "suggestion": "중복·동일 항목을 정리한 뒤 다시 진단하세요." if blocking else "겹치는 항목을 통합하거나 명확히 구분하세요.",
+                "example": "",
+                "detail": "\n".join(f"{i + 1}. {msg}" for i, msg in enumerate(issues))
+            }
+        }
+    return findings
@@ -0,0 +1,242 @@
+"""프로젝트 색인: 비밀번호 해시 -> 그 프로젝트의 응답 파일과 정보(응답 수, 크기, 마지막 기록 시각, 설문 ID)
+
+    python -m core.project_index      # 데이터 폴더를 훑어 색인을 다시 만듦
+
+응답을 기록할 때마다 갱신하고 프로세스마다 한 번 읽어 두므로, 결과 화면의 인증·파일 목록은
+데이터 폴더의 파일 수와 관계없이 해시 한 번과 사전 조회로 끝난다. 비밀번호는 색인별 salt를 붙인 해시로만 저장한다.
+
+<데이터 폴더>/index.json
+    version, salt
+    projects      {키 해시: {파일 이름: {survey_id, goal, rows, bytes, modified}}}
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from core.survey_plan import CONFIG_DIR, survey_for_data_file
+
+try:
+    import fcntl
+except ImportError:  # Windows 등 fcntl이 없는 환경은 프로세스 내 잠금만 사용
+    fcntl = None
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+DATA_DIR = "survey_data"
+INDEX_NAME = "index.json"
+FORMAT_VERSION = 2
+
+class ProjectEntry(NamedTuple):
+    file: str               # 데이터 폴더 안의 CSV 파일 이름
+    path: str
+    survey_id: str          # 설문 정의를 찾지 못한 예전 파일은 None
+    goal: str
+    rows: int               # 기록된 응답 수
+    bytes: int
+    modified: float         # 마지막 기록 시각 (epoch 초)
+
+def hash_key(secret_key, salt):
+    return hashlib.sha256(f"{salt}\x1f{secret_key}".encode("utf-8")).hexdigest()
+
+def _count_rows(csv_path):
+    """헤더를 뺀 CSV 행 수 (따옴표 안 줄바꿈 포함)"""
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+def _identify(csv_path, config_dir):
+    """응답 파일의 (설문 ID, [(비밀번호, 목표), ...])
+
+    설문 정의가 있으면 그 비밀번호 하나. 없으면 파일 이름 '키_목표.csv'의 '_' 앞부분마다 후보로 둔다
+    (비밀번호에도 '_'가 있을 수 있으므로, 이전 결과 화면의 startswith(f"{키}_")와 같은 범위).
+    """
+    survey_id, plan = survey_for_data_file(csv_path, config_dir)
+    if plan is not None:
+        return survey_id, [(plan.secret_key, plan.goal)]
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    owners = [(stem[:i], stem[i + 1:].replace("_", " ")) for i, ch in enumerate(stem) if ch == "_"]
+    return None, owners or [(stem, "")]
+
+# --------------------------------------------------------------------------
+# 2. 색인
+# --------------------------------------------------------------------------
+class ProjectIndex:
+    """디스크의 색인 파일을 메모리에 두고, 다른 프로세스가 고쳤을 때(수정 시각 변경)만 다시 읽음"""
+
+    def __init__(self, data_dir=DATA_DIR, config_dir=CONFIG_DIR):
+        self.data_dir = data_dir
+        self.config_dir = config_dir
+        self.path = os.path.join(data_dir, INDEX_NAME)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._mtime = None
+        self._salt = None
+        self._projects = {}     # 키 해시 -> {파일 이름: 정보}
+        self._owner = {}        # 파일 이름 -> [키 해시, ...] (설문 정의가 없는 파일은 여러 개일 수 있음)
+
+    @contextmanager
+    def _locked(self):
+        """색인 읽기-수정-쓰기에 대한 프로세스 간(flock)·스레드 간 잠금"""
+        with self._lock:
+            if fcntl is None or self._depth:
+                # 같은 스레드가 이미 잡고 있으면 다시 flock하지 않음 (다른 파일 기술자로 잡으면 교착)
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            os.makedirs(self.data_dir, exist_ok=True)
+            with open(f"{self.path}.lock", "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _set(self, salt, projects):
+        self._salt = salt
+        self._projects = projects
+        self._owner = {}
+        for h, files in projects.items():
+            for name in files:
+                self._owner.setdefault(name, []).append(h)
+
+    def _refresh(self):
+        """디스크의 색인이 바뀌었으면 다시 읽고, 없거나 형식이 다르면 데이터 폴더를 훑어 새로 만듦 (새로 만들었으면 True)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime is not None and mtime == self._mtime:
+            return False
+        data = None
+        if mtime is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+        if data is None or data.get("version") != FORMAT_VERSION:
+            self.rebuild()
+            return True
+        self._set(data["salt"], data["projects"])
+        self._mtime = mtime
+        return False
+
+    def _save(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "salt": self._salt, "projects": self._projects}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def rebuild(self):
+        """데이터 폴더의 CSV를 모두 훑어 색인을 다시 만듦 (색인이 없을 때 한 번). 등록한 파일 수를 반환"""
+        with self._locked():
+            salt = self._salt or os.urandom(16).hex()
+            projects = {}
+            try:
+                names = sorted(f for f in os.listdir(self.data_dir) if f.endswith(".csv"))
+            except OSError:
+                names = []
+            for name in names:
+                path = os.path.join(self.data_dir, name)
+                survey_id, owners = _identify(path, self.config_dir)
+                st = os.stat(path)
+                rows = _count_rows(path)
+                for key, goal in owners:
+                    projects.setdefault(hash_key(key, salt), {})[name] = {
+                        "survey_id": survey_id, "goal": goal, "rows": rows,
+                        "bytes": st.st_size, "modified": st.st_mtime
+                    }
+            self._set(salt, projects)
+            self._save()
+            return len(names)
+
+    def lookup(self, secret_key):
+        """비밀번호에 해당하는 프로젝트 파일 목록 (ProjectEntry, 파일 이름 순). 없으면 빈 목록
+
+        색인 밖에서 지워진 파일은 건너뛴다 (이 비밀번호의 파일만 확인).
+        """
+        with self._lock:
+            self._refresh()
+            files = self._projects.get(hash_key(secret_key, self._salt), {})
+            return [
+                ProjectEntry(name, os.path.join(self.data_dir, name), info["survey_id"], info["goal"],
+                             info["rows"], info["bytes"], info["modified"])
+                for name, info in sorted(files.items())
+                if os.path.exists(os.path.join(self.data_dir, name))
+            ]
+
+    def _update(self, csv_path, rows, replace):
+        name = os.path.basename(csv_path)
+        st = os.stat(csv_path)
+        with self._locked():
+            if self._refresh():
+                return      # 색인을 새로 만들면서 이 파일도 이미 셌음
+            hashes = self._owner.get(name)
+            if hashes is None:
+                survey_id, owners = _identify(csv_path, self.config_dir)
+                hashes = self._owner[name] = []
+                for key, goal in owners:
+                    h = hash_key(key, self._salt)
+                    hashes.append(h)
+                    self._projects.setdefault(h, {})[name] = {"survey_id": survey_id, "goal": goal, "rows": 0}
+            for h in hashes:
+                info = self._projects[h][name]
+                info["rows"] = rows if replace else info["rows"] + rows
+                info["bytes"] = st.st_size
+                info["modified"] = st.st_mtime
+            self._save()
+
+    def record_append(self, csv_path, rows):
+        """응답 rows건이 기록된 뒤 호출. 처음 보는 파일은 설문 정의로 비밀번호를 찾아 등록"""
+        self._update(csv_path, rows, replace=False)
+
+    def record_rebuild(self, csv_path, rows):
+        """CSV를 로그로부터 다시 만든 뒤 호출 (응답 수를 rows로 교체)"""
+        self._update(csv_path, rows, replace=True)
+
+    def remove(self, csv_path):
+        name = os.path.basename(csv_path)
+        with self._locked():
+            self._refresh()
+            hashes = self._owner.pop(name, None)
+            if hashes is None:
+                return
+            for h in hashes:
+                files = self._projects[h]
+                files.pop(name, None)
+                if not files:
+                    del self._projects[h]
+            self._save()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_project_index(data_dir=DATA_DIR):
+    """데이터 폴더별로 프로세스 전체에서 공유하는 색인"""
+    with _indexes_lock:
+        index = _indexes.get(data_dir)
+        if index is None:
+            index = _indexes[data_dir] = ProjectIndex(data_dir)
+        return index
+
+def index_for(csv_path):
+    """응답 파일이 속한 데이터 폴더의 색인"""
+    return get_project_index(os.path.dirname(csv_path) or ".")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+    print(f"{args.data_dir}: {get_project_index(args.data_dir).rebuild()}개 파일 색인")
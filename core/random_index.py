@@ -0,0 +1,87 @@
+"""무작위 일관성 지수(RI) 표: n ≤ 10은 Saaty 표, 그보다 크면 몬테카를로로 한 번 계산해 디스크에 보관
+
+    python -m core.random_index --max-n 30     # 미리 계산해 두기
+"""
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+RI_TABLE = {1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49}
+CACHE_PATH = "ri_cache.json"
+MAX_N = 30              # 미리 계산할 최대 항목 수
+SAMPLES = 5000          # n별 무작위 행렬 수
+SEED = 2024
+CHUNK = 500             # 한 번에 고유값을 구할 행렬 수
+
+SCALE = np.array([1 / 9, 1 / 8, 1 / 7, 1 / 6, 1 / 5, 1 / 4, 1 / 3, 1 / 2, 1, 2, 3, 4, 5, 6, 7, 8, 9])
+
+_table = None
+_lock = threading.Lock()
+
+# --------------------------------------------------------------------------
+# 2. 몬테카를로 계산
+# --------------------------------------------------------------------------
+def monte_carlo_ri(n, samples=SAMPLES, seed=SEED):
+    """Saaty 척도에서 고르게 뽑은 무작위 역수 행렬들의 평균 CI"""
+    if n <= 2:
+        return 0.0
+    rng = np.random.default_rng(seed + n)
+    iu = np.triu_indices(n, 1)
+    total = 0.0
+    for start in range(0, samples, CHUNK):
+        count = min(CHUNK, samples - start)
+        m = np.ones((count, n, n))
+        upper = rng.choice(SCALE, size=(count, len(iu[0])))
+        m[:, iu[0], iu[1]] = upper
+        m[:, iu[1], iu[0]] = 1.0 / upper
+        total += np.linalg.eigvals(m).real.max(axis=1).sum()
+    return float((total / samples - n) / (n - 1))
+
+# --------------------------------------------------------------------------
+# 3. 디스크 캐시
+# --------------------------------------------------------------------------
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {int(k): float(v) for k, v in data.items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def _save(table, path):
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({str(k): v for k, v in sorted(table.items())}, f, indent=1)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def random_index(n, path=CACHE_PATH):
+    """n개 항목의 RI. 처음 필요할 때만 계산하고 이후에는 메모리·디스크에서 읽음"""
+    if n in RI_TABLE:
+        return RI_TABLE[n]
+    global _table
+    with _lock:
+        if _table is None:
+            _table = _load(path)
+        if n not in _table:
+            _table[n] = monte_carlo_ri(n)
+            _save(_table, path)
+        return _table[n]
+
+def precompute(max_n=MAX_N, path=CACHE_PATH):
+    return {n: random_index(n, path) for n in range(1, max_n + 1)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-n", type=int, default=MAX_N)
+    args = parser.parse_args()
+    for n, ri in precompute(args.max_n).items():
+        print(f"{n:>3} {ri:.4f}")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from core.aggregation import prepare, summarize
+from core.batch_ahp import long_table
+from core.consistency import CR_LIMIT
+
+# --------------------------------------------------------------------------
+# 결과 리포트 표 (결과 데이터 센터 화면·내보내기 공용)
+# --------------------------------------------------------------------------
+def build_report(df, result):
+    """응답 전체와 일괄 계산 결과 -> (결과, 유효 여부, 현황판, 유효 응답 2차 항목 행, 개인별 상세)
+
+    df의 인덱스를 순번으로 쓰므로 파일을 나눠 읽은 묶음(core.streaming)에도 그대로 쓸 수 있다.
+    """
+    respondents = df['Respondent'].to_numpy() if 'Respondent' in df else np.full(len(df), '익명', dtype=object)
+    times = df['Time'].to_numpy()
+    ok = np.flatnonzero(result.ok)
+    cr = np.round(result.cr, 4)
+    valid = result.ok & (result.cr <= CR_LIMIT)
+
+    status_df = pd.DataFrame({
+        "순번": df.index.to_numpy()[ok] + 1,
+        "응답자": respondents[ok],
+        "작성시간": times[ok],
+        "일관성지수(CR)": cr[ok],
+        "유효판정": np.where(valid[ok], "O", "X")
+    })
+
+    table = long_table(result)
+    if table is None:
+        return result, valid, status_df, pd.DataFrame(), pd.DataFrame()
+    rows, parent, p_w, item, s_w, g_w = table
+    keep = valid[rows]
+    rows, parent, p_w, item, s_w, g_w = (c[keep] for c in table)
+    res_df = pd.DataFrame({"1차 기준": parent, "1차 가중치": p_w, "2차 항목": item, "2차 가중치": s_w, "종합 가중치": g_w})
+
+    # 개인별 순위: 응답자 순서대로, 각자 종합 가중치 내림차순
+    order = np.lexsort((-g_w, rows))
+    personal_df = res_df.iloc[order].reset_index(drop=True)
+    sorted_rows = rows[order]
+    personal_df.insert(0, '응답자', respondents[sorted_rows])
+    personal_df.insert(1, '작성시간', times[sorted_rows])
+    personal_df.insert(2, 'CR', cr[sorted_rows])
+    personal_df.insert(3, '순위', personal_df.groupby(sorted_rows).cumcount().to_numpy() + 1)
+    return result, valid, status_df, res_df, personal_df
+
+def ranking_frame(subs, summary):
+    """2차 그룹 구조(SubResult 목록)와 집계 결과(aggregation.Summary) -> 종합 순위 표"""
+    final_df = pd.DataFrame({
+        "1차 기준": [sub.parent for sub in subs for _ in sub.items],
+        "2차 항목": [item for sub in subs for item in sub.items],
+        "1차 가중치": np.concatenate([np.full(len(sub.items), summary.main[sub.parent_idx]) for sub in subs]),
+        "2차 가중치": np.concatenate(summary.subs),
+        "종합 가중치": summary.total
+    })
+    if summary.ci_low is not None:
+        final_df["95% CI 하한"] = summary.ci_low
+        final_df["95% CI 상한"] = summary.ci_high
+        final_df["순위 안정성"] = summary.rank_stability
+    final_df = final_df.dropna(subset=['종합 가중치']).sort_values(by='종합 가중치', ascending=False)
+    final_df['순위'] = range(1, len(final_df) + 1)
+    return final_df
+
+def group_ranking(result, valid, aggregation, method, cr_weighted, resamples):
+    """유효 응답자의 집단 종합 순위 (선택한 집계 방식, 부트스트랩 신뢰구간·순위 안정성 포함)"""
+    summary = summarize(prepare(result, valid, aggregation, method, cr_weighted), resamples)
+    return ranking_frame(result.subs, summary)
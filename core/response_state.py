@@ -0,0 +1,183 @@
+import threading
+import time
+
+import numpy as np
+
+from core.adaptive import AdaptiveElicitation
+from core.consistency import ConsistencyTracker
+from core.live_ranking import LiveRanking
+from core.survey_plan import pair_key
+
+# --------------------------------------------------------------------------
+# 1. 응답자별 최소 상태 (설문 정의의 쌍 번호 기준 int8 슬라이더 코드)
+# --------------------------------------------------------------------------
+UNANSWERED = -128   # 아직 답하지 않은 쌍
+MAX_CODE = 4        # 슬라이더 범위 -4 ~ 4
+
+def code_weight(code):
+    """슬라이더 코드 -> a[u][v] (음수: u 우세, 양수: v 우세)"""
+    code = int(code)
+    if code == 0: return 1.0
+    elif code < 0: return abs(code) + 1.0
+    else: return 1.0 / (code + 1.0)
+
+def weight_code(w):
+    """a[u][v] -> 가장 가까운 슬라이더 코드 (이전 형식의 체크포인트 복원용)"""
+    if w >= 1:
+        return -min(MAX_CODE, int(round(w)) - 1)
+    return min(MAX_CODE, int(round(1.0 / w)) - 1)
+
+class ResponseState:
+    """응답자 한 명의 진행 상태. 항목명·행렬 없이 번호와 int8 코드만 보관
+
+    답변은 설문 전체의 쌍을 이어 붙인 하나의 int8 배열에, 각 쌍의 (u < v) 방향 코드로 저장한다.
+    비교 행렬과 순위 엔진은 필요할 때 코드에서 다시 만든다.
+    """
+
+    __slots__ = ("task_idx", "step", "codes", "offsets", "task_cr",
+                 "ranks", "order", "n_asked", "pair_idx", "adaptive")
+
+    def __init__(self, plan):
+        sizes = [len(t.pairs) for t in plan.tasks]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int32)
+        self.codes = np.full(int(self.offsets[-1]), UNANSWERED, dtype=np.int8)
+        self.task_cr = np.full(len(plan.tasks), np.nan, dtype=np.float32)
+        self.task_idx = 0
+        self.step = 'ranking'   # ranking -> compare -> finish
+        self.ranks = None       # 현재 과제에서 응답자가 정한 순위 (항목 인덱스 순)
+        self.order = None       # 현재 과제의 질문 순서 (쌍 번호)
+        self.n_asked = 0
+        self.pair_idx = 0
+        self.adaptive = False
+
+    def task_codes(self, task_idx=None):
+        t = self.task_idx if task_idx is None else task_idx
+        return self.codes[self.offsets[t]:self.offsets[t + 1]]
+
+    def start(self, task, ranks, order, adaptive):
+        """순위를 확정하고 질문 순서를 정함. 같은 과제의 이전 답변은 지움"""
+        self.ranks = np.asarray(ranks, dtype=np.int8)
+        self.order = np.zeros(len(task.pairs), dtype=np.int16)
+        self.order[:len(order)] = order
+        self.n_asked = len(order)
+        self.pair_idx = 0
+        self.adaptive = adaptive
+        self.task_codes()[:] = UNANSWERED
+        self.step = 'compare'
+
+    def push(self, pair_no):
+        """적응형 모드에서 다음 질문 추가"""
+        self.order[self.n_asked] = pair_no
+        self.n_asked += 1
+
+    def current_pair(self):
+        return int(self.order[self.pair_idx])
+
+    def answer(self, task, u, v, code):
+        """a[u][v]에 해당하는 코드를 쌍 방향에 맞춰 기록하고, 그 쌍 번호를 반환"""
+        no = task.pair_no[(u, v)]
+        self.task_codes()[no] = code if task.pairs[no].u == u else -code
+        return no
+
+    def answered(self):
+        """현재 과제에서 질문한 순서대로 (쌍 번호, a[pu][pv])"""
+        codes = self.task_codes()
+        return [(int(no), code_weight(codes[no])) for no in self.order[:self.n_asked] if codes[no] != UNANSWERED]
+
+    def finish_task(self, cr):
+        self.task_cr[self.task_idx] = cr
+        self.task_idx += 1
+        self.step = 'ranking'
+        self.ranks = self.order = None
+        self.n_asked = self.pair_idx = 0
+
+    def answers_dict(self, plan):
+        """제출용 응답 형식 {"[과제] A vs B": a_AB} (결과 분석 화면과 호환)"""
+        result = {}
+        for t, task in enumerate(plan.tasks):
+            codes = self.task_codes(t)
+            for no in np.flatnonzero(codes != UNANSWERED):
+                p = task.pairs[no]
+                result[pair_key(task, p)] = round(code_weight(codes[no]), 3)
+        return result
+
+    def cr_by_task(self, plan):
+        return {task.name: float(cr) for task, cr in zip(plan.tasks, self.task_cr) if not np.isnan(cr)}
+
+    def snapshot(self):
+        """체크포인트 압축용 상태 요약 (JSON으로 쓸 수 있는 dict)"""
+        return {
+            "t": self.task_idx, "st": self.step, "c": self.codes.tolist(),
+            "cr": [None if np.isnan(cr) else float(cr) for cr in self.task_cr],
+            "r": None if self.ranks is None else self.ranks.tolist(),
+            "o": None if self.order is None else self.order.tolist(),
+            "n": self.n_asked, "p": self.pair_idx, "a": int(self.adaptive)
+        }
+
+    def load_snapshot(self, snap):
+        """snapshot()으로 만든 요약에서 상태를 되살림"""
+        self.task_idx, self.step = snap["t"], snap["st"]
+        self.codes[:] = snap["c"]
+        self.task_cr[:] = [np.nan if cr is None else cr for cr in snap["cr"]]
+        self.ranks = None if snap["r"] is None else np.asarray(snap["r"], dtype=np.int8)
+        self.order = None if snap["o"] is None else np.asarray(snap["o"], dtype=np.int16)
+        self.n_asked, self.pair_idx, self.adaptive = snap["n"], snap["p"], bool(snap["a"])
+
+# --------------------------------------------------------------------------
+# 2. 현재 과제의 계산 엔진 (프로세스 공용, 유휴 응답자는 비움)
+# --------------------------------------------------------------------------
+IDLE_SECONDS = 15 * 60      # 이 시간 동안 조작이 없으면 엔진을 비움 (다음 조작 때 코드에서 재구성)
+SWEEP_INTERVAL = 60
+
+class Engines:
+    __slots__ = ("live", "consistency", "adaptive", "used")
+
+    def __init__(self, task, state):
+        order = [int(i) for i in np.argsort(state.ranks, kind="stable")]
+        self.live = LiveRanking(task)
+        self.consistency = ConsistencyTracker(len(task.items))
+        self.adaptive = AdaptiveElicitation(task, order) if state.adaptive else None
+        for no, w in state.answered():
+            self.set(task.pairs[no].u, task.pairs[no].v, w)
+        self.used = time.monotonic()
+
+    def set(self, u, v, w):
+        self.live.set(u, v, w)
+        self.consistency.set(u, v, w)
+        if self.adaptive is not None: self.adaptive.set(u, v, w)
+
+_engines = {}
+_lock = threading.Lock()
+_last_sweep = 0.0
+
+def get_engines(session, task, state):
+    """응답 세션의 현재 과제 엔진. 없거나 비워졌으면 저장된 코드로 다시 만듦
+
+    URL의 응답자 토큰이 아닌 세션별 키로 찾으므로, 같은 링크를 연 창끼리 엔진을 공유하지 않는다.
+    """
+    sweep()
+    with _lock:
+        eng = _engines.get(session)
+        if eng is not None:
+            eng.used = time.monotonic()
+            return eng
+    eng = Engines(task, state)
+    with _lock:
+        _engines[session] = eng
+    return eng
+
+def drop_engines(session):
+    with _lock:
+        _engines.pop(session, None)
+
+def sweep(force=False):
+    """조작이 없는 응답자의 엔진을 비움"""
+    global _last_sweep
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_sweep < SWEEP_INTERVAL:
+            return
+        _last_sweep = now
+        idle = [k for k, eng in _engines.items() if now - eng.used > IDLE_SECONDS]
+        for k in idle:
+            del _engines[k]
@@ -0,0 +1,202 @@
+"""대용량 응답 파일의 분할 분석: 응답을 묶음 단위로 읽어 계산하고, 집단 집계는 누적 합으로,
+응답자별 상세 표는 디스크로 내려 보내 메모리 사용량이 응답자 수와 무관하게 일정하다.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from core.aggregation import (
+    BOOTSTRAP_CHUNK, CI_LEVEL, DEFAULT_AGGREGATION, Summary, combine, group_sums, local_weights, prepare,
+    with_intervals
+)
+from core.batch_ahp import (
+    DEFAULT_METHOD, DecodeReport, analyze_values, canonical_keys, compile_schema, decode, empty_report, infer_schema,
+    merge_reports, schema_report
+)
+from core.report import build_report, ranking_frame
+from core.submission_store import complete_size, file_identity, file_lock, iter_responses, stream_path
+from core.survey_plan import plan_for_data_file
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+STREAM_CHUNK = 5000                     # 한 번에 읽어 계산할 응답 수
+STREAM_MIN_BYTES = 50 * 1024 * 1024     # 이보다 큰 파일은 결과 화면에서 분할 분석을 기본으로 선택
+MAX_RESULTS = 8                         # 프로세스에 보관할 분할 분석 결과 수
+
+# --------------------------------------------------------------------------
+# 2. 누적 집계 (유효 응답자의 가중 합을 묶음마다 더함)
+# --------------------------------------------------------------------------
+class RunningAggregate:
+    """집단 집계(aggregation.group_sums)의 분자·분모를 응답자 묶음마다 누적
+
+    부트스트랩은 응답자마다 재표본별 Poisson(1) 횟수를 뽑는 온라인 방식으로 같은 합에 누적한다.
+    전체 응답을 메모리에 두는 aggregation.bootstrap의 다항 재표본과 분포가 근사적으로 같고,
+    메모리는 재표본 수 × 쌍 수만 쓴다.
+    """
+
+    def __init__(self, aggregation=DEFAULT_AGGREGATION, method=DEFAULT_METHOD, cr_weighted=False, resamples=0, seed=0):
+        self.aggregation = aggregation
+        self.method = method
+        self.cr_weighted = cr_weighted
+        self.resamples = resamples
+        self.seeds = np.random.SeedSequence(seed)
+        self.groups = None      # [batch_ahp.Group] (1차 기준, 2차 그룹들...)
+        self.parents = None
+        self.point = None       # 그룹별 [분자 (1, 열), 분모 (1, 열)]
+        self.boot = None        # 그룹별 [분자 (재표본, 열), 분모 (재표본, 열)]
+        self.count = 0
+
+    def add(self, result, valid):
+        """묶음 하나의 일괄 계산 결과와 유효 여부 (R,)를 더함"""
+        if result.main_group is None:
+            return
+        inp = prepare(result, valid, self.aggregation, self.method, self.cr_weighted)
+        if self.point is None:
+            self.groups = [g.group for g in inp.groups]
+            self.parents = [g.parent_idx for g in inp.groups[1:]]
+            widths = [len(g.group.u) if self.aggregation == "aij" else len(g.group.items) for g in inp.groups]
+            self.point = [[np.zeros((1, w)), np.zeros((1, w))] for w in widths]
+            self.boot = [[np.zeros((self.resamples, w)), np.zeros((self.resamples, w))] for w in widths]
+
+        rv = len(inp.respondent_weights)
+        if not rv:
+            return
+        self.count += rv
+        alpha = inp.respondent_weights[None, :]
+        for acc, g in zip(self.point, inp.groups):
+            num, den = group_sums(g, alpha, self.aggregation)
+            acc[0] += num
+            acc[1] += den
+
+        rng = np.random.default_rng(self.seeds.spawn(1)[0])
+        for start in range(0, self.resamples, BOOTSTRAP_CHUNK):
+            stop = min(start + BOOTSTRAP_CHUNK, self.resamples)
+            weights = rng.poisson(1.0, size=(stop - start, rv)) * alpha
+            for acc, g in zip(self.boot, inp.groups):
+                num, den = group_sums(g, weights, self.aggregation)
+                acc[0][start:stop] += num
+                acc[1][start:stop] += den
+
+    def _local(self, sums):
+        local = [local_weights(num, den, g, self.aggregation, self.method) for (num, den), g in zip(sums, self.groups)]
+        return local[0], local[1:], combine(local[0], local[1:], self.parents)
+
+    def summary(self, level=CI_LEVEL):
+        """누적한 응답자 전체의 aggregation.Summary (누적된 응답이 없으면 None)"""
+        if self.point is None:
+            return None
+        main, subs, total = self._local(self.point)
+        main, subs, total = main[0], [s[0] for s in subs], total[0]
+        if self.resamples <= 0 or not self.count:
+            return Summary(main, subs, total, None, None, None)
+        return with_intervals(main, subs, total, self._local(self.boot)[2], level)
+
+# --------------------------------------------------------------------------
+# 3. 분할 분석
+# --------------------------------------------------------------------------
+class StreamResult(NamedTuple):
+    csv_path: str
+    method: str
+    rows: int               # 읽은 응답 수
+    analyzed: int           # 해독·계산된 응답 수
+    valid: int              # 집계에 쓴 응답 수
+    ranking: object         # 집단 종합 순위 DataFrame (유효 응답이 없으면 None)
+    status_path: str        # 응답자 현황 CSV
+    personal_path: str      # 개인별 상세 CSV (유효 응답만)
+    report: DecodeReport
+    seconds: float
+
+def _scan_schema(csv_path, chunk_rows):
+    """설문 정의를 찾을 수 없을 때: 파일을 한 번 훑어 응답 키만 모은 뒤 스키마를 추론"""
+    keys = {}
+    for chunk in iter_responses(csv_path, chunk_rows):
+        for raw in chunk["Raw_Data"]:
+            try:
+                data = json.loads(raw)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(data, dict):
+                keys.update(dict.fromkeys(data))
+    return infer_schema(canonical_keys(keys))
+
+def _append_csv(frame, path):
+    if not frame.empty:
+        frame.to_csv(path, mode="a", header=not os.path.exists(path), index=False, encoding="utf-8")
+
+def analyze_stream(csv_path, method=DEFAULT_METHOD, aggregation=DEFAULT_AGGREGATION, cr_weighted=False,
+                   resamples=0, seed=0, chunk_rows=STREAM_CHUNK):
+    """응답 파일을 chunk_rows행씩 읽어 분석. 집단 순위는 누적 합으로, 응답자별 표는 CSV로 내려 씀"""
+    started = time.perf_counter()
+    plan = plan_for_data_file(csv_path)
+    schema, bad_keys = (compile_schema(plan), []) if plan is not None else _scan_schema(csv_path, chunk_rows)
+
+    # 응답자별 표는 방법마다 따로, 다 쓴 뒤 이름을 바꿔 교체 (읽는 쪽이 쓰는 중인 파일을 보지 않도록)
+    target = os.path.join(stream_path(csv_path), method)
+    os.makedirs(stream_path(csv_path), exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{method}.", dir=stream_path(csv_path))
+    status_path, personal_path = os.path.join(tmp, "status.csv"), os.path.join(tmp, "personal.csv")
+
+    running = RunningAggregate(aggregation, method, cr_weighted, resamples, seed)
+    report, subs = empty_report(), None
+    rows = analyzed = valid_count = 0
+    try:
+        for chunk in iter_responses(csv_path, chunk_rows):
+            values, _, ok, chunk_report = decode(chunk["Raw_Data"].tolist(), schema.columns, extend=False)
+            report = merge_reports(report, chunk_report)
+            if plan is None:
+                report = merge_reports(report, schema_report(values, schema, bad_keys))
+            result, valid, status_df, _, personal_df = build_report(chunk, analyze_values(values, schema, ok, method=method))
+            _append_csv(status_df, status_path)
+            _append_csv(personal_df, personal_path)
+            running.add(result, valid)
+            subs = subs or result.subs
+            rows += len(chunk)
+            analyzed += int(result.ok.sum())
+            valid_count += int(valid.sum())
+
+        # 같은 방법의 분석이 동시에 끝나도 교체는 한 번에 하나씩
+        with file_lock(csv_path):
+            old = f"{target}.old"
+            shutil.rmtree(old, ignore_errors=True)
+            if os.path.exists(target):
+                os.rename(target, old)
+            os.rename(tmp, target)
+            shutil.rmtree(old, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)     # 교체했으면 이미 없음, 도중에 실패했으면 임시 결과를 지움
+
+    summary = running.summary() if valid_count and subs else None
+    ranking = ranking_frame(subs, summary) if summary is not None else None
+    return StreamResult(csv_path, method, rows, analyzed, valid_count, ranking, os.path.join(target, "status.csv"),
+                        os.path.join(target, "personal.csv"), report, time.perf_counter() - started)
+
+# --------------------------------------------------------------------------
+# 4. 결과 보관 (파일이 그대로면 같은 설정의 분석을 다시 하지 않음)
+# --------------------------------------------------------------------------
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+def stream_result(csv_path, method=DEFAULT_METHOD, aggregation=DEFAULT_AGGREGATION, cr_weighted=False,
+                  resamples=0, seed=0):
+    """analyze_stream 결과. 파일(식별자·완성된 크기)과 설정이 같으면 보관해 둔 결과를 돌려줌"""
+    key = (csv_path, file_identity(csv_path), complete_size(csv_path), method, aggregation, cr_weighted, resamples, seed)
+    plan = plan_for_data_file(csv_path)     # load_plan은 정의가 같으면 같은 객체를 돌려줌
+    with _results_lock:
+        cached_plan, cached = _results.get(key, (None, None))
+        if cached is not None and cached_plan is plan and os.path.exists(os.path.dirname(cached.status_path)):
+            _results.move_to_end(key)
+            return cached
+    result = analyze_stream(csv_path, method, aggregation, cr_weighted, resamples, seed)
+    with _results_lock:
+        _results[key] = (plan, result)
+        while len(_results) > MAX_RESULTS:
+            _results.popitem(last=False)
+    return result
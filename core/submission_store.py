@@ -0,0 +1,447 @@
+import atexit
+import csv
+import io
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+from core.project_index import index_for
+
+try:
+    import fcntl
+except ImportError:  # Windows 등 fcntl이 없는 환경은 프로세스 내 잠금만 사용
+    fcntl = None
+
+# --------------------------------------------------------------------------
+# 1. 설정
+# --------------------------------------------------------------------------
+COLUMNS = ["Time", "Respondent", "Raw_Data"]
+BATCH_WINDOW = 0.05   # 첫 제출 후 같은 묶음으로 모을 최대 대기 시간 (초)
+MAX_BATCH = 256       # 한 번에 기록할 최대 제출 수
+RETRY_INTERVAL = 1.0  # 기록에 실패한 묶음을 다시 시도하는 간격 (초)
+MAX_ATTEMPTS = 5      # 이만큼 연속 실패하면 격리 파일로 옮김
+STATUS_KEEP = 4096    # 결과를 기억해 둘 최근 제출 수 (SubmissionWriter.wait)
+
+# 제출 상태 (SubmissionWriter.wait)
+PENDING = "pending"     # 아직 기록 전
+WRITTEN = "written"     # 로그와 CSV에 기록 (fsync 완료)
+RETRYING = "retrying"   # 기록에 실패하여 다시 시도하는 중
+FAILED = "failed"       # 끝내 기록하지 못해 격리 파일에 보관
+
+logger = logging.getLogger(__name__)
+
+def log_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".jsonl"
+
+def lock_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".lock"
+
+def failed_path(csv_path):
+    """기록하지 못한 제출을 보관하는 격리 파일 (retry_failed로 다시 기록)"""
+    return os.path.splitext(csv_path)[0] + ".failed.jsonl"
+
+def columnar_path(csv_path):
+    """분석용 열 형식 저장소 디렉터리 (core.columnar)"""
+    return os.path.splitext(csv_path)[0] + ".ahpcol"
+
+def stream_path(csv_path):
+    """분할 분석의 응답자별 상세 결과를 내려 두는 디렉터리 (core.streaming)"""
+    return os.path.splitext(csv_path)[0] + ".stream"
+
+def export_path(csv_path):
+    """만들어 둔 리포트 파일을 보관하는 디렉터리 (core.export)"""
+    return os.path.splitext(csv_path)[0] + ".export"
+
+# --------------------------------------------------------------------------
+# 2. 파일 잠금
+# --------------------------------------------------------------------------
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+@contextmanager
+def file_lock(csv_path, exclusive=True):
+    """같은 프로젝트 파일에 대한 프로세스 간(flock)·스레드 간 잠금"""
+    with _thread_locks_guard:
+        tlock = _thread_locks.setdefault(csv_path, threading.Lock())
+    with tlock:
+        if fcntl is None:
+            yield
+            return
+        with open(lock_path(csv_path), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# --------------------------------------------------------------------------
+# 3. 기록/조회
+# --------------------------------------------------------------------------
+def _csv_lines(records, header):
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    if header:
+        writer.writerow(COLUMNS)
+    for r in records:
+        writer.writerow([r.get(c, "") for c in COLUMNS])
+    return buf.getvalue()
+
+def _migrate_legacy(csv_path):
+    """로그 도입 이전의 CSV가 있으면 기존 행을 로그로 옮겨 재구성 가능하게 함"""
+    path = log_path(csv_path)
+    if os.path.exists(path) or not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return
+    old = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    with open(path, "w", encoding="utf-8") as f:
+        for r in old.to_dict("records"):
+            f.write(json.dumps({c: r.get(c, "") for c in COLUMNS}, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+class CsvWriteError(OSError):
+    """로그에는 기록했지만 CSV에 쓰지 못함 (다시 시도할 때는 logged로 로그 단계를 건너뜀)"""
+
+def append_records(csv_path, records, logged=0):
+    """제출 묶음을 로그와 CSV 끝에 이어 쓰고, 묶음당 한 번만 fsync (프로젝트 색인은 호출한 쪽이 _update_index로 갱신)
+
+    앞의 logged건은 이미 로그에 있으므로 CSV에만 쓴다. CSV 쓰기가 실패하면 잘린 줄을 남기지 않도록
+    쓰기 전 크기로 되돌리고 CsvWriteError를 올린다.
+    """
+    if not records:
+        return
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    with file_lock(csv_path):
+        _migrate_legacy(csv_path)
+        if logged < len(records):
+            with open(log_path(csv_path), "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records[logged:]))
+                f.flush()
+                os.fsync(f.fileno())
+
+        size = os.path.getsize(csv_path) if os.path.exists(csv_path) else 0
+        try:
+            with open(csv_path, "a", encoding="utf-8", newline="") as f:
+                f.write(_csv_lines(records, header=size == 0))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            try:
+                os.truncate(csv_path, size)
+            except OSError:
+                pass
+            raise CsvWriteError(str(e)) from e
+
+def _update_index(action, csv_path, *args):
+    """프로젝트 색인(core.project_index) 갱신. 응답은 이미 기록되었으므로 실패해도 로그만 남김
+
+    색인은 응답 파일에서 다시 만들 수 있다 (python -m core.project_index).
+    """
+    try:
+        getattr(index_for(csv_path), action)(csv_path, *args)
+    except Exception:
+        logger.exception("프로젝트 색인 갱신 실패: %s", csv_path)
+
+def read_responses(csv_path):
+    """기록 중인 묶음이 섞이지 않은 시점의 응답 전체"""
+    with file_lock(csv_path, exclusive=False):
+        return pd.read_csv(csv_path)
+
+def file_identity(csv_path):
+    """파일이 통째로 교체·삭제되었는지 판단하기 위한 (장치, inode). 없으면 None"""
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+def read_responses_since(csv_path, offset=0, columns=None):
+    """offset 바이트 이후에 이어 쓰인 응답 행과 (새 offset, 파일 식별자)
+
+    CSV는 제출 묶음 단위로 끝에만 추가되므로, 이전에 읽은 위치부터 완성된 줄만 읽는다.
+    offset이 0이면 헤더를 포함한 전체를 읽고, 아니면 columns를 열 이름으로 쓴다.
+    """
+    with file_lock(csv_path, exclusive=False):
+        identity = file_identity(csv_path)
+        with open(csv_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    end = data.rfind(b"\n") + 1
+    data = data[:end]
+    if offset == 0:
+        df = pd.read_csv(io.BytesIO(data)) if data else pd.DataFrame(columns=COLUMNS)
+    elif data:
+        df = pd.read_csv(io.BytesIO(data), header=None, names=columns or COLUMNS)
+    else:
+        df = pd.DataFrame(columns=columns or COLUMNS)
+    return df, offset + end, identity
+
+class _Head(io.RawIOBase):
+    """파일의 앞 limit 바이트만 보이는 읽기 스트림"""
+
+    def __init__(self, f, limit):
+        self._f, self._left = f, limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        n = self._f.readinto(memoryview(buf)[:max(0, min(len(buf), self._left))])
+        self._left -= n
+        return n
+
+def complete_size(csv_path, lock=True):
+    """마지막 완성된 줄까지의 바이트 수 (기록 중인 묶음은 제외)
+
+    lock=False는 호출한 쪽이 이미 file_lock을 잡고 있을 때 (잠금은 다시 잡을 수 없음)
+    """
+    if lock:
+        with file_lock(csv_path, exclusive=False):
+            return complete_size(csv_path, lock=False)
+    with open(csv_path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 1))
+        if size == 0 or f.read(1) == b"\n":
+            return size
+        # 드물게 잘린 마지막 줄이 있으면 뒤에서부터 줄바꿈을 찾음
+        pos = size
+        while pos > 0:
+            step = min(65536, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            nl = block.rfind(b"\n")
+            if nl >= 0:
+                return pos - step + nl + 1
+            pos -= step
+        return 0
+
+def iter_responses(csv_path, chunk_rows):
+    """응답을 chunk_rows행씩 나눠 읽는 DataFrame 반복자. 시작 시점까지 완성된 줄만 읽으며, 인덱스는 파일 전체 기준"""
+    end = complete_size(csv_path)
+    if end == 0:
+        return
+    with open(csv_path, "rb") as f:
+        stream = io.TextIOWrapper(io.BufferedReader(_Head(f, end)), encoding="utf-8", newline="")
+        yield from pd.read_csv(stream, chunksize=chunk_rows)
+
+def rebuild_csv(csv_path):
+    """로그로부터 기존 CSV 형식을 다시 생성. 같은 제출 ID가 여러 번 기록되었으면 처음 것만 씀"""
+    with file_lock(csv_path):
+        records, seen = [], set()
+        with open(log_path(csv_path), "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 비정상 종료로 잘린 마지막 줄
+                sid = record.get("Id")    # 제출 ID 도입 이전의 기록에는 없음
+                if sid is not None:
+                    if sid in seen:
+                        continue    # 격리 후 다시 기록한 제출 등
+                    seen.add(sid)
+                records.append(record)
+        tmp = f"{csv_path}.tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            f.write(_csv_lines(records, header=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, csv_path)
+    _update_index("record_rebuild", csv_path, len(records))
+    return len(records)
+
+def delete_project_file(csv_path):
+    with file_lock(csv_path):
+        for path in (csv_path, log_path(csv_path), failed_path(csv_path)):
+            if os.path.exists(path):
+                os.remove(path)
+        for path in (columnar_path(csv_path), stream_path(csv_path), export_path(csv_path)):
+            shutil.rmtree(path, ignore_errors=True)
+    _update_index("remove", csv_path)
+    try:
+        os.remove(lock_path(csv_path))
+    except OSError:
+        pass
+
+# --------------------------------------------------------------------------
+# 4. 백그라운드 그룹 커밋 기록기
+# --------------------------------------------------------------------------
+class SubmissionWriter:
+    """제출을 큐에 넣고 즉시 반환. 기록 스레드가 모인 제출을 파일별로 한 번에 기록
+
+    기록에 실패한 묶음은 버리지 않고 RETRY_INTERVAL마다 다시 시도하며,
+    MAX_ATTEMPTS번 연속 실패하면 격리 파일(failed_path)로 옮긴다.
+    제출마다 ID를 붙여 로그에 함께 남기므로, 같은 제출이 로그에 두 번 들어가도 rebuild_csv가 한 번만 쓴다.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._retry = {}        # 경로 -> (제출 목록, 실패 횟수, 이미 로그에 쓴 앞부분 건수)
+        self._status = OrderedDict()    # 제출 ID -> WRITTEN / RETRYING / FAILED (최근 STATUS_KEEP건)
+        self._thread = threading.Thread(target=self._run, name="submission-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, csv_path, record):
+        """제출을 큐에 넣고 제출 ID를 반환 (wait로 기록 여부 확인)"""
+        sid = uuid.uuid4().hex
+        with self._cond:
+            self._pending += 1
+        self._queue.put((csv_path, {**{c: record.get(c, "") for c in COLUMNS}, "Id": sid}))
+        return sid
+
+    def wait(self, sid, timeout=2.0):
+        """제출 ID의 상태. timeout 안에 기록되지 않으면 PENDING 또는 RETRYING"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._status.get(sid) in (None, RETRYING):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._status.get(sid, PENDING)
+
+    def _set_status(self, records, status):
+        with self._cond:
+            for r in records:
+                self._status[r["Id"]] = status
+                self._status.move_to_end(r["Id"])
+            while len(self._status) > STATUS_KEEP:
+                self._status.popitem(last=False)
+            self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """대기 중인 제출이 모두 기록(또는 격리)될 때까지 대기"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _collect(self):
+        """큐에서 한 묶음을 모음. 다시 시도할 묶음이 있으면 새 제출이 없어도 RETRY_INTERVAL 뒤 빈 묶음을 반환"""
+        try:
+            batch = [self._queue.get(timeout=RETRY_INTERVAL if self._retry else None)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + BATCH_WINDOW
+        while len(batch) < MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, path, records, logged):
+        """일시적인 OSError는 잠깐 기다렸다 다시 시도 -> (마지막 OSError 또는 None, 로그에 쓴 앞부분 건수)"""
+        error = None
+        for attempt in range(3):
+            if attempt:
+                time.sleep(0.1)
+            try:
+                append_records(path, records, logged)
+                return None, len(records)
+            except CsvWriteError as e:
+                error, logged = e, len(records)     # 다음 시도는 CSV 단계부터 (로그 중복 방지)
+            except OSError as e:
+                error = e
+        return error, logged
+
+    def _run(self):
+        while True:
+            done = 0
+            try:
+                batch = self._collect()
+                # 앞서 실패한 묶음을 먼저 (같은 파일 안의 제출 순서 유지)
+                by_path = {path: list(records) for path, (records, _, _) in self._retry.items()}
+                attempts = {path: (n, logged) for path, (_, n, logged) in self._retry.items()}
+                self._retry = {}
+                for path, record in batch:
+                    by_path.setdefault(path, []).append(record)
+
+                for path, records in by_path.items():
+                    n, logged = attempts.get(path, (0, 0))
+                    try:
+                        error, logged = self._write(path, records, logged)
+                        if error is not None:
+                            raise error
+                    except Exception:
+                        n += 1
+                        logger.exception("응답 기록 실패: %s (%d건, %d회째)", path, len(records), n)
+                        if n < MAX_ATTEMPTS:
+                            self._retry[path] = (records, n, logged)
+                            self._set_status(records, RETRYING)
+                            continue
+                        _quarantine(path, records)
+                        self._set_status(records, FAILED)
+                    else:
+                        # 기록이 끝난 뒤에만 (색인 실패로 같은 제출을 다시 기록하지 않도록)
+                        _update_index("record_append", path, len(records))
+                        self._set_status(records, WRITTEN)
+                    done += len(records)
+            except Exception:
+                logger.exception("응답 기록 스레드 오류")
+            finally:
+                with self._cond:
+                    self._pending -= done
+                    self._cond.notify_all()
+
+def _quarantine(csv_path, records):
+    """끝내 기록하지 못한 제출을 격리 파일에 보관 (그마저 실패하면 내용을 로그로 남김)"""
+    try:
+        os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+        with open(failed_path(csv_path), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        logger.error("응답 %d건을 %s에 격리", len(records), failed_path(csv_path))
+    except Exception:
+        logger.exception("응답 격리 실패: %s %s", csv_path, json.dumps(records, ensure_ascii=False))
+
+def retry_failed(csv_path):
+    """격리된 제출을 다시 기록하고 격리 파일을 지움. 기록한 제출 수를 반환"""
+    claimed = f"{failed_path(csv_path)}.retry"
+    try:
+        os.rename(failed_path(csv_path), claimed)    # 동시에 부른 쪽과 같은 제출을 두 번 기록하지 않도록 먼저 가져감
+    except FileNotFoundError:
+        return 0
+    with open(claimed, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    try:
+        append_records(csv_path, records)
+    except Exception:
+        _quarantine(csv_path, records)
+        raise
+    finally:
+        os.remove(claimed)
+    _update_index("record_append", csv_path, len(records))
+    return len(records)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """프로세스 전체에서 공유하는 기록기"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SubmissionWriter()
+            atexit.register(_writer.flush)
+        return _writer
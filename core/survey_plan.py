@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+# --------------------------------------------------------------------------
+# 설문 정의 캐시 (프로세스 공용, 수정 시각 기준 무효화)
+# --------------------------------------------------------------------------
+CONFIG_DIR = "survey_config"
+MAIN_TASK_NAME = "평가 기준 중요도"
+
+class Pair(NamedTuple):
+    no: int     # 과제 안에서의 쌍 번호 (인덱스 순 u < v)
+    u: int
+    v: int
+    a: str
+    b: str
+
+class Task(NamedTuple):
+    name: str
+    parent: str              # 1차 기준 과제는 None
+    items: tuple
+    index: dict              # 항목명 -> 인덱스
+    pairs: tuple             # 모든 쌍 (Pair)
+    pair_no: dict            # (u, v) -> 쌍 번호 (양방향)
+    pair_u: np.ndarray       # 쌍 번호별 u, v (모든 응답자가 공유하는 배열)
+    pair_v: np.ndarray
+
+    def ordered_pairs(self, order):
+        """응답자가 정한 순위 순서(order: 항목 인덱스 목록)대로의 쌍 번호"""
+        result = []
+        for i in range(len(order)):
+            for j in range(i + 1, len(order)):
+                result.append(self.pair_no[(order[i], order[j])])
+        return result
+
+class SurveyPlan(NamedTuple):
+    goal: str
+    secret_key: str
+    main_criteria: tuple
+    sub_criteria: dict
+    tasks: tuple
+    adaptive: bool           # 적응형(불완전 비교) 모드 기본값
+
+def pair_key(task, pair):
+    """제출 응답의 키 '[과제] A vs B' (값은 a[u][v])"""
+    return f"[{task.name}] {pair.a} vs {pair.b}"
+
+def _make_task(name, parent, items):
+    items = tuple(items)
+    pairs, pair_no = [], {}
+    for u in range(len(items)):
+        for v in range(u + 1, len(items)):
+            no = len(pairs)
+            pairs.append(Pair(no, u, v, items[u], items[v]))
+            pair_no[(u, v)] = pair_no[(v, u)] = no
+    pair_u = np.array([p.u for p in pairs], dtype=np.int16)
+    pair_v = np.array([p.v for p in pairs], dtype=np.int16)
+    pair_u.flags.writeable = pair_v.flags.writeable = False
+    return Task(name, parent, items, {it: i for i, it in enumerate(items)}, tuple(pairs), pair_no, pair_u, pair_v)
+
+def compile_plan(survey_data):
+    """설문 구조(dict)를 과제·항목 인덱스·쌍 테이블이 미리 계산된 불변 객체로 변환"""
+    tasks = []
+    if len(survey_data["main_criteria"]) > 1:
+        tasks.append(_make_task(MAIN_TASK_NAME, None, survey_data["main_criteria"]))
+    for cat, items in survey_data["sub_criteria"].items():
+        if len(items) > 1:
+            tasks.append(_make_task(f"[{cat}] 세부 항목", cat, items))
+    return SurveyPlan(
+        goal=survey_data["goal"],
+        secret_key=survey_data.get("secret_key", "public"),
+        main_criteria=tuple(survey_data["main_criteria"]),
+        sub_criteria={k: tuple(v) for k, v in survey_data["sub_criteria"].items()},
+        tasks=tuple(tasks),
+        adaptive=bool(survey_data.get("adaptive", False))
+    )
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+def load_plan(survey_id, config_dir=CONFIG_DIR):
+    """설문 ID의 컴파일된 정의. 파일이 없으면 None
+
+    파일 수정 시각이 같으면 디스크를 다시 읽지 않고 모든 응답자가 같은 객체를 공유한다.
+    """
+    path = os.path.join(config_dir, f"{survey_id}.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _plans_lock:
+        cached = _plans.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        plan = compile_plan(json.load(f))
+    with _plans_lock:
+        _plans[path] = (mtime, plan)
+    return plan
+
+def data_file_name(plan):
+    """설문 응답이 기록되는 파일 이름"""
+    return f"{plan.secret_key}_{plan.goal.replace(' ', '_')}.csv"
+
+_data_files = {}     # 설정 폴더 -> (폴더 수정 시각, 응답 파일 이름 -> 설문 ID)
+_data_files_lock = threading.Lock()
+
+def _scan_data_files(config_dir, mtime):
+    """설정 폴더의 모든 설문을 읽어 응답 파일 이름 -> 설문 ID 표를 만듦 (폴더가 바뀌었을 때만)"""
+    names = {}
+    try:
+        entries = sorted(os.listdir(config_dir))
+    except OSError:
+        entries = []
+    for entry in entries:
+        if not entry.endswith(".json"):
+            continue
+        survey_id = entry[:-len(".json")]
+        try:
+            plan = load_plan(survey_id, config_dir)
+        except (ValueError, KeyError, TypeError):
+            continue    # 손상된 설정 파일
+        if plan is not None:
+            names.setdefault(data_file_name(plan), survey_id)
+    with _data_files_lock:
+        _data_files[config_dir] = (mtime, names)
+    return names
+
+def survey_for_data_file(csv_path, config_dir=CONFIG_DIR):
+    """응답 파일을 기록한 설문의 (ID, 정의) (파일 이름이 같은 설문). 찾을 수 없으면 (None, None)
+
+    파일 이름 -> 설문 ID 표는 프로세스에 두고 설정 폴더의 수정 시각(설문 추가·삭제)이 바뀔 때만 다시 만든다.
+    찾은 설문은 load_plan으로 확인하므로, 설정 파일 내용이 바뀌어 이름이 달라졌으면 그때 다시 만든다.
+    """
+    name = os.path.basename(csv_path)
+    try:
+        mtime = os.stat(config_dir).st_mtime_ns
+    except OSError:
+        return None, None
+    with _data_files_lock:
+        cached = _data_files.get(config_dir)
+    names = cached[1] if cached is not None and cached[0] == mtime else _scan_data_files(config_dir, mtime)
+
+    for attempt in range(2):
+        survey_id = names.get(name)
+        if survey_id is None:
+            return None, None
+        try:
+            plan = load_plan(survey_id, config_dir)
+        except (ValueError, KeyError, TypeError):
+            plan = None
+        if plan is not None and data_file_name(plan) == name:
+            return survey_id, plan
+        if attempt == 0:
+            names = _scan_data_files(config_dir, mtime)
+    return None, None
+
+def plan_for_data_file(csv_path, config_dir=CONFIG_DIR):
+    """응답 파일을 기록한 설문의 정의. 찾을 수 없으면 None"""
+    return survey_for_data_file(csv_path, config_dir)[1]
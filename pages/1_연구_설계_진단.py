@@ -1,8 +1,12 @@
 import streamlit as st
-import google.generativeai as genai
-import re
-import time
-import random
+
+from core import metrics
+from core.diagnosis import (
+    DEFAULT_CONCURRENCY, PENDING_RESULT, build_groups, diagnose_batched, diagnose_concurrently, diff_groups, make_snapshot
+)
+from core.diagnosis_cache import get_cache
+from core.llm import get_scheduler
+from core.prescreen import prescreen
 
 # --------------------------------------------------------------------------
 # 1. 페이지 설정
@@ -27,106 +31,32 @@ if not API_KEYS:
         if user_input:
             API_KEYS = [k.strip() for k in user_input.replace(',', '\n').split('\n') if k.strip()]
 
-# --------------------------------------------------------------------------
-# 3. AI 분석 함수
-# --------------------------------------------------------------------------
-def analyze_ahp_logic(goal, parent, children):
-    empty_res = {"grade": "오류", "summary": "분석 실패", "suggestion": "잠시 후 시도", "example": "", "detail": "API 호출량 초과"}
-
-    if not children:
-        return {**empty_res, "grade": "정보없음", "summary": "하위 항목 없음"}
-    
-    if not API_KEYS:
-        return {**empty_res, "grade": "키 없음", "summary": "API 키 없음"}
-    
-    is_main = (goal == parent)
-    scope_guide = "1차 평가 기준의 균형성(MECE)을 중심으로 진단." if is_main else f"상위 기준 '{parent}'의 하위 세부 항목 적절성만 진단(다른 기준 언급 금지)."
-
-    models = [
-        'gemini-2.5-flash-lite', 
-        'gemini-2.0-flash-lite-preview-02-05', 
-        'gemini-2.5-flash', 
-        'gemini-2.0-flash', 
-        'gemini-2.0-pro-exp-02-05'
-    ]
-    
-    prompt = f"""
-    [분석 대상]
-    - 목표: {goal}
-    - 기준: {parent}
-    - 하위: {children}
-    
-    [지침 1: 태도]
-    - 주제가 전문적이면 '냉철한 컨설턴트', 일상적이면 '친절한 멘토' 톤.
-    - {scope_guide}
-    
-    [지침 2: 형식]
-    - **한국어** 작성.
-    - **특수문자(**, *) 사용 금지.**
-    - [EXAMPLE]은 설명 없이 **추천 항목 명사**만 나열.
-    
-    [출력 포맷]
-    [GRADE] 적합/보완필요/부적합
-    [SUMMARY] (1줄 요약)
-    [SUGGESTION] (1줄 제안)
-    [EXAMPLE]
-    - 항목1
-    - 항목2
-    - 항목3
-    [DETAIL]
-    1. 구성: (내용)
-    2. 위계: (내용)
-    3. 용어: (내용)
-    """
-    
-    attempts = []
-    for model in models:
-        shuffled_keys = API_KEYS.copy()
-        random.shuffle(shuffled_keys)
-        for key in shuffled_keys:
-            attempts.append((key, model))
-            
-    last_error = ""
-    
-    for i, (key, model_name) in enumerate(attempts):
-        try:
-            genai.configure(api_key=key)
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(prompt)
-            text = response.text
-            
-            def extract(tag, t):
-                match = re.search(fr"\[{tag}\](.*?)(?=\[|$)", t, re.DOTALL | re.IGNORECASE)
-                if match:
-                    c = match.group(1).strip()
-                    c = c.replace("**", "").replace("*", "") 
-                    return re.sub(r"^[\s\:\-]]+|[\s\]\:\-]+$", "", c).strip()
-                return "-"
-
-            return {
-                "grade": extract("GRADE", text),
-                "summary": extract("SUMMARY", text),
-                "suggestion": extract("SUGGESTION", text),
-                "example": extract("EXAMPLE", text),
-                "detail": extract("DETAIL", text)
-            }
-
-        except Exception as e:
-            last_error = str(e)
-            time.sleep(0.2)
-            continue
-
-    return {**empty_res, "detail": f"모든 키와 모델이 한도 초과입니다. (Last: {last_error})"}
+with st.sidebar:
+    mode = st.radio("🧭 진단 방식", ["그룹별 동시 진단", "일괄 진단 (1회 호출)"], help="일괄 진단은 전체 계층을 한 번에 요청하여 호출량을 줄입니다.")
+    concurrency = st.slider("⚡ 동시 진단 수", min_value=1, max_value=8, value=DEFAULT_CONCURRENCY, help="한 번에 요청할 그룹 수 (1이면 순차 진단)")
+    skip_obvious = st.toggle("⚡ 명백한 구조 오류는 AI 호출 생략", value=True, help="중복 항목, 상위와 같은 항목, 1개뿐인 그룹은 로컬 점검 결과만 표시합니다.")
+    use_cache = st.toggle("💾 진단 결과 캐시 사용", value=True, help="목표·기준·하위 항목이 같으면 저장된 결과를 재사용합니다.")
+    stream = st.toggle("📡 스트리밍 진단", value=True, help="응답이 도착하는 대로 등급·요약부터 먼저 표시합니다.")
+    hits, misses = get_cache().hit_miss()
+    st.caption(f"캐시 적중 {hits}회 / 미적중 {misses}회")
+    ttfs = metrics.summary("diagnosis.ttfs")
+    if ttfs:
+        st.caption(f"첫 섹션 표시까지 평균 {ttfs['mean']:.2f}초 (p95 {ttfs['p95']:.2f}초, {ttfs['count']}회)")
+    key_status = get_scheduler().snapshot()
+    if key_status:
+        with st.expander("🔌 API 키 상태"):
+            st.dataframe(key_status, hide_index=True)
 
 # --------------------------------------------------------------------------
-# 4. UI 렌더링 함수
+# 3. UI 렌더링 함수
 # --------------------------------------------------------------------------
-def render_result_ui(title, data, count_msg=""):
+def render_result_ui(title, data, count_msg="", badge=""):
     grade = data.get('grade', '정보없음').replace("[", "").replace("]", "").strip()
     
-    if "적합" in grade: icon, color, bg = "✅", "green", "#f0fff4"
+    # '부적합'에도 '적합'이 들어 있으므로 먼저 확인
+    if "부적합" in grade: icon, color, bg = "🚨", "red", "#fff5f5"
+    elif "적합" in grade: icon, color, bg = "✅", "green", "#f0fff4"
     elif "보완" in grade: icon, color, bg = "⚠️", "orange", "#fffcf5"
-    elif "부적합" in grade: icon, color, bg = "🚨", "red", "#fff5f5"
     else: icon, color, bg = "❓", "gray", "#f8f9fa"
 
     with st.container(border=True):
@@ -135,11 +65,12 @@ def render_result_ui(title, data, count_msg=""):
         c2.markdown(f"<div style='color:{color}; font-weight:bold; text-align:right;'>{grade}</div>", unsafe_allow_html=True)
         
         if count_msg: st.caption(f":red[{count_msg}]")
+        if badge: st.caption(badge)
         st.divider()
         
         st.write(f"**📋 진단 요약:** {data.get('summary', '-')}")
         
-        if "적합" in grade:
+        if "적합" in grade and "부적합" not in grade:
             st.success(f"💡 **제안:** {data.get('suggestion', '구성이 훌륭합니다.')}")
         else:
             st.info(f"💡 **제안:** {data.get('suggestion', '-')}")
@@ -158,10 +89,11 @@ def render_result_ui(title, data, count_msg=""):
             st.write(cl)
 
 # --------------------------------------------------------------------------
-# 5. 메인 로직
+# 4. 메인 로직
 # --------------------------------------------------------------------------
 if 'main_count' not in st.session_state: st.session_state.main_count = 1 
 if 'sub_counts' not in st.session_state: st.session_state.sub_counts = {}
+if 'last_diagnosis' not in st.session_state: st.session_state.last_diagnosis = None
 
 st.title("1️⃣ 연구 설계 및 AI 진단")
 
@@ -198,32 +130,64 @@ if goal:
                 struct[c] = subs
 
         st.divider()
+        full_rerun = st.checkbox("🔁 변경 여부와 관계없이 전체 다시 진단")
         if st.button("🚀 AI 진단 시작", type="primary"):
             if not API_KEYS:
                 st.error("API 키가 없습니다!")
             else:
-                total_steps = 1 + len(struct)
+                groups = build_groups(goal, main, struct)
+                snapshot = None if full_rerun else st.session_state.last_diagnosis
+                changed, results = diff_groups(snapshot, goal, groups, skip_obvious)
+
+                # 로컬 사전 점검: 명백한 오류는 AI 호출 없이 바로 판정
+                findings = prescreen(groups)
+                local = {}
+                if skip_obvious:
+                    local = {gid: findings[gid]["card"] for gid, _, _ in changed if gid in findings and findings[gid]["blocking"]}
+                    changed = [g for g in changed if g[0] not in local]
+
+                total_steps = len(groups)
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                if results:
+                    status_text.text(f"🧠 변경된 {len(changed)}개 그룹 분석 중... ({len(results)}개 그룹은 이전 결과 재사용)")
+                else:
+                    status_text.text(f"🧠 {total_steps}개 그룹 동시 분석 중...")
+
+                def render_group(gid, res, badge):
+                    warnings = findings[gid]["warnings"] if gid in findings else []
+                    msg = ""
+                    if warnings:
+                        msg = f"⚠️ {warnings[0]}" + (f" 외 {len(warnings)-1}건" if len(warnings) > 1 else "")
+                    with slots[gid].container():
+                        if gid == "__main__":
+                            render_result_ui(f"1차 기준: {goal}", res, msg, badge)
+                        else:
+                            render_result_ui(f"세부항목: {gid}", res, msg, badge)
+
+                # 카드 순서는 입력 순서대로 유지하고, 끝나는 그룹부터 채움
+                slots = {gid: st.empty() for gid, _, _ in groups}
+                for gid, res in results.items():
+                    render_group(gid, res, "♻️ 이전 결과 재사용")
+                for gid, res in local.items():
+                    render_group(gid, res, "⚡ 로컬 사전 점검 (AI 호출 생략)")
+                results.update(local)
+                done = len(results)
+                progress_bar.progress(done/total_steps)
+
+                if mode.startswith("일괄"):
+                    events = diagnose_batched(goal, changed, API_KEYS, concurrency, use_cache)
+                else:
+                    events = diagnose_concurrently(goal, changed, API_KEYS, concurrency, use_cache, stream)
+                for gid, res, finished in events:
+                    if not finished: res = {**PENDING_RESULT, **res}
+                    render_group(gid, res, "🆕 새로 진단")
+                    if finished:
+                        results[gid] = res
+                        done += 1
+                        progress_bar.progress(done/total_steps)
                 
-                status_text.text("🧠 1차 기준 분석 중...")
-                res = analyze_ahp_logic(goal, goal, main)
-                render_result_ui(f"1차 기준: {goal}", res)
-                
-                progress_bar.progress(1/total_steps)
-                time.sleep(2)
-                
-                current_step = 2
-                for p, ch in struct.items():
-                    status_text.text(f"🧠 '{p}' 분석 중...")
-                    msg = "⚠️ 항목 과다" if len(ch) >= 8 else ""
-                    res = analyze_ahp_logic(goal, p, ch)
-                    render_result_ui(f"세부항목: {p}", res, msg)
-                    
-                    progress_bar.progress(current_step/total_steps)
-                    time.sleep(2)
-                    current_step += 1
-                
+                st.session_state.last_diagnosis = make_snapshot(goal, groups, results, local)
                 status_text.success("✅ 분석 완료!")
                 progress_bar.progress(1.0)
 
@@ -1,10 +1,14 @@
 import streamlit as st
 import json
-import pandas as pd
 from datetime import datetime
 import os
-import uuid
-import numpy as np
+
+from core import checkpoint, metrics
+from core.consistency import CR_LIMIT
+from core.live_ranking import flipped_items
+from core.response_state import ResponseState, code_weight, drop_engines, get_engines, weight_code
+from core.submission_store import FAILED, RETRYING, WRITTEN, get_writer
+from core.survey_plan import compile_plan, data_file_name, load_plan
 
 # ==============================================================================
 # [설정] URL
@@ -12,6 +16,7 @@ import numpy as np
 FULL_URL = "https://ahp-platform-bbee45epwqjjy2zfpccz7p.streamlit.app/%EC%84%A4%EB%AC%B8_%EC%A7%84%ED%96%89"
 CONFIG_DIR = "survey_config"
 os.makedirs(CONFIG_DIR, exist_ok=True)
+SUBMIT_WAIT = 3.0                   # 제출이 디스크에 기록되기를 기다리는 최대 시간 (초)
 
 st.set_page_config(page_title="설문 진행", page_icon="📝", layout="wide")
 
@@ -45,256 +50,366 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def ratio_text(a, b, x):
+    """a 대 b 비교값 x를 읽기 쉬운 문장으로"""
+    if abs(x - 1) < 0.05: return f"'{a}'와 '{b}' 동등"
+    return f"'{a}'가 {x:.1f}배 중요" if x > 1 else f"'{b}'가 {1/x:.1f}배 중요"
+
 # ==============================================================================
-# [함수] AHP 계산 로직 (파이썬)
+# [함수] 응답 진행 상태 변경 (모든 변경은 체크포인트에 변경분으로 기록)
 # ==============================================================================
-def calculate_current_ranks(items, matrix):
-    """현재 매트릭스 기반 가중치 및 순위 계산"""
-    n = len(items)
-    # 기하평균법 사용 (실시간 계산에 빠름)
-    weights = []
-    for i in range(n):
-        row_prod = np.prod(matrix[i])
-        weights.append(row_prod ** (1/n))
-    
-    total_weight = sum(weights)
-    norm_weights = [w / total_weight for w in weights]
-    
-    # 가중치 내림차순으로 순위 매기기 (동점 처리 포함)
-    indexed_weights = sorted(enumerate(norm_weights), key=lambda x: x[1], reverse=True)
+def log_event(event):
+    if st.session_state.get('replaying'):
+        return
+    if checkpoint.append(st.session_state.get('token'), event) == checkpoint.FULL:
+        # 크기 한도: 콜백이 모두 끝난 뒤 상태 요약으로 로그를 교체 (아래 메인 로직)
+        st.session_state['compact'] = True
+
+def engines():
+    """현재 과제의 순위·일관성 엔진 (유휴로 비워졌으면 저장된 코드로 재구성)"""
+    resp = st.session_state['resp']
+    return get_engines(st.session_state['session'], plan.tasks[resp.task_idx], resp)
+
+def start_task(initial_ranks, adaptive):
+    """순위를 확정하고 쌍대비교 단계로 이동"""
+    resp = st.session_state['resp']
+    current_task = plan.tasks[resp.task_idx]
+    ranks = [initial_ranks[i] for i in range(len(initial_ranks))]
     
-    rank_map = {}
-    current_rank = 1
-    for i in range(len(indexed_weights)):
-        idx, w = indexed_weights[i]
-        if i > 0 and abs(w - indexed_weights[i-1][1]) < 0.00001:
-            pass # 동점이면 랭크 유지
-        else:
-            current_rank = i + 1
-        rank_map[idx] = current_rank
-        
-    return rank_map, norm_weights
+    # 비교 순서: 미리 계산된 쌍 테이블의 번호만 순위대로 나열
+    sorted_indices = sorted(initial_ranks, key=initial_ranks.get) # 순위대로 정렬
+    if adaptive:
+        # 이웃한 순위끼리만 먼저 묻고, 이후 질문은 하나씩 골라 추가
+        order = [current_task.pair_no[(sorted_indices[k], sorted_indices[k + 1])] for k in range(len(sorted_indices) - 1)]
+    else:
+        order = current_task.ordered_pairs(sorted_indices)
+    drop_engines(st.session_state['session'])
+    resp.start(current_task, ranks, order, adaptive)
+    log_event({"e": "s", "r": ranks, "a": int(adaptive)})
+
+def record_answer(u, v, code):
+    """a[u][v]의 슬라이더 코드 기록 후 다음 질문으로 (과제가 끝나면 다음 과제로)"""
+    resp = st.session_state['resp']
+    current_task = plan.tasks[resp.task_idx]
+    eng = engines()
+
+    # 결과 기록 및 엔진 갱신
+    resp.answer(current_task, u, v, code)
+    eng.set(u, v, code_weight(code))
+    log_event({"e": "a", "u": u, "v": v, "c": code})
+
+    # 인덱스 증가
+    resp.pair_idx += 1
+    if resp.pair_idx >= resp.n_asked and eng.adaptive is not None and not eng.adaptive.is_done():
+        resp.push(eng.adaptive.next_pair())
+
+    # 완료 시 다음 태스크로 (엔진은 비움)
+    if resp.pair_idx >= resp.n_asked:
+        resp.finish_task(eng.adaptive.cr if eng.adaptive is not None else eng.consistency.cr)
+        drop_engines(st.session_state['session'])
+
+def go_back():
+    st.session_state['resp'].pair_idx -= 1
+    log_event({"e": "b"})
+
+def reset_ranking():
+    st.session_state['resp'].step = 'ranking'
+    log_event({"e": "r"})
+
+def restore(events):
+    """체크포인트 변경분을 순서대로 다시 적용하여 중단 시점의 상태를 복원"""
+    st.session_state['replaying'] = True
+    try:
+        for ev in events:
+            kind = ev.get("e")
+            if kind == "s":
+                start_task({i: r for i, r in enumerate(ev["r"])}, bool(ev["a"]))
+            elif kind == "a":
+                # 이전 형식은 코드 대신 비교값(w)을 기록
+                record_answer(ev["u"], ev["v"], ev["c"] if "c" in ev else weight_code(ev["w"]))
+            elif kind == "b":
+                go_back()
+            elif kind == "r":
+                reset_ranking()
+            elif kind == "z":
+                # 압축된 로그의 상태 요약
+                st.session_state['resp'].load_snapshot(ev)
+                drop_engines(st.session_state['session'])
+    finally:
+        st.session_state['replaying'] = False
 
 # ==============================================================================
 # [메인 로직]
 # ==============================================================================
 
-# 1. URL 파라미터 및 설정 로드
-query_params = st.query_params
-raw_id = query_params.get("id", None)
-survey_id = raw_id if raw_id else None
-
-survey_data = None
-if survey_id:
-    config_path = os.path.join(CONFIG_DIR, f"{survey_id}.json")
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            survey_data = json.load(f)
+# 서버 CPU 사용량: 전체 페이지 실행 vs fragment 단독 실행 (?debug=1 로 확인)
+# st.stop·st.rerun으로 중간에 끝난 실행도 기록되도록 타이머 블록으로 감쌈
+with metrics.cpu_timer("survey.full_run_cpu"):
+    # 1. URL 파라미터 및 설정 로드
+    query_params = st.query_params
+    raw_id = query_params.get("id", None)
+    survey_id = raw_id if raw_id else None
+
+    plan = None
+    if survey_id:
+        # 프로세스 공용 캐시: 파일이 바뀌지 않았으면 디스크를 다시 읽지 않음
+        plan = load_plan(survey_id, CONFIG_DIR)
+        if plan is None:
+            st.error("유효하지 않은 링크입니다.")
+            st.stop()
     else:
-        st.error("유효하지 않은 링크입니다.")
+        survey_data = st.session_state.get("passed_structure", None)
+        if survey_data:
+            if st.session_state.get('plan_source') is not survey_data:
+                st.session_state['plan'] = compile_plan(survey_data)
+                st.session_state['plan_source'] = survey_data
+            plan = st.session_state['plan']
+
+    if not plan:
+        st.warning("설문 데이터를 불러올 수 없습니다.")
         st.stop()
-else:
-    survey_data = st.session_state.get("passed_structure", None)
-
-if not survey_data:
-    st.warning("설문 데이터를 불러올 수 없습니다.")
-    st.stop()
-
-st.title(f"📝 {survey_data['goal']}")
-
-# 2. 데이터 준비 (Flatten Tasks)
-if 'tasks' not in st.session_state:
-    tasks = []
-    if len(survey_data["main_criteria"]) > 1:
-        tasks.append({"name": "평가 기준 중요도", "items": survey_data["main_criteria"]})
-    for cat, items in survey_data["sub_criteria"].items():
-        if len(items) > 1:
-            tasks.append({"name": f"[{cat}] 세부 항목", "items": items})
-    st.session_state['tasks'] = tasks
-    st.session_state['current_task_idx'] = 0
-    st.session_state['step'] = 'ranking' # ranking -> compare -> finish
-    st.session_state['answers'] = {}
-
-# 현재 작업 정보
-tasks = st.session_state['tasks']
-if st.session_state['current_task_idx'] >= len(tasks):
-    st.session_state['step'] = 'finish'
 
-# ==============================================================================
-# [UI] 단계별 화면
-# ==============================================================================
+    st.title(f"📝 {plan.goal}")
 
-if st.session_state['step'] == 'finish':
-    st.success("모든 설문이 완료되었습니다!")
-    st.text_area("결과 코드", json.dumps(st.session_state['answers'], ensure_ascii=False, indent=2), height=200)
-    
-    with st.form("final_submit"):
-        name = st.text_input("응답자 성함")
-        if st.form_submit_button("최종 제출"):
-            # 저장 로직
-            goal_clean = survey_data["goal"].replace(" ", "_")
-            secret_key = survey_data.get("secret_key", "public")
-            file_path = f"survey_data/{secret_key}_{goal_clean}.csv"
-            save_dict = {"Time": datetime.now().strftime("%Y-%m-%d %H:%M"), "Respondent": name, "Raw_Data": json.dumps(st.session_state['answers'])}
-            df = pd.DataFrame([save_dict])
-            try: old_df = pd.read_csv(file_path)
-            except: old_df = pd.DataFrame()
-            pd.concat([old_df, df], ignore_index=True).to_csv(file_path, index=False)
-            st.success("제출되었습니다!")
-            st.stop()
+    # 2. 응답자 진행 상태 (과제 목록은 설문 정의에서 공유)
+    # 응답자 토큰을 URL에 두어, 새로고침·재접속 시 서버의 체크포인트에서 이어서 진행
+    # 계산 엔진은 창(세션)별 키로 보관 (같은 링크를 연 창끼리 공유하지 않음)
+    if 'session' not in st.session_state:
+        st.session_state['session'] = checkpoint.new_token()
+    session = st.session_state['session']
 
-elif st.session_state['step'] == 'ranking':
-    # --------------------------------------------------------------------------
-    # 1단계: 순위 설정
-    # --------------------------------------------------------------------------
-    current_task = tasks[st.session_state['current_task_idx']]
-    items = current_task['items']
-    
-    st.subheader(f"Step 1. {current_task['name']} - 순위 설정")
-    st.info("각 항목의 중요도 순위를 설정해주세요.")
-
-    # 순위 입력 폼
-    initial_ranks = {}
-    cols = st.columns(len(items))
-    for idx, item in enumerate(items):
-        with cols[idx]:
-            rank = st.selectbox(f"{item} 순위", options=range(1, len(items)+1), key=f"rank_{idx}")
-            initial_ranks[idx] = rank
-    
-    if st.button("설문 시작하기", type="primary"):
-        # 중복 체크
-        if len(set(initial_ranks.values())) != len(items):
-            st.error("순위가 중복되었습니다. 서로 다른 순위를 지정해주세요.")
+    token = query_params.get("r", None)
+    if not checkpoint.valid_token(token):
+        token = checkpoint.new_token()
+        st.query_params["r"] = token
+
+    if 'resp' not in st.session_state or st.session_state.get('token') != token or st.session_state.get('resp_plan') is not plan:
+        # 응답자별로는 번호와 int8 코드만 보관 (항목명·행렬은 설문 정의와 엔진에서)
+        st.session_state['token'] = token
+        st.session_state['resp'] = ResponseState(plan)
+        st.session_state['resp_plan'] = plan
+        drop_engines(session)
+
+        events = checkpoint.load(token)
+        if events and events[0] == {"e": "h", "g": plan.goal}:
+            restore(events[1:])
+            if events[1:]:
+                st.toast("이전에 진행하던 응답을 불러왔습니다.")
         else:
-            # 초기화 및 다음 단계로 이동
-            st.session_state['initial_ranks'] = initial_ranks
-            st.session_state['matrix'] = np.ones((len(items), len(items)))
-            
-            # 비교 쌍 생성
-            pairs = []
-            sorted_indices = sorted(initial_ranks, key=initial_ranks.get) # 순위대로 정렬
-            for i in range(len(sorted_indices)):
-                for j in range(i + 1, len(sorted_indices)):
-                    u, v = sorted_indices[i], sorted_indices[j]
-                    pairs.append({'u': u, 'v': v, 'a': items[u], 'b': items[v]})
-            
-            st.session_state['pairs'] = pairs
-            st.session_state['pair_idx'] = 0
-            st.session_state['step'] = 'compare'
+            checkpoint.compact(token, [{"e": "h", "g": plan.goal}])
+
+    def sync_checkpoint():
+        """콜백에서 남긴 체크포인트 압축 요청 처리 (fragment만 다시 실행될 때도 각 fragment 앞에서 호출)"""
+        if st.session_state.pop('compact', False):
+            # 변경분 로그가 크기 한도에 닿음: 콜백이 끝난 시점의 상태 요약으로 교체
+            snapshot = {"e": "z", **st.session_state['resp'].snapshot()}
+            if not checkpoint.compact(token, [{"e": "h", "g": plan.goal}, snapshot]):
+                st.warning("진행 상황을 저장하지 못했습니다. 새로고침하면 최근 응답 일부가 사라질 수 있습니다.")
+
+    sync_checkpoint()
+
+    # 현재 작업 정보
+    resp = st.session_state['resp']
+    tasks = plan.tasks
+    if resp.task_idx >= len(tasks):
+        resp.step = 'finish'
+
+    # ==============================================================================
+    # [UI] 단계별 화면 (상호작용이 잦은 부분은 fragment로 분리하여 해당 부분만 재실행)
+    # ==============================================================================
+    @st.fragment
+    def render_ranking():
+        sync_checkpoint()
+        # --------------------------------------------------------------------------
+        # 1단계: 순위 설정
+        # --------------------------------------------------------------------------
+        with metrics.cpu_timer("survey.fragment_cpu"):
+            current_task = tasks[st.session_state['resp'].task_idx]
+            items = current_task.items
+
+            st.subheader(f"Step 1. {current_task.name} - 순위 설정")
+            st.info("각 항목의 중요도 순위를 설정해주세요.")
+
+            # 순위 입력 폼
+            initial_ranks = {}
+            cols = st.columns(len(items))
+            for idx, item in enumerate(items):
+                with cols[idx]:
+                    rank = st.selectbox(f"{item} 순위", options=range(1, len(items)+1), key=f"rank_{idx}")
+                    initial_ranks[idx] = rank
+
+            adaptive = False
+            if len(items) >= 4:
+                adaptive = st.toggle("⚡ 빠른 응답 모드 (필요한 질문만)", value=plan.adaptive, help="순위와 일관성이 안정되면 남은 비교 질문을 생략합니다.")
+
+            start = st.button("설문 시작하기", type="primary")
+            # 중복 체크
+            if start and len(set(initial_ranks.values())) != len(items):
+                st.error("순위가 중복되었습니다. 서로 다른 순위를 지정해주세요.")
+                start = False
+            if start:
+                # 초기화 및 다음 단계로 이동
+                start_task(initial_ranks, adaptive)
+
+        if start:
             st.rerun()
 
-elif st.session_state['step'] == 'compare':
-    # --------------------------------------------------------------------------
-    # 2단계: 쌍대 비교 (여기가 핵심)
-    # --------------------------------------------------------------------------
-    current_task = tasks[st.session_state['current_task_idx']]
-    items = current_task['items']
-    pairs = st.session_state['pairs']
-    pair_idx = st.session_state['pair_idx']
-    
-    # 완료 시 다음 태스크로
-    if pair_idx >= len(pairs):
-        st.session_state['current_task_idx'] += 1
-        st.session_state['step'] = 'ranking'
-        st.rerun()
+    def submit_answer(u, v, pair_idx):
+        """다음 질문 버튼 콜백: 슬라이더 값(0 동등, -1~-4 A 우세, 1~4 B 우세)을 그대로 코드로 기록"""
+        record_answer(u, v, int(st.session_state.get(f"slider_{pair_idx}", 0)))
 
-    p = pairs[pair_idx]
-    
-    # --- [상단] 랭킹 보드 (Red Border 로직 적용) ---
-    rank_map, weights = calculate_current_ranks(items, st.session_state['matrix'])
-    initial_ranks = st.session_state['initial_ranks']
-    
-    # 역전 감지 (쌍방 체크)
-    flipped_indices = set()
-    for i in range(len(items)):
-        for j in range(len(items)):
-            if i == j: continue
-            # 조건: 원래 i가 더 높았는데(숫자 작음), 현재 랭크가 더 낮아짐(숫자 큼)
-            if initial_ranks[i] < initial_ranks[j] and rank_map[i] > rank_map[j]:
-                flipped_indices.add(i)
-                flipped_indices.add(j)
-
-    st.subheader(f"📊 실시간 순위 현황")
-    
-    # 카드 렌더링
-    board_cols = st.columns(len(items))
-    sorted_display = sorted(range(len(items)), key=lambda x: initial_ranks[x])
-    
-    for idx, item_idx in enumerate(sorted_display):
-        is_flipped = item_idx in flipped_indices
-        css_class = "rank-card-red" if is_flipped else "rank-card"
-        text_class = "rank-current-red" if is_flipped else "rank-current"
-        
-        with board_cols[idx]:
-            st.markdown(f"""
-            <div class="{css_class}">
-                <div class="rank-title">{items[item_idx]}</div>
-                <div class="rank-info">설정: {initial_ranks[item_idx]}위</div>
-                <div class="{text_class}">현재: {rank_map[item_idx]}위</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-    if flipped_indices:
-        st.warning("⚠️ 순위 역전이 감지되었습니다! (붉은 테두리 항목)")
-
-    # --- [중단] 질문 카드 ---
-    st.markdown("---")
-    st.markdown(f"### Q{pair_idx+1}. 두 항목 중 무엇이 더 중요합니까?")
-    
-    col1, col2, col3 = st.columns([1, 8, 1])
-    with col1: st.markdown(f"<h3 style='text-align:right; color:#228be6'>{p['a']}</h3>", unsafe_allow_html=True)
-    with col3: st.markdown(f"<h3 style='text-align:left; color:#fa5252'>{p['b']}</h3>", unsafe_allow_html=True)
-    
-    with col2:
-        # 슬라이더 값 매핑 로직
-        # 0: 동등, -1~-4: A우세, 1~4: B우세
-        
-        # 이전 값이 있으면 불러오기
-        prev_val = 0
-        current_val = st.slider("비교", min_value=-4, max_value=4, value=0, step=1, key=f"slider_{pair_idx}", label_visibility="collapsed")
-        
-        # 텍스트 표시
-        if current_val == 0:
-            st.markdown("<h4 style='text-align:center;'>동등함 (1:1)</h4>", unsafe_allow_html=True)
-        elif current_val < 0:
-            st.markdown(f"<h4 style='text-align:center; color:#228be6'>{p['a']} 가 {abs(current_val)+1}배 중요</h4>", unsafe_allow_html=True)
-        else:
-            st.markdown(f"<h4 style='text-align:center; color:#fa5252'>{p['b']} 가 {abs(current_val)+1}배 중요</h4>", unsafe_allow_html=True)
+    @st.fragment
+    def render_slider(pair_idx, a, b):
+        # 슬라이더를 움직일 때는 이 카드만 다시 그림
+        with metrics.cpu_timer("survey.fragment_cpu"):
+            current_val = st.slider("비교", min_value=-4, max_value=4, value=0, step=1, key=f"slider_{pair_idx}", label_visibility="collapsed")
 
-    # --- [하단] 네비게이션 버튼 (핵심 요청 사항) ---
-    st.markdown("<br>", unsafe_allow_html=True)
-    b_col1, b_col2 = st.columns([1, 1])
-    
-    # 버튼 로직
-    with b_col1:
-        if pair_idx == 0:
-            # 첫 질문일 때 -> 순위 재설정 버튼 (붉은색 스타일)
-            if st.button("🔄 순위 재설정", type="primary", use_container_width=True):
-                st.session_state['step'] = 'ranking'
-                st.rerun()
-        else:
-            # 이후 질문 -> 이전 버튼
-            if st.button("⬅ 이전 질문", use_container_width=True):
-                st.session_state['pair_idx'] -= 1
-                st.rerun()
-    
-    with b_col2:
-        if st.button("다음 질문 ➡", type="secondary", use_container_width=True):
-            # 값 저장 로직 (파이썬)
-            val = current_val
-            w = 1.0
-            if val == 0: w = 1.0
-            elif val < 0: w = abs(val) + 1.0 # A 우세
-            else: w = 1.0 / (val + 1.0)      # B 우세
-            
-            # 매트릭스 업데이트
-            st.session_state['matrix'][p['u']][p['v']] = w
-            st.session_state['matrix'][p['v']][p['u']] = 1.0 / w
-            
-            # 결과 기록
-            k = f"[{current_task['name']}] {p['a']} vs {p['b']}"
-            st.session_state['answers'][k] = round(w, 3)
-            
-            # 인덱스 증가
-            st.session_state['pair_idx'] += 1
+            # 텍스트 표시
+            if current_val == 0:
+                st.markdown("<h4 style='text-align:center;'>동등함 (1:1)</h4>", unsafe_allow_html=True)
+            elif current_val < 0:
+                st.markdown(f"<h4 style='text-align:center; color:#228be6'>{a} 가 {abs(current_val)+1}배 중요</h4>", unsafe_allow_html=True)
+            else:
+                st.markdown(f"<h4 style='text-align:center; color:#fa5252'>{b} 가 {abs(current_val)+1}배 중요</h4>", unsafe_allow_html=True)
+
+    @st.fragment
+    def render_compare():
+        sync_checkpoint()
+        # --------------------------------------------------------------------------
+        # 2단계: 쌍대 비교 (여기가 핵심)
+        # 다음/이전 질문은 이 fragment만 다시 실행하고, 과제가 바뀔 때만 전체 페이지를 다시 실행
+        # --------------------------------------------------------------------------
+        resp = st.session_state['resp']
+        if resp.step != 'compare':
+            # 과제가 끝났거나 순위 재설정 -> 화면 전체를 다시 그림
             st.rerun()
+
+        with metrics.cpu_timer("survey.fragment_cpu"):
+            current_task = tasks[resp.task_idx]
+            items = current_task.items
+            pair_idx = resp.pair_idx
+            eng = engines()
+            engine = eng.adaptive
+            initial_ranks = resp.ranks
+
+            p = current_task.pairs[resp.current_pair()]
+            # 응답자가 정한 순위 순서: 먼저 나온 항목이 왼쪽(A)
+            u, v = (p.u, p.v) if initial_ranks[p.u] < initial_ranks[p.v] else (p.v, p.u)
+            a, b = items[u], items[v]
+
+            # --- [상단] 랭킹 보드 (Red Border 로직 적용) ---
+            live = engine if engine is not None else eng.live
+            rank_map = live.ranks()
+
+            # 역전 감지 (쌍방 체크): 원래 더 높았는데 현재 랭크가 더 낮아진 항목 쌍
+            flipped_indices = set(flipped_items(initial_ranks, rank_map).tolist())
+
+            st.subheader(f"📊 실시간 순위 현황")
+
+            # 카드 렌더링
+            board_cols = st.columns(len(items))
+            sorted_display = sorted(range(len(items)), key=lambda x: initial_ranks[x])
+
+            for idx, item_idx in enumerate(sorted_display):
+                is_flipped = item_idx in flipped_indices
+                css_class = "rank-card-red" if is_flipped else "rank-card"
+                text_class = "rank-current-red" if is_flipped else "rank-current"
+
+                with board_cols[idx]:
+                    st.markdown(f"""
+                    <div class="{css_class}">
+                        <div class="rank-title">{items[item_idx]}</div>
+                        <div class="rank-info">설정: {initial_ranks[item_idx]}위</div>
+                        <div class="{text_class}">현재: {rank_map[item_idx]}위</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+            if flipped_indices:
+                st.warning("⚠️ 순위 역전이 감지되었습니다! (붉은 테두리 항목)")
+
+            # --- 실시간 일관성(CR) ---
+            tracker = eng.consistency
+            cr = engine.cr if engine is not None else tracker.cr
+            if len(items) >= 3:
+                if cr <= CR_LIMIT:
+                    st.caption(f"✅ 현재 논리 일관성(CR): {cr:.3f} (기준 {CR_LIMIT} 이하)")
+                else:
+                    st.error(f"🚨 현재 논리 일관성(CR): {cr:.3f} — 기준({CR_LIMIT})을 넘었습니다. 아래 응답을 다시 확인해 주세요.")
+                    # 적응형 모드의 CR은 빈 칸을 추정값으로 채운 행렬에서 나오므로, 모순도 같은 행렬에서 찾음
+                    triads = engine.worst_triads() if engine is not None else tracker.worst_triads()
+                    via = "다른 응답으로 추정하면" if engine is not None else "두 응답으로 보면"
+                    for i, j, l, given, implied in triads:
+                        st.markdown(
+                            f"- **{items[i]} vs {items[l]}**: 응답은 {ratio_text(items[i], items[l], given)}, "
+                            f"'{items[j]}'를 거친 {via} {ratio_text(items[i], items[l], implied)}"
+                        )
+
+            # --- [중단] 질문 카드 ---
+            st.markdown("---")
+            st.markdown(f"### Q{pair_idx+1}. 두 항목 중 무엇이 더 중요합니까?")
+            if engine is not None:
+                st.caption(f"⚡ 빠른 응답 모드: 전체 {len(current_task.pairs)}개 비교 중 필요한 질문만 묻습니다.")
+
+            col1, col2, col3 = st.columns([1, 8, 1])
+            with col1: st.markdown(f"<h3 style='text-align:right; color:#228be6'>{a}</h3>", unsafe_allow_html=True)
+            with col3: st.markdown(f"<h3 style='text-align:left; color:#fa5252'>{b}</h3>", unsafe_allow_html=True)
+            with col2: render_slider(pair_idx, a, b)
+
+            # --- [하단] 네비게이션 버튼 (핵심 요청 사항) ---
+            st.markdown("<br>", unsafe_allow_html=True)
+            b_col1, b_col2 = st.columns([1, 1])
+
+            # 버튼 로직: 콜백에서 상태를 바꾸면 fragment가 새 질문으로 바로 다시 그려짐
+            with b_col1:
+                if pair_idx == 0:
+                    # 첫 질문일 때 -> 순위 재설정 버튼 (붉은색 스타일)
+                    st.button("🔄 순위 재설정", type="primary", use_container_width=True, on_click=reset_ranking)
+                else:
+                    # 이후 질문 -> 이전 버튼
+                    st.button("⬅ 이전 질문", use_container_width=True, on_click=go_back)
+
+            with b_col2:
+                st.button("다음 질문 ➡", type="secondary", use_container_width=True, on_click=submit_answer, args=(u, v, pair_idx))
+
+    if resp.step == 'finish':
+        st.success("모든 설문이 완료되었습니다!")
+        answers = resp.answers_dict(plan)
+        bad_tasks = [name for name, cr in resp.cr_by_task(plan).items() if cr > CR_LIMIT]
+        if bad_tasks:
+            st.warning(f"⚠️ 일관성 기준(CR {CR_LIMIT})을 넘은 문항: {', '.join(bad_tasks)} — 이 응답은 분석에서 제외될 수 있습니다.")
+        st.text_area("결과 코드", json.dumps(answers, ensure_ascii=False, indent=2), height=200)
+
+        with st.form("final_submit"):
+            name = st.text_input("응답자 성함")
+            if st.form_submit_button("최종 제출"):
+                # 저장 로직
+                file_path = os.path.join("survey_data", data_file_name(plan))
+                save_dict = {"Time": datetime.now().strftime("%Y-%m-%d %H:%M"), "Respondent": name, "Raw_Data": json.dumps(answers)}
+                # 파일 전체를 다시 쓰지 않고, 백그라운드 기록기가 모아서 이어 씀 (디스크에 기록될 때까지 잠시 대기)
+                writer = get_writer()
+                status = writer.wait(writer.submit(file_path, save_dict), timeout=SUBMIT_WAIT)
+                if status == FAILED:
+                    st.error("응답을 저장하지 못했습니다. 응답은 관리자 확인용으로 따로 보관되었으니, 설문 관리자에게 알려 주세요.")
+                    st.stop()
+                checkpoint.discard(token)
+                if status == WRITTEN:
+                    st.success("제출되었습니다!")
+                elif status == RETRYING:
+                    st.warning("제출을 받았지만 저장 중 오류가 있어 다시 시도하고 있습니다. 계속 실패하면 응답은 관리자 확인용으로 따로 보관됩니다.")
+                else:
+                    st.warning("제출을 받았지만 아직 저장 중입니다.")
+                st.stop()
+
+    elif resp.step == 'ranking':
+        render_ranking()
+
+    elif resp.step == 'compare':
+        render_compare()
+
+# ?debug=1: 상호작용당 CPU 시간 요약
+if query_params.get("debug"):
+    with st.expander("⏱️ 상호작용당 서버 CPU 시간"):
+        for name in ("survey.full_run_cpu", "survey.fragment_cpu"):
+            stat = metrics.summary(name)
+            if stat:
+                st.caption(f"{name}: 평균 {stat['mean']*1000:.2f}ms, p95 {stat['p95']*1000:.2f}ms ({stat['count']}회)")
@@ -1,10 +1,18 @@
 import streamlit as st
 import pandas as pd
-import json
 import os
-import re
-import numpy as np
-import io
+from datetime import datetime
+from functools import partial
+
+from core.aggregation import AGGREGATION_LABELS, AGGREGATIONS
+from core.analysis_cache import get_analysis_cache
+from core.columnar import convert, open_store
+from core.batch_ahp import METHOD_LABELS, METHODS
+from core.report import build_report, group_ranking
+from core.streaming import STREAM_MIN_BYTES, stream_result
+from core.export import FORMAT_LABELS, FORMATS, available_formats, cached_export, csv_sheet, export_data, fingerprint, frame_sheet
+from core.project_index import get_project_index
+from core.submission_store import delete_project_file, file_identity, iter_responses
 
 # --------------------------------------------------------------------------
 # 1. 페이지 설정
@@ -17,116 +25,78 @@ DATA_FOLDER = "survey_data"
 if not os.path.exists(DATA_FOLDER):
     os.makedirs(DATA_FOLDER)
 
+PREVIEW_ROWS = 1000     # 분할 분석에서 화면에 보여 줄 응답자별 표의 행 수
+
 # --------------------------------------------------------------------------
-# 2. AHP 계산 엔진
+# 2. 화면 구성 요소
 # --------------------------------------------------------------------------
-RI_TABLE = {1: 0, 2: 0, 3: 0.58, 4: 0.90, 5: 1.12, 6: 1.24, 7: 1.32, 8: 1.41, 9: 1.45, 10: 1.49}
-
-def saaty_scale(val):
-    val = int(val)
-    if val == 0: return 1
-    elif val < 0: return 1 / (abs(val) + 1)
-    else: return val + 1
-
-def calculate_ahp(items, pairs_data):
-    n = len(items)
-    if n == 0: return {}, 0
-    
-    matrix = np.ones((n, n))
-    item_map = {name: i for i, name in enumerate(items)}
-
-    for key, val in pairs_data.items():
-        if " vs " in key:
-            parts = key.split(" vs ")
-            item_a, item_b = parts[0].strip(), parts[1].strip()
-            if item_a in item_map and item_b in item_map:
-                idx_a, idx_b = item_map[item_a], item_map[item_b]
-                scale_val = saaty_scale(val)
-                matrix[idx_a][idx_b] = scale_val
-                matrix[idx_b][idx_a] = 1 / scale_val
-
-    geo_means = []
-    for i in range(n):
-        row_prod = np.prod(matrix[i])
-        geo_means.append(row_prod ** (1/n))
-    
-    total_sum = sum(geo_means)
-    weights = [gm / total_sum for gm in geo_means]
-    weights_dict = {items[i]: w for i, w in enumerate(weights)}
-
-    if n <= 2: cr = 0.0
-    else:
-        lambda_max = 0
-        for i in range(n):
-            col_sum = np.sum(matrix[:, i])
-            lambda_max += col_sum * weights[i]
-        ci = (lambda_max - n) / (n - 1)
-        ri = RI_TABLE.get(n, 1.49)
-        cr = ci / ri if ri != 0 else 0
-
-    return weights_dict, cr
-
-def process_single_response(raw_json):
-    try:
-        data = json.loads(raw_json)
-    except:
-        return None, 9.9 
-
-    groups, items_in_group = {}, {}
-    for full_key, val in data.items():
-        match = re.match(r"\[(.*?)\](.*)", full_key)
-        if match:
-            group_name, pair_key = match.group(1), match.group(2).strip()
-            if group_name not in groups: 
-                groups[group_name] = {}
-                items_in_group[group_name] = set()
-            groups[group_name][pair_key] = val
-            if " vs " in pair_key:
-                a, b = pair_key.split(" vs ")
-                items_in_group[group_name].add(a.strip())
-                items_in_group[group_name].add(b.strip())
-
-    calculated_weights = {}
-    max_cr = 0.0 
-    
-    main_group_name = next((k for k in groups.keys() if "1." in k or "기준" in k), None)
-    
-    if main_group_name:
-        items = list(items_in_group[main_group_name])
-        w, cr = calculate_ahp(items, groups[main_group_name])
-        calculated_weights["MAIN"] = w
-        if cr > max_cr: max_cr = cr
-    else:
-        return None, 9.9 
-
-    final_rows = []
-    
-    for group_name, pairs in groups.items():
-        if group_name == main_group_name: continue
-        
-        parent_name = None
-        for m_item in calculated_weights["MAIN"].keys():
-            if m_item in group_name:
-                parent_name = m_item
-                break
-        
-        if parent_name:
-            items = list(items_in_group[group_name])
-            sub_w, sub_cr = calculate_ahp(items, pairs)
-            if sub_cr > max_cr: max_cr = sub_cr
-            
-            p_weight = calculated_weights["MAIN"][parent_name]
-            for s_item, s_weight in sub_w.items():
-                final_weight = p_weight * s_weight
-                final_rows.append({
-                    "1차 기준": parent_name,
-                    "1차 가중치": p_weight,
-                    "2차 항목": s_item,
-                    "2차 가중치": s_weight,
-                    "종합 가중치": final_weight
-                })
+def color_val(val):
+    return 'background-color: #e6fcf5' if val == 'O' else 'background-color: #fff5f5'
+
+def show_decode_report(report):
+    """해독하지 못한 키·값 목록"""
+    if not report:
+        return
+    with st.expander(f"⚠️ 해독하지 못한 응답 값 (JSON 오류 {report.bad_rows}건, 설문에 없는 키 {len(report.unknown)}개, 잘못된 값 {len(report.malformed)}개)"):
+        issues = [("설문에 없는 키", k, n) for k, n in report.unknown.most_common()]
+        issues += [("숫자가 아닌 값 / 형식 오류", k, n) for k, n in report.malformed.most_common()]
+        if issues:
+            st.dataframe(pd.DataFrame(issues, columns=["유형", "키", "응답 수"]), use_container_width=True)
+
+def show_ranking(final_df, aggregation):
+    """집단 종합 순위 표. 화면에 보인 열의 DataFrame을 반환"""
+    extra_cols = [c for c in ['95% CI 하한', '95% CI 상한', '순위 안정성'] if c in final_df.columns]
+    disp_df = final_df[['순위', '1차 기준', '2차 항목', '종합 가중치'] + extra_cols]
+    st.divider()
+    st.markdown(f"### 🏆 2️⃣ 최종 종합 순위 ({AGGREGATION_LABELS[aggregation]})")
+    st.dataframe(disp_df.style.background_gradient(subset=['종합 가중치'], cmap='Blues'), use_container_width=True)
+    return disp_df
+
+def show_downloads(file_path, key, sheets, display_name):
+    """형식별 다운로드 버튼. 누를 때 만들고, 같은 분석(key)이면 보관해 둔 파일을 그대로 전달"""
+    formats = available_formats()
+    for col, fmt in zip(st.columns(len(formats)), formats):
+        ext, mime = FORMATS[fmt]
+        with col:
+            st.download_button(
+                label=f"📊 {FORMAT_LABELS[fmt]}",
+                data=partial(export_data, file_path, key, fmt, sheets),
+                file_name=f"AHP_Report_{display_name}.{ext}",
+                mime=mime,
+                on_click="ignore",
+                type="primary" if fmt == "xlsx" else "secondary",
+                use_container_width=True
+            )
+            info = cached_export(file_path, key, fmt)
+            if info:
+                rss = f" · 서버 최대 메모리 {info.rss_mb:.0f}MB" if info.rss_mb is not None else ""
+                st.caption(f"{info.size_mb:.1f}MB · 생성 {info.seconds:.1f}초{rss}")
+
+def show_stream_result(sres, aggregation, display_name):
+    """분할 분석 결과: 집단 순위와 응답자별 표의 앞부분 (전체는 파일로 내려받음)"""
+    st.markdown("### 1️⃣ 데이터 유효성 검증")
+    st.info(f"총 {sres.analyzed}명 중 **{sres.valid}명(O)**의 데이터로 분석합니다. (분할 분석 {sres.seconds:.1f}초)")
+    if os.path.exists(sres.status_path):
+        preview = pd.read_csv(sres.status_path, nrows=PREVIEW_ROWS)
+        st.caption(f"응답자 현황 앞 {len(preview)}행")
+        st.dataframe(preview.style.applymap(color_val, subset=['유효판정']), use_container_width=True)
+    show_decode_report(sres.report)
+    if sres.ranking is None:
+        st.error("유효한 데이터가 없어 분석할 수 없습니다.")
+        return
+    disp_df = show_ranking(sres.ranking, aggregation)
 
-    return final_rows, max_cr
+    st.divider()
+    st.markdown("### 📥 상세 리포트 다운로드")
+    # 응답자별 표와 원본은 디스크에서 나눠 읽어 씀
+    sheets = [
+        frame_sheet('종합_순위_분석', disp_df),
+        csv_sheet('개인별_상세_결과', sres.personal_path),
+        csv_sheet('응답자_현황_및_CR', sres.status_path),
+        csv_sheet('원본_RAW_데이터', sres.csv_path, read=iter_responses, limit=sres.rows),
+    ]
+    key = fingerprint("stream", sres.csv_path, file_identity(sres.csv_path), sres.rows, sres.method, disp_df)
+    show_downloads(sres.csv_path, key, sheets, display_name)
 
 # --------------------------------------------------------------------------
 # 3. 메인 UI
@@ -135,73 +105,79 @@ with st.sidebar:
     st.header("🔑 접속 인증")
     user_key = st.text_input("프로젝트 비밀번호(Key)", type="password")
 
+    st.header("⚙️ 분석 설정")
+    method = st.selectbox(
+        "가중치 도출 방법", list(METHODS), format_func=METHOD_LABELS.get,
+        help="CR은 방법과 관계없이 실제 최대 고유값(λmax)으로 계산합니다."
+    )
+    aggregation = st.selectbox("집단 집계 방식", AGGREGATIONS, format_func=AGGREGATION_LABELS.get)
+    cr_weighted = st.checkbox("일관성(CR) 가중", help="CR이 낮은 응답자일수록 집계에 더 큰 비중을 둡니다.")
+    resamples = st.number_input("부트스트랩 재표본 수", min_value=0, max_value=20000, value=1000, step=1000,
+                                help="0이면 신뢰구간과 순위 안정성을 계산하지 않습니다.")
+
 if not user_key:
     st.info("👈 사이드바에 **프로젝트 비밀번호**를 입력하세요.")
     st.stop()
 
-all_files = [f for f in os.listdir(DATA_FOLDER) if f.endswith(".csv")]
-my_files = [f for f in all_files if f.startswith(f"{user_key}_")]
+# 프로젝트 색인(비밀번호 해시 -> 파일): 데이터 폴더를 훑지 않고 조회
+my_projects = get_project_index(DATA_FOLDER).lookup(user_key)
 
-if not my_files:
-    st.error(f"비밀번호 '{user_key}'에 해당하는 데이터가 없습니다.")
+if not my_projects:
+    st.error("입력한 비밀번호에 해당하는 데이터가 없습니다.")
     st.stop()
 
 st.success(f"인증 성공! 프로젝트 데이터를 불러왔습니다.")
-selected_file = st.selectbox("📂 분석할 데이터 선택:", my_files)
+projects = {p.file: p for p in my_projects}
+selected_file = st.selectbox("📂 분석할 데이터 선택:", list(projects), format_func=lambda f: projects[f].goal)
 
 if selected_file:
-    file_path = os.path.join(DATA_FOLDER, selected_file)
-    df = pd.read_csv(file_path)
+    selected = projects[selected_file]
+    file_path = selected.path
+    st.caption(f"설문 ID: {selected.survey_id or '-'} · 응답 {selected.rows}명 · 최근 기록 {datetime.fromtimestamp(selected.modified):%Y-%m-%d %H:%M}")
+    # 프로세스 공용 분석 캐시: 지난번 이후 추가된 행만 읽음
+    analysis_cache = get_analysis_cache()
+    # 변환해 둔 열 형식 저장소가 CSV와 일치하면 CSV를 읽지 않고 메모리 매핑으로 분석
+    store = open_store(file_path)
+    file_size = os.path.getsize(file_path)
+    use_stream = store is None and st.checkbox(
+        "분할 분석 (대용량 파일)", value=file_size >= STREAM_MIN_BYTES,
+        help="응답을 나눠 읽어 계산하므로 응답자 수와 관계없이 메모리 사용량이 일정합니다. 응답자별 표는 앞부분만 보여 주고 파일로 내려받습니다."
+    )
+    df = None if use_stream else (store.rows() if store else analysis_cache.frame(file_path))
     
     st.divider()
-    display_name = selected_file.replace(f"{user_key}_", "").replace(".csv", "").replace("_", " ")
+    display_name = selected.goal
     st.subheader(f"📈 분석 대시보드: {display_name}")
-    st.caption(f"총 응답 수: {len(df)}명")
+    if use_stream:
+        st.caption(f"파일 크기: {file_size / 2 ** 20:.1f}MB · 분할 분석")
+    else:
+        st.caption(f"총 응답 수: {len(df)}명" + (" · 열 형식 저장소 사용" if store else ""))
+    if store is None:
+        with st.sidebar:
+            if st.button("📦 분석용 열 형식으로 변환", help="응답이 많을 때 분석 속도와 메모리 사용을 줄입니다. 이후 추가된 응답은 다시 변환할 때까지 CSV로 분석합니다."):
+                with st.spinner("변환 중..."):
+                    convert(file_path)
+                st.rerun()
     
-    if st.button("🧮 분석 실행 (리포트 생성)", type="primary"):
-        
-        valid_data_rows = []    # 집단 분석용 (단순 취합)
-        individual_detail_rows = [] # 개인별 상세 (순위 포함)
-        status_list = []        # 현황판
-        
-        for idx, row in df.iterrows():
-            try:
-                res_rows, person_cr = process_single_response(row['Raw_Data'])
-                if res_rows is None: continue
+    run = st.button("🧮 분석 실행 (리포트 생성)", type="primary")
+    if run and use_stream:
+        # 묶음 단위로 읽어 계산: 집단 집계는 누적 합, 응답자별 표는 디스크로
+        with st.spinner("응답을 나눠 읽으며 분석 중..."):
+            show_stream_result(stream_result(file_path, method, aggregation, cr_weighted, int(resamples)), aggregation, display_name)
 
-                is_valid = person_cr <= 0.1
-                status = {
-                    "순번": idx + 1,
-                    "응답자": row.get('Respondent', '익명'),
-                    "작성시간": row['Time'],
-                    "일관성지수(CR)": round(person_cr, 4),
-                    "유효판정": "O" if is_valid else "X"
-                }
-                status_list.append(status)
-                
-                if is_valid:
-                    valid_data_rows.extend(res_rows)
-                    
-                    # [핵심] 개인별 순위 매기기 로직
-                    # 1. 이 사람의 데이터만으로 DataFrame 생성
-                    person_df = pd.DataFrame(res_rows)
-                    
-                    # 2. 종합 가중치 기준으로 내림차순 정렬
-                    person_df = person_df.sort_values(by='종합 가중치', ascending=False)
-                    
-                    # 3. 순위 부여 (1등부터 N등까지)
-                    person_df['순위'] = range(1, len(person_df) + 1)
-                    
-                    # 4. 인적사항 컬럼 추가 (맨 앞에)
-                    person_df.insert(0, '응답자', row.get('Respondent', '익명'))
-                    person_df.insert(1, '작성시간', row['Time'])
-                    person_df.insert(2, 'CR', round(person_cr, 4))
-                    
-                    # 5. 마스터 리스트에 추가
-                    individual_detail_rows.extend(person_df.to_dict('records'))
-                    
-            except Exception as e:
-                continue 
+    elif run:
+        
+        # 전체 응답자를 그룹별 (R, n, n) 배열로 한 번에 계산
+        # 새로 들어온 응답만 해독·계산하고, 이전 결과에 이어 붙임
+        if store:
+            result = store.analyze(method)
+            report = store.report
+            memo = store.memo
+        else:
+            df, result = analysis_cache.result(file_path, method)
+            report = analysis_cache.report(file_path)
+            memo = lambda key, compute: analysis_cache.memo(file_path, key, compute)
+        result, valid, status_df, res_df, personal_df = build_report(df, result)
 
         # -------------------------------------------------------
         # 화면 출력
@@ -209,26 +185,20 @@ if selected_file:
         
         # 1. 유효성 검사
         st.markdown("### 1️⃣ 데이터 유효성 검증")
-        status_df = pd.DataFrame(status_list)
         if not status_df.empty:
-            def color_val(val):
-                return 'background-color: #e6fcf5' if val == 'O' else 'background-color: #fff5f5'
             st.dataframe(status_df.style.applymap(color_val, subset=['유효판정']), use_container_width=True)
             valid_count = len(status_df[status_df['유효판정'] == 'O'])
             st.info(f"총 {len(status_df)}명 중 **{valid_count}명(O)**의 데이터로 분석합니다.")
+        show_decode_report(report)
         
-        # 2. 종합 순위 (집단 평균)
-        if valid_data_rows:
-            res_df = pd.DataFrame(valid_data_rows)
-            final_df = res_df.groupby(['1차 기준', '2차 항목']).mean(numeric_only=True).reset_index()
-            final_df = final_df.sort_values(by='종합 가중치', ascending=False)
-            final_df['순위'] = range(1, len(final_df) + 1)
-            
-            disp_df = final_df[['순위', '1차 기준', '2차 항목', '종합 가중치']]
-            
-            st.divider()
-            st.markdown("### 🏆 2️⃣ 최종 종합 순위 (집단 평균)")
-            st.dataframe(disp_df.style.background_gradient(subset=['종합 가중치'], cmap='Blues'), use_container_width=True)
+        # 2. 종합 순위 (집단 집계)
+        if not res_df.empty:
+            with st.spinner("집단 가중치 집계 및 부트스트랩 계산 중..."):
+                final_df = memo(
+                    ("ranking", method, aggregation, cr_weighted, int(resamples)),
+                    lambda: group_ranking(result, valid, aggregation, method, cr_weighted, int(resamples))
+                )
+            disp_df = show_ranking(final_df, aggregation)
 
             # -------------------------------------------------------
             # [엑셀 다운로드]
@@ -236,28 +206,20 @@ if selected_file:
             st.divider()
             st.markdown("### 📥 상세 리포트 다운로드")
             
-            # 개인별 상세 데이터 (순위 포함됨)
-            personal_df = pd.DataFrame(individual_detail_rows)
-            
             # 컬럼 순서 정리
             cols = ['응답자', '작성시간', 'CR', '순위', '1차 기준', '1차 가중치', '2차 항목', '2차 가중치', '종합 가중치']
             valid_cols = [c for c in cols if c in personal_df.columns]
             personal_df = personal_df[valid_cols]
 
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                disp_df.to_excel(writer, index=False, sheet_name='종합_순위_분석')
-                personal_df.to_excel(writer, index=False, sheet_name='개인별_상세_결과')
-                status_df.to_excel(writer, index=False, sheet_name='응답자_현황_및_CR')
-                df.to_excel(writer, index=False, sheet_name='원본_RAW_데이터')
-            
-            st.download_button(
-                label="📊 엑셀 리포트 다운로드 (.xlsx)",
-                data=output.getvalue(),
-                file_name=f"AHP_Report_{display_name}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                type="primary"
-            )
+            # 리포트 파일은 다운로드를 누를 때 만듦 (원본 시트의 열 형식 표도 그때 구성)
+            sheets = [
+                frame_sheet('종합_순위_분석', disp_df),
+                frame_sheet('개인별_상세_결과', personal_df),
+                frame_sheet('응답자_현황_및_CR', status_df),
+                frame_sheet('원본_RAW_데이터', store.wide_frame if store else df),
+            ]
+            key = fingerprint("store" if store else "csv", file_path, file_identity(file_path), len(df), method, disp_df)
+            show_downloads(file_path, key, sheets, display_name)
             
             with st.expander("🔍 개인별 상세 분석 데이터 미리보기"):
                 st.dataframe(personal_df)
@@ -269,5 +231,6 @@ if selected_file:
     st.divider()
     with st.expander("🗑️ 데이터 초기화"):
         if st.button("현재 파일 삭제"):
-            os.remove(file_path)
+            delete_project_file(file_path)
+            analysis_cache.invalidate(file_path)
             st.rerun()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from core.adaptive import AdaptiveElicitation, incomplete_ahp
+from core.survey_plan import compile_plan
+
+TRUE = np.array([0.35, 0.25, 0.15, 0.12, 0.08, 0.05])
+TASK = compile_plan({
+    "goal": "테스트",
+    "main_criteria": [f"C{i}" for i in range(len(TRUE))],
+    "sub_criteria": {},
+}).tasks[0]
+
+def _oracle(u, v):
+    """완전히 일관된 응답자: a[u][v] = w_u / w_v"""
+    return TRUE[u] / TRUE[v]
+
+def test_complete_consistent_answers_recover_weights():
+    answers = {(p.u, p.v): _oracle(p.u, p.v) for p in TASK.pairs}
+    w, cr = incomplete_ahp(len(TRUE), answers)
+    np.testing.assert_allclose(w, TRUE)
+    assert cr == pytest.approx(0.0, abs=1e-9)
+
+def test_spanning_tree_is_enough_for_consistent_answers():
+    answers = {(k, k + 1): _oracle(k, k + 1) for k in range(len(TRUE) - 1)}
+    w, _ = incomplete_ahp(len(TRUE), answers)
+    np.testing.assert_allclose(w, TRUE)
+
+def test_elicitation_stops_early_without_repeating_pairs():
+    order = list(np.argsort(-TRUE))
+    session = AdaptiveElicitation(TASK, order)
+    asked = []
+    for no in session.initial:
+        p = TASK.pairs[no]
+        session.set(p.u, p.v, _oracle(p.u, p.v))
+        asked.append(no)
+    while not session.is_done():
+        no = session.next_pair()
+        assert no is not None and no not in asked
+        p = TASK.pairs[no]
+        session.set(p.u, p.v, _oracle(p.u, p.v))
+        asked.append(no)
+    assert len(asked) < len(TASK.pairs)
+    np.testing.assert_allclose(session.weights(), TRUE)
+    assert list(session.ranks()) == [1, 2, 3, 4, 5, 6]
+
+def test_reversed_answer_replaces_the_same_pair():
+    session = AdaptiveElicitation(TASK, list(range(len(TRUE))))
+    session.set(0, 1, 3.0)
+    session.set(1, 0, 2.0)     # 같은 쌍을 반대 방향으로 다시 답함: a[1][0] = 2
+    assert session.answers == {(1, 0): 2.0}
+    w = session.weights()
+    assert w[1] == pytest.approx(2 * w[0])
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.aggregation import AGGREGATIONS, bootstrap, prepare, summarize
+from core.batch_ahp import analyze
+
+MAIN = "평가 기준 중요도"
+
+def _raw(ab, ac, bc, sub):
+    return json.dumps({f"[{MAIN}] A vs B": ab, f"[{MAIN}] A vs C": ac, f"[{MAIN}] B vs C": bc, "[A] a1 vs a2": sub})
+
+@pytest.mark.parametrize("aggregation", AGGREGATIONS)
+def test_identical_respondents_aggregate_to_their_own_weights(aggregation):
+    result = analyze([_raw(2, 4, 2, 3)] * 5)
+    summary = summarize(prepare(result, result.ok, aggregation))
+    np.testing.assert_allclose(summary.main, result.main_weights[0])
+    np.testing.assert_allclose(summary.subs[0], result.subs[0].weights[0])
+
+def test_aij_is_the_geometric_mean_of_judgments():
+    # A vs B 판단 2와 8의 기하평균 4, 나머지는 완전 일관: A = 4B, A = 4C, B = C
+    result = analyze([_raw(2, 4, 1, 1), _raw(8, 4, 1, 1)])
+    summary = summarize(prepare(result, np.ones(2, dtype=bool), "aij"))
+    np.testing.assert_allclose(summary.main, np.array([4, 1, 1]) / 6)
+
+def test_bootstrap_is_reproducible_and_brackets_the_point_estimate():
+    rng = np.random.default_rng(0)
+    raws = [_raw(*rng.choice([1 / 3, 1, 3, 5], size=3), 2) for _ in range(30)]
+    result = analyze(raws)
+    inp = prepare(result, result.ok, "aip_arithmetic")
+    np.testing.assert_array_equal(bootstrap(inp, 200, seed=1, workers=1), bootstrap(inp, 200, seed=1, workers=1))
+    summary = summarize(inp, resamples=200, seed=1, workers=1)
+    assert (summary.ci_low <= summary.total + 1e-12).all() and (summary.total <= summary.ci_high + 1e-12).all()
+    assert ((0 <= summary.rank_stability) & (summary.rank_stability <= 1)).all()
@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.analysis_cache import AnalysisCache
+from core.batch_ahp import analyze
+from core.submission_store import append_records
+
+MAIN = "평가 기준 중요도"
+
+def _raws(n, seed=0):
+    """무작위 응답 (일부는 2차 그룹 미응답)"""
+    rng = np.random.default_rng(seed)
+    scale = lambda: float(rng.choice([1 / 5, 1 / 3, 1, 3, 5]))
+    raws = []
+    for i in range(n):
+        raw = {f"[{MAIN}] A vs B": scale(), f"[{MAIN}] A vs C": scale(), f"[{MAIN}] B vs C": scale()}
+        if i % 3:
+            raw["[A] a1 vs a2"] = scale()
+        raws.append(json.dumps(raw))
+    return raws
+
+def _records(raws, start=0):
+    return [{"Time": "t", "Respondent": f"r{start + i}", "Raw_Data": raw} for i, raw in enumerate(raws)]
+
+def _assert_same(a, b):
+    np.testing.assert_array_equal(a.ok, b.ok)
+    np.testing.assert_allclose(a.main_weights, b.main_weights)
+    np.testing.assert_allclose(a.cr, b.cr)
+    assert len(a.subs) == len(b.subs)
+    for sa, sb in zip(a.subs, b.subs):
+        np.testing.assert_allclose(sa.weights, sb.weights)
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "data" / "key_goal.csv")
+
+@pytest.mark.parametrize("method", ["geometric", "eigenvector"])
+def test_incremental_result_equals_full_analysis(csv_path, method):
+    raws = _raws(30)
+    cache = AnalysisCache()
+    for start in range(0, len(raws), 10):
+        append_records(csv_path, _records(raws[start:start + 10], start))
+        frame, result = cache.result(csv_path, method)
+        assert len(frame) == start + 10
+    _assert_same(result, analyze(raws, method=method))
+    _assert_same(result, AnalysisCache().result(csv_path, method)[1])
+
+def test_rewritten_file_reuses_rows_and_matches_full_analysis(csv_path):
+    raws = _raws(20)
+    append_records(csv_path, _records(raws))
+    cache = AnalysisCache()
+    cache.result(csv_path)
+
+    # 파일이 통째로 다시 쓰임: 한 행이 빠지고 순서가 바뀜
+    frame = pd.read_csv(csv_path)
+    kept = frame.drop(index=3).iloc[::-1]
+    tmp = f"{csv_path}.new"
+    kept.to_csv(tmp, index=False)
+    os.replace(tmp, csv_path)
+
+    _, result = cache.result(csv_path)
+    _assert_same(result, analyze(kept["Raw_Data"].tolist()))
+
+def test_memo_is_dropped_when_rows_are_appended(csv_path):
+    append_records(csv_path, _records(_raws(5)))
+    cache = AnalysisCache()
+    assert cache.memo(csv_path, "n", lambda: len(cache.frame(csv_path))) == 5
+    assert cache.memo(csv_path, "n", lambda: -1) == 5
+    append_records(csv_path, _records(_raws(2, seed=1), 5))
+    assert cache.memo(csv_path, "n", lambda: len(cache.frame(csv_path))) == 7
@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.batch_ahp import Group, analyze, compile_schema, decode_schema, stack_matrices
+from core.response_state import code_weight
+from core.survey_plan import compile_plan, pair_key
+
+PLAN = compile_plan({
+    "goal": "테스트",
+    "main_criteria": ["A", "B", "C"],
+    "sub_criteria": {"A": ["a1", "a2"], "B": [], "C": []},
+})
+
+def _raw(codes_by_task):
+    """과제별 슬라이더 코드 목록 -> 설문이 제출하는 Raw_Data (값은 round(code_weight(code), 3))"""
+    data = {}
+    for task, codes in zip(PLAN.tasks, codes_by_task):
+        for pair, code in zip(task.pairs, codes):
+            data[pair_key(task, pair)] = round(code_weight(code), 3)
+    return json.dumps(data)
+
+def _analyze(*raws, method="geometric"):
+    return analyze(list(raws), method=method, schema=compile_schema(PLAN))
+
+@pytest.mark.parametrize("method", ["geometric", "eigenvector", "column"])
+def test_all_equal_answers_give_equal_weights(method):
+    result = _analyze(_raw([[0, 0, 0], [0]]), method=method)
+    assert result.ok.all()
+    np.testing.assert_allclose(result.main_weights[0], [1 / 3] * 3)
+    np.testing.assert_allclose(result.subs[0].weights[0], [0.5, 0.5])
+    assert result.cr[0] == pytest.approx(0.0, abs=1e-9)
+
+def test_consistent_answers_round_trip():
+    # A = 2B, B = 2C, A = 4C (코드 음수: 앞 항목 우세)
+    result = _analyze(_raw([[-1, -3, -1], [0]]))
+    np.testing.assert_allclose(result.main_weights[0], np.array([4, 2, 1]) / 7)
+    assert result.cr[0] == pytest.approx(0.0, abs=1e-9)
+
+def test_second_item_preferred_uses_reciprocal():
+    # 코드 양수: 뒤 항목 우세 (a1 vs a2 = 1/3 -> a2가 a1의 3배)
+    result = _analyze(_raw([[0, 0, 0], [2]]))
+    np.testing.assert_allclose(result.subs[0].weights[0], [0.25, 0.75], rtol=1e-3)
+    np.testing.assert_allclose(result.subs[0].global_weights[0], np.array([0.25, 0.75]) / 3, rtol=1e-3)
+
+def test_non_positive_values_are_unanswered():
+    raw = json.loads(_raw([[0, 0, 0], [0]]))
+    raw[pair_key(PLAN.tasks[1], PLAN.tasks[1].pairs[0])] = 0
+    result = _analyze(json.dumps(raw))
+    assert np.isnan(result.subs[0].weights[0]).all()
+    np.testing.assert_allclose(result.main_weights[0], [1 / 3] * 3)
+
+def _legacy_raw(task, order, codes):
+    """이전 설문 형식: 응답자가 정한 순위(order) 순서의 키 '[과제] 앞 vs 뒤'와 a[앞][뒤]"""
+    data = {}
+    code = iter(codes)
+    for i in range(len(order)):
+        for j in range(i + 1, len(order)):
+            a, b = task.items[order[i]], task.items[order[j]]
+            data[f"[{task.name}] {a} vs {b}"] = round(code_weight(next(code)), 3)
+    return data
+
+def test_mixed_key_orientation_in_one_file():
+    main = PLAN.tasks[0]
+    # 같은 판단을 C > B > A 순위로 응답 (키가 'C vs B' 등 반대 방향)
+    forward = _legacy_raw(main, [0, 1, 2], [-1, -4, -2])
+    reverse = _legacy_raw(main, [2, 1, 0], [2, 4, 1])
+    alone = analyze([json.dumps(forward)])
+    mixed = analyze([json.dumps(forward), json.dumps(reverse)])
+    np.testing.assert_allclose(mixed.main_weights[0], alone.main_weights[0])
+    np.testing.assert_allclose(mixed.main_weights[1], alone.main_weights[0], rtol=1e-2)
+    assert mixed.cr[0] == pytest.approx(alone.cr[0])
+    assert mixed.cr.min() > 0     # 빈 방향 열이 1로 덮으면 두 응답 모두 CR 0이 됨
+    assert len(mixed.main_group.cols) == 3
+
+def test_stack_matrices_writes_only_answered_cells():
+    # 같은 쌍이 두 열(A vs B, B vs A)에 있고 응답자마다 한쪽만 답한 경우
+    group = Group("g", ["A", "B"], np.array([0, 1]), np.array([0, 1]), np.array([1, 0]))
+    values = np.array([[3.0, np.nan], [np.nan, 0.25]])
+    m, present = stack_matrices(values, group)
+    np.testing.assert_allclose(m[0], [[1, 3], [1 / 3, 1]])
+    np.testing.assert_allclose(m[1], [[1, 4], [0.25, 1]])
+    assert present.sum() == 2
+
+def test_plan_schema_folds_reversed_keys():
+    main, sub = PLAN.tasks
+    legacy = {**_legacy_raw(main, [2, 0, 1], [4, 2, -1]), **_legacy_raw(sub, [1, 0], [2])}
+    values, schema, ok, report = decode_schema([json.dumps(legacy)], compile_schema(PLAN))
+    assert not report.unknown
+    assert not np.isnan(values).any()       # 모든 쌍을 응답한 사람은 완전 행렬로 계산
+    result = _analyze(json.dumps(legacy))
+    # C vs A = 1/5 -> A vs C = 5, C vs B = 1/3 -> B vs C = 3, A vs B = 2
+    expected = _analyze(_raw([[-1, -4, -2], [-2]]))
+    np.testing.assert_allclose(result.main_weights, expected.main_weights, rtol=1e-2)
+    np.testing.assert_allclose(result.subs[0].weights, expected.subs[0].weights, rtol=1e-2)
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from core import checkpoint
+from core.checkpoint import FAILED, FULL, WRITTEN
+
+@pytest.fixture
+def base(tmp_path):
+    return str(tmp_path / "ckpt")
+
+def test_append_then_load_restores_events_in_order(base):
+    token = checkpoint.new_token()
+    assert checkpoint.compact(token, [{"e": "h", "g": "goal"}], base)
+    for i in range(3):
+        assert checkpoint.append(token, {"e": "a", "i": i}, base) == WRITTEN
+    assert checkpoint.load(token, base) == [{"e": "h", "g": "goal"}] + [{"e": "a", "i": i} for i in range(3)]
+
+def test_truncated_last_line_is_ignored(base):
+    token = checkpoint.new_token()
+    checkpoint.append(token, {"e": "a", "i": 0}, base)
+    with open(os.path.join(base, f"{token}.log"), "a", encoding="utf-8") as f:
+        f.write('{"e":"a","i"')
+    assert checkpoint.load(token, base) == [{"e": "a", "i": 0}]
+
+def test_full_log_is_replaced_by_compact(base, monkeypatch):
+    monkeypatch.setattr(checkpoint, "MAX_FILE_BYTES", 64)
+    token = checkpoint.new_token()
+    statuses = [checkpoint.append(token, {"e": "a", "i": i}, base) for i in range(10)]
+    assert FULL in statuses
+    assert checkpoint.compact(token, [{"e": "h", "g": "goal"}, {"e": "z", "s": 1}], base)
+    assert checkpoint.append(token, {"e": "a", "i": 99}, base) == WRITTEN
+    assert checkpoint.load(token, base) == [{"e": "h", "g": "goal"}, {"e": "z", "s": 1}, {"e": "a", "i": 99}]
+
+def test_invalid_token_is_rejected(base):
+    for token in (None, "", "../escape", "A" * 32, 123):
+        assert checkpoint.append(token, {"e": "a"}, base) == FAILED
+        assert not checkpoint.compact(token, [], base)
+        assert checkpoint.load(token, base) is None
+    assert not os.path.exists(base)
+
+def test_discard_after_submit_starts_fresh(base):
+    """제출 뒤 같은 링크로 다시 들어오면 경고 없이 빈 체크포인트에서 시작"""
+    token = checkpoint.new_token()
+    checkpoint.append(token, {"e": "a", "i": 0}, base)
+    checkpoint.discard(token, base)
+    assert checkpoint.load(token, base) is None
+    assert checkpoint.compact(token, [{"e": "h", "g": "goal"}], base)
+    assert checkpoint.append(token, {"e": "a", "i": 1}, base) == WRITTEN
+
+def test_cleanup_removes_expired_and_oldest(base, monkeypatch):
+    monkeypatch.setattr(checkpoint, "MAX_FILES", 2)
+    tokens = [checkpoint.new_token() for _ in range(4)]
+    now = time.time()
+    for age, token in zip((checkpoint.TTL + 60, 300, 200, 100), tokens):
+        checkpoint.compact(token, [{"e": "h"}], base)
+        os.utime(os.path.join(base, f"{token}.log"), (now - age, now - age))
+    checkpoint.cleanup(base, force=True)
+    assert [checkpoint.load(t, base) is not None for t in tokens] == [False, False, True, True]
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from core import columnar
+from core.batch_ahp import analyze
+from core.submission_store import append_records
+
+RAWS = [
+    {"[평가 기준 중요도] A vs B": 3.0, "[평가 기준 중요도] A vs C": 5.0, "[평가 기준 중요도] B vs C": 2.0, "[A] a1 vs a2": 0.5},
+    {"[평가 기준 중요도] A vs B": 0.5, "[평가 기준 중요도] A vs C": 1.0, "[평가 기준 중요도] B vs C": 4.0},
+    {"[평가 기준 중요도] A vs B": 1.0, "[평가 기준 중요도] A vs C": 1.0, "[평가 기준 중요도] B vs C": 1.0, "[A] a1 vs a2": 7.0},
+]
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(columnar, "_stores", {})
+    path = str(tmp_path / "data" / "key_goal.csv")
+    append_records(path, [{"Time": "t", "Respondent": f"r{i}", "Raw_Data": json.dumps(raw)} for i, raw in enumerate(RAWS)])
+    return path
+
+def test_store_matches_in_memory_analysis(csv_path):
+    assert columnar.convert(csv_path) == len(RAWS)
+    store = columnar.open_store(csv_path)
+    assert store is not None and len(store) == len(RAWS)
+    stored, direct = store.analyze(), analyze([json.dumps(raw) for raw in RAWS])
+    np.testing.assert_array_equal(stored.ok, direct.ok)
+    np.testing.assert_allclose(stored.main_weights, direct.main_weights)
+    np.testing.assert_allclose(stored.cr, direct.cr)
+    np.testing.assert_allclose(stored.subs[0].weights, direct.subs[0].weights)
+
+def test_partial_trailing_line_keeps_store_current(csv_path):
+    columnar.convert(csv_path)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write('t,r9,"{""[평가 기준 중요도] A vs')          # 기록 중인 묶음
+    assert columnar.is_current(csv_path)
+    assert columnar.open_store(csv_path) is not None
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write(' B"": 2.0}"\n')
+    assert not columnar.is_current(csv_path)
+    assert columnar.open_store(csv_path) is None
+
+def test_new_submission_invalidates_store(csv_path):
+    columnar.convert(csv_path)
+    append_records(csv_path, [{"Time": "t", "Respondent": "r3", "Raw_Data": json.dumps(RAWS[0])}])
+    assert columnar.open_store(csv_path) is None
+    assert columnar.convert(csv_path) == len(RAWS) + 1
+    assert len(columnar.open_store(csv_path)) == len(RAWS) + 1
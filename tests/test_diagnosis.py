@@ -0,0 +1,83 @@
+import pytest
+from google.api_core import exceptions as gexc
+
+from core import diagnosis
+from core.diagnosis import (
+    FORMAT_RETRIES, analyze_ahp_logic, diagnose_batched, is_failed, is_parsed, parse_batch_response
+)
+from core.diagnosis_cache import DiagnosisCache
+from core.fake_llm import MALFORMED_ANSWER, SAMPLE_ANSWER
+from core.llm import LLMBackend, reset_scheduler, set_backend
+
+GOAL = "목표"
+GROUPS = [("__main__", GOAL, ["가", "나"]), ("가", "가", ["a1", "a2"])]
+
+class ScriptedBackend(LLMBackend):
+    """정해 둔 답변(문자열, 프롬프트를 받는 함수, 예외)을 호출 순서대로 돌려줌"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def generate(self, key, model_name, prompt):
+        self.calls.append((key, model_name))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer(prompt) if callable(answer) else answer
+
+def _groups(*nos):
+    return "".join(f"[GROUP {no}]\n{SAMPLE_ANSWER}" for no in nos)
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    reset_scheduler(rpm=0)
+    cache = DiagnosisCache(str(tmp_path))
+    monkeypatch.setattr(diagnosis, "get_cache", lambda: cache)
+    yield cache
+    set_backend(None)
+
+def test_malformed_answer_is_retried_on_another_model(cache):
+    backend = ScriptedBackend(MALFORMED_ANSWER, SAMPLE_ANSWER)
+    set_backend(backend)
+    res = analyze_ahp_logic(GOAL, GOAL, ["가", "나"], ["k1"])
+    assert is_parsed(res) and res["grade"] == "보완필요"
+    assert len(backend.calls) == 2 and backend.calls[0] != backend.calls[1]
+
+def test_malformed_retries_are_bounded_and_not_cached(cache):
+    backend = ScriptedBackend(*[MALFORMED_ANSWER] * 10)
+    set_backend(backend)
+    res = analyze_ahp_logic(GOAL, GOAL, ["가", "나"], ["k1"])
+    assert is_failed(res)
+    assert len(backend.calls) == FORMAT_RETRIES + 1
+    set_backend(ScriptedBackend(SAMPLE_ANSWER))
+    assert is_parsed(analyze_ahp_logic(GOAL, GOAL, ["가", "나"], ["k1"]))
+
+def test_dead_key_fails_over_to_next_key(cache):
+    backend = ScriptedBackend(gexc.PermissionDenied("bad key"), SAMPLE_ANSWER)
+    set_backend(backend)
+    assert is_parsed(analyze_ahp_logic(GOAL, GOAL, ["가", "나"], ["k1", "k2"]))
+    assert {k for k, _ in backend.calls} == {"k1", "k2"}
+
+def test_batch_missing_group_is_retried_in_failover(cache):
+    backend = ScriptedBackend(_groups(1), _groups(2))
+    set_backend(backend)
+    results = {gid: res for gid, res, done in diagnose_batched(GOAL, GROUPS, ["k1"]) if done}
+    assert set(results) == {"__main__", "가"} and all(is_parsed(r) for r in results.values())
+    assert len(backend.calls) == 2      # 그룹별 호출로 넘어가지 않음
+
+def test_batch_and_single_answers_use_separate_cache_keys(cache):
+    set_backend(ScriptedBackend(_groups(1, 2)))
+    list(diagnose_batched(GOAL, GROUPS, ["k1"]))
+    # 일괄 답변으로 채운 캐시는 그룹별 프롬프트 조회에 쓰이지 않음
+    backend = ScriptedBackend(SAMPLE_ANSWER)
+    set_backend(backend)
+    analyze_ahp_logic(GOAL, GOAL, ["가", "나"], ["k1"])
+    assert len(backend.calls) == 1
+    # 같은 방식으로는 캐시에서 읽음
+    set_backend(ScriptedBackend())
+    assert all(is_parsed(res) for _, res, _ in diagnose_batched(GOAL, GROUPS, ["k1"]))
+
+def test_parse_batch_response_skips_groups_without_grade():
+    text = _groups(1) + "[GROUP 2]\n[SUMMARY] 등급 없음\n"
+    assert set(parse_batch_response(text)) == {1}
@@ -0,0 +1,31 @@
+from core.diagnosis import diff_groups, make_snapshot
+from core.prescreen import NEAR_DUP_THRESHOLD, prescreen, similarity
+
+def test_shared_prefix_is_not_a_near_duplicate():
+    assert similarity("서비스 품질", "서비스 가격") < NEAR_DUP_THRESHOLD
+    assert similarity("가격", "가격 경쟁력") < NEAR_DUP_THRESHOLD
+
+def test_spacing_and_suffix_variants_are_near_duplicates():
+    assert similarity("제품 가격", "제품가격") == 1.0
+    assert similarity("고객 만족도", "고객만족") >= NEAR_DUP_THRESHOLD
+
+def test_prescreen_blocks_exact_duplicates_and_warns_on_near_ones():
+    findings = prescreen([
+        ("__main__", "목표", ["제품 가격", "제품가격", "품질"]),
+        ("품질", "품질", ["고객 만족도", "고객만족", "서비스 품질", "서비스 가격"]),
+    ])
+    assert findings["__main__"]["card"]["grade"] == "부적합"
+    quality = findings["품질"]
+    assert not quality["blocking"]
+    assert len(quality["warnings"]) == 1 and "고객만족" in quality["warnings"][0]
+
+def test_local_verdict_is_rediagnosed_when_skip_is_turned_off():
+    groups = [("__main__", "목표", ["가", "가"]), ("나", "나", ["a", "b"])]
+    local = {"__main__": {"grade": "부적합", "summary": "중복"}}
+    results = {**local, "나": {"grade": "적합", "summary": "좋음"}}
+    snapshot = make_snapshot("목표", groups, results, local)
+
+    changed, reused = diff_groups(snapshot, "목표", groups, skip_obvious=True)
+    assert not changed and set(reused) == {"__main__", "나"}
+    changed, reused = diff_groups(snapshot, "목표", groups, skip_obvious=False)
+    assert [g[0] for g in changed] == ["__main__"] and set(reused) == {"나"}
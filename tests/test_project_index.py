@@ -0,0 +1,46 @@
+import json
+
+from core.project_index import ProjectIndex
+
+def _write_csv(path, rows):
+    path.write_text("Time,Respondent,Raw_Data\n" + "".join(f't,r{i},"{{}}"\n' for i in range(rows)), encoding="utf-8")
+
+def _index(tmp_path):
+    data, config = tmp_path / "data", tmp_path / "config"
+    data.mkdir(exist_ok=True)
+    config.mkdir(exist_ok=True)
+    return ProjectIndex(str(data), str(config)), data, config
+
+def test_legacy_file_found_by_key_with_underscore(tmp_path):
+    index, data, _ = _index(tmp_path)
+    _write_csv(data / "my_key_연구_목표.csv", 2)
+    entries = index.lookup("my_key")
+    assert [(e.file, e.goal, e.rows) for e in entries] == [("my_key_연구_목표.csv", "연구 목표", 2)]
+    assert index.lookup("my")[0].goal == "key 연구 목표"    # 이전 화면의 startswith(f"{키}_")와 같은 범위
+    assert index.lookup("my_key_연구_목표") == []
+    assert index.lookup("other") == []
+
+def test_configured_file_uses_survey_key(tmp_path):
+    index, data, config = _index(tmp_path)
+    survey = {"goal": "목표 A", "secret_key": "a_b", "main_criteria": ["x", "y"], "sub_criteria": {}}
+    (config / "s1.json").write_text(json.dumps(survey, ensure_ascii=False), encoding="utf-8")
+    _write_csv(data / "a_b_목표_A.csv", 1)
+    [entry] = index.lookup("a_b")
+    assert (entry.survey_id, entry.goal) == ("s1", "목표 A")
+    assert index.lookup("a") == []
+
+def test_append_and_remove_update_every_owner(tmp_path):
+    index, data, _ = _index(tmp_path)
+    index.rebuild()
+    path = data / "k_1_goal.csv"
+    _write_csv(path, 3)
+    index.record_append(str(path), 3)
+    assert index.lookup("k")[0].rows == index.lookup("k_1")[0].rows == 3
+    index.record_append(str(path), 2)
+    assert index.lookup("k_1")[0].rows == 5
+
+    # 다른 프로세스처럼 디스크의 색인을 새로 읽어도 같음
+    assert ProjectIndex(str(data), str(tmp_path / "config")).lookup("k")[0].rows == 5
+
+    index.remove(str(path))
+    assert index.lookup("k") == index.lookup("k_1") == []
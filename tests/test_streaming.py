@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import streaming
+from core.aggregation import AGGREGATIONS
+from core.batch_ahp import analyze
+from core.report import build_report, group_ranking
+from core.submission_store import append_records
+
+MAIN = "평가 기준 중요도"
+
+def _raws(n, seed=0):
+    """무작위 응답 (CR 기준을 넘는 응답, 2차 그룹 미응답 포함)"""
+    rng = np.random.default_rng(seed)
+    scale = lambda: float(rng.choice([1 / 7, 1 / 3, 1, 3, 7]))
+    raws = []
+    for i in range(n):
+        raw = {f"[{MAIN}] A vs B": scale(), f"[{MAIN}] A vs C": scale(), f"[{MAIN}] B vs C": scale()}
+        if i % 4:
+            raw["[A] a1 vs a2"] = scale()
+        raw["[B] b1 vs b2"] = scale()
+        raws.append(json.dumps(raw))
+    return raws
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(streaming, "_results", streaming.OrderedDict())
+    path = str(tmp_path / "data" / "key_goal.csv")
+    append_records(path, [{"Time": "t", "Respondent": f"r{i}", "Raw_Data": raw} for i, raw in enumerate(_raws(40))])
+    return path
+
+def _in_memory(csv_path, aggregation, cr_weighted):
+    df = pd.read_csv(csv_path)
+    result, valid, status_df, _, personal_df = build_report(df, analyze(df["Raw_Data"].tolist()))
+    return group_ranking(result, valid, aggregation, "geometric", cr_weighted, 0), valid, status_df, personal_df
+
+@pytest.mark.parametrize("aggregation", AGGREGATIONS)
+@pytest.mark.parametrize("cr_weighted", [False, True])
+def test_chunked_analysis_matches_in_memory(csv_path, aggregation, cr_weighted):
+    streamed = streaming.analyze_stream(csv_path, aggregation=aggregation, cr_weighted=cr_weighted, chunk_rows=7)
+    ranking, valid, status_df, personal_df = _in_memory(csv_path, aggregation, cr_weighted)
+
+    assert 0 < streamed.valid == valid.sum() < streamed.rows == 40
+    pd.testing.assert_frame_equal(streamed.ranking.reset_index(drop=True), ranking.reset_index(drop=True))
+    pd.testing.assert_frame_equal(pd.read_csv(streamed.status_path), status_df, check_dtype=False)
+    assert len(pd.read_csv(streamed.personal_path)) == len(personal_df)
+
+def test_stream_result_is_reused_until_the_file_grows(csv_path):
+    first = streaming.stream_result(csv_path)
+    assert streaming.stream_result(csv_path) is first
+    append_records(csv_path, [{"Time": "t", "Respondent": "late", "Raw_Data": _raws(1, seed=9)[0]}])
+    second = streaming.stream_result(csv_path)
+    assert second is not first and second.rows == first.rows + 1
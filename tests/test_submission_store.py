@@ -0,0 +1,80 @@
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+from core import submission_store as store
+from core.submission_store import (
+    FAILED, RETRYING, WRITTEN, SubmissionWriter, append_records, failed_path, log_path, read_responses, rebuild_csv
+)
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)     # 프로젝트 색인의 설정 폴더(상대 경로)도 임시 폴더 안으로
+    monkeypatch.setattr(store, "RETRY_INTERVAL", 0.05)
+    return str(tmp_path / "data" / "key_goal.csv")
+
+def _record(i):
+    return {"Time": "t", "Respondent": f"r{i}", "Raw_Data": json.dumps({"[g] a vs b": i + 1})}
+
+def _log(csv_path):
+    with open(log_path(csv_path), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def _fail_csv(monkeypatch, times):
+    """CSV 쓰기를 times번 실패시킴 (로그 쓰기는 정상)"""
+    real, left = store._csv_lines, [times]
+
+    def flaky(records, header):
+        if left[0]:
+            left[0] -= 1
+            raise OSError("disk full")
+        return real(records, header)
+    monkeypatch.setattr(store, "_csv_lines", flaky)
+
+def test_concurrent_submissions_are_all_written_once(csv_path):
+    writer = SubmissionWriter()
+    ids = []
+    threads = [threading.Thread(target=lambda i=i: ids.append(writer.submit(csv_path, _record(i)))) for i in range(200)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.flush()
+    assert all(writer.wait(sid, 0) == WRITTEN for sid in ids)
+    df = read_responses(csv_path)
+    assert sorted(df["Respondent"]) == sorted(f"r{i}" for i in range(200))
+    assert len(_log(csv_path)) == 200
+    assert rebuild_csv(csv_path) == 200
+    pd.testing.assert_frame_equal(read_responses(csv_path).sort_values("Respondent", ignore_index=True),
+                                  df.sort_values("Respondent", ignore_index=True))
+
+def test_csv_failure_retries_without_duplicating_log(csv_path, monkeypatch):
+    _fail_csv(monkeypatch, 4)       # 기록기 안의 3번 재시도를 넘겨 다음 묶음에서 다시 시도
+    writer = SubmissionWriter()
+    sid = writer.submit(csv_path, _record(0))
+    assert writer.wait(sid, 0.5) in (RETRYING, WRITTEN)
+    assert writer.flush() and writer.wait(sid, 0) == WRITTEN
+    assert len(_log(csv_path)) == 1
+    assert len(read_responses(csv_path)) == 1
+
+def test_failed_batch_is_quarantined(csv_path, monkeypatch):
+    monkeypatch.setattr(store, "MAX_ATTEMPTS", 2)
+    _fail_csv(monkeypatch, 100)
+    writer = SubmissionWriter()
+    sid = writer.submit(csv_path, _record(0))
+    assert writer.flush() and writer.wait(sid, 0) == FAILED
+    with open(failed_path(csv_path), encoding="utf-8") as f:
+        assert [json.loads(line)["Id"] for line in f] == [sid]
+
+def test_retried_quarantine_is_counted_once_on_rebuild(csv_path, monkeypatch):
+    records = [{**_record(i), "Id": f"id{i}"} for i in range(3)]
+    append_records(csv_path, records)
+    _fail_csv(monkeypatch, 1)
+    with pytest.raises(store.CsvWriteError):
+        append_records(csv_path, records[2:])       # 로그에는 남고 CSV에는 없음
+    append_records(csv_path, records[2:])           # 격리 파일에서 다시 기록한 경우처럼 같은 제출을 또 씀
+    assert len(_log(csv_path)) == 5
+    assert rebuild_csv(csv_path) == 3
+    assert list(read_responses(csv_path)["Respondent"]) == ["r0", "r1", "r2"]